@@ -0,0 +1,297 @@
+"""
+Headless whole-frame benchmarks over the canonical scenes, run from the repository root:
+
+    python -m benchmarks.frame_bench                                   # every scene, EGL
+    python -m benchmarks.frame_bench --backend osmesa --scene sphere_1000
+    python -m benchmarks.frame_bench --update-baseline                 # store the current numbers
+    python -m benchmarks.frame_bench --tolerance 0.05                  # fail on a >5% regression
+
+Every scene runs in its own process (fresh context, per-scene peak RSS) for --frames timed frames,
+each ended with glFinish so GPU work is included. A few more frames then run under GLCallCounter to
+count GL calls, draw calls, vertices and uploaded bytes. Results are compared with the stored
+baseline; metrics above baseline * (1 + tolerance) are regressions and the exit status is 1.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+import numpy as np
+
+WIDTH, HEIGHT = 640, 480
+TIMESTEP = 1 / 60.0
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Lower is better for every compared metric
+COMPARED_METRICS = (
+    "frame_ms_mean", "frame_ms_p50", "frame_ms_p95", "frame_ms_p99",
+    "gl_calls", "draw_calls", "uploaded_bytes", "peak_rss_mb",
+)
+
+
+class DrawableScene:
+    """ One drawable rendered from a fixed camera into the context's default target """
+    def __init__(self, context, drawable, camera_position):
+        import OpenGL.GL as GL
+        from view_folder.multiple_viewers import Camera
+
+        self.context = context
+        self.drawable = drawable
+        self.camera = Camera(aspect_ratio=WIDTH / HEIGHT, position=camera_position, far=200)
+
+        GL.glEnable(GL.GL_DEPTH_TEST)
+        drawable.setup()
+
+    def frame(self):
+        import OpenGL.GL as GL
+
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.context.framebuffer)
+        GL.glViewport(0, 0, WIDTH, HEIGHT)
+        GL.glClearColor(1.0, 1.0, 1.0, 1.0)
+        GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
+
+        self.drawable.update(TIMESTEP)
+        self.drawable.draw(**self.camera.draw_kwargs())
+        self.context.swap_buffers()
+
+    def release(self):
+        self.drawable.release()
+
+
+class MultiplesScene:
+    """ MultiplesView over an animated Mesh3D, so every camera pass is redrawn each frame """
+    def __init__(self, context, camera_count):
+        import torch
+        from mesh_3d.mesh_3d import Mesh3D
+        from view_folder.multiple_viewers import MultiplesView
+        from view_folder.batch_renderer import orbit_cameras
+
+        self.context = context
+        self.view = MultiplesView(
+            vert_shader="multiple_cams_normal.vert",
+            frag_shader="multiple_cams_normal.frag",
+            width=WIDTH * 2, height=HEIGHT,
+            context=context,
+            vsync=False,
+            # The view adds its own main camera
+            cameras=list(orbit_cameras(camera_count - 1, radius=12, height=6, aspect_ratio=WIDTH / HEIGHT, far=50)),
+        )
+        self.view.add(Mesh3D(
+            vert_shader="multiple_cams_normal.vert",
+            frag_shader="multiple_cams_normal.frag",
+            func=lambda x, y: torch.sin(3 * x) + torch.cos(3 * y) + 1,
+            x_range=(-5, 5),
+            y_range=(-5, 5),
+            resolution=200,
+            # Stepped in update(), so the scene changes on every frame and not on an engine thread's schedule
+            background=False,
+        ))
+
+    def frame(self):
+        self.view.update(TIMESTEP)
+        self.view.render_frame()
+        self.context.swap_buffers()
+
+    def release(self):
+        self.view.release()
+
+
+def sphere_scene(context):
+    from sphere.sphere import Sphere
+    return DrawableScene(context, Sphere("sphere/sphere.vert", "sphere/sphere.frag", N=1000, r=0.5), [0, 0, 3])
+
+
+def cylinder_scene(context):
+    from cylinder.cylinder import Cylinder
+    return DrawableScene(context, Cylinder("cylinder/cylinder.vert", "cylinder/cylinder.frag", N=10000), [0, 0, 6])
+
+
+def mesh3d_scene(context):
+    import torch
+    from mesh_3d.mesh_3d import Mesh3D
+    mesh = Mesh3D(
+        vert_shader="mesh_3d/mesh.vert",
+        frag_shader="mesh_3d/mesh.frag",
+        func=lambda x, y: torch.sin(3 * x) + torch.cos(3 * y) + 1,
+        x_range=(-5, 5),
+        y_range=(-5, 5),
+        resolution=1000,
+        background=False,
+    )
+    return DrawableScene(context, mesh, [8, 8, 8])
+
+
+def cottage_scene(context):
+    from model.model1 import ObjModel1
+    model = ObjModel1(
+        model_path="model/cottage_obj.obj",
+        vert_shader="model/model1.vert",
+        frag_shader="model/model1.frag",
+        texture_path="model/Liberty-Pavimentazione-1.bmp",
+    )
+    return DrawableScene(context, model, [0, 10, 40])
+
+
+SCENES = {
+    "sphere_1000": sphere_scene,
+    "cylinder_10000": cylinder_scene,
+    "mesh3d_1000": mesh3d_scene,
+    "cottage_obj": cottage_scene,
+    "multiples_1cam": lambda context: MultiplesScene(context, 1),
+    "multiples_4cam": lambda context: MultiplesScene(context, 4),
+    "multiples_8cam": lambda context: MultiplesScene(context, 8),
+}
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+
+
+def run_scene(name, frames, warmup, counted_frames, backend):
+    """ Benchmark one scene in this process, needs PYOPENGL_PLATFORM set before OpenGL was imported """
+    import OpenGL.GL as GL
+    from libs.context import create_context
+    from benchmarks.gl_counters import GLCallCounter
+
+    context = create_context(WIDTH * 2, HEIGHT, "Benchmark", backend=backend)
+
+    setup_start = time.perf_counter()
+    with GLCallCounter() as setup_counter:
+        scene = SCENES[name](context)
+    GL.glFinish()
+    setup_s = time.perf_counter() - setup_start
+
+    for _ in range(warmup):
+        scene.frame()
+    GL.glFinish()
+
+    times = np.empty(frames, dtype=np.float64)
+    for index in range(frames):
+        start = time.perf_counter()
+        scene.frame()
+        GL.glFinish()
+        times[index] = (time.perf_counter() - start) * 1000.0
+
+    # Counted separately, wrapping every GL call would skew the timings
+    with GLCallCounter() as counter:
+        for _ in range(counted_frames):
+            scene.frame()
+        GL.glFinish()
+    scene.release()
+
+    p50, p95, p99 = np.percentile(times, [50, 95, 99])
+    return dict(
+        frames=frames,
+        setup_s=setup_s,
+        setup_uploaded_bytes=setup_counter.uploaded_bytes,
+        frame_ms_mean=float(times.mean()),
+        frame_ms_p50=float(p50),
+        frame_ms_p95=float(p95),
+        frame_ms_p99=float(p99),
+        gl_calls=counter.gl_calls / counted_frames,
+        draw_calls=counter.draw_calls / counted_frames,
+        vertices=counter.vertices / counted_frames,
+        uploaded_bytes=counter.uploaded_bytes / counted_frames,
+        peak_rss_mb=peak_rss_mb(),
+    )
+
+
+def run_isolated(name, args):
+    """ Run one scene in a child process and return its result """
+    command = [
+        sys.executable, "-m", "benchmarks.frame_bench", "--worker", name,
+        "--frames", str(args.frames), "--warmup", str(args.warmup),
+        "--counted-frames", str(args.counted_frames), "--backend", args.backend,
+    ]
+    completed = subprocess.run(command, stdout=subprocess.PIPE, text=True)
+    if completed.returncode != 0:
+        raise Exception(f"Benchmark {name} failed with exit status {completed.returncode}")
+    # The viewers print renderer info first, the result is the last line
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, tolerance):
+    """ [(scene, metric, baseline, current)] of every metric worse than baseline * (1 + tolerance) """
+    regressions = []
+    for scene, metrics in results.items():
+        for metric in COMPARED_METRICS:
+            reference = baseline.get(scene, {}).get(metric)
+            current = metrics.get(metric)
+            if reference is None or current is None:
+                continue
+            if current > reference * (1.0 + tolerance):
+                regressions.append((scene, metric, reference, current))
+    return regressions
+
+
+def print_table(results):
+    print(f"{'scene':16s} {'mean ms':>9s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'draws':>7s} {'gl calls':>9s} "
+          f"{'vertices':>11s} {'upload B':>11s} {'rss MB':>8s}")
+    for name, row in results.items():
+        rss = row["peak_rss_mb"]
+        print(f"{name:16s} {row['frame_ms_mean']:9.3f} {row['frame_ms_p50']:8.3f} {row['frame_ms_p95']:8.3f} "
+              f"{row['frame_ms_p99']:8.3f} {row['draw_calls']:7.0f} {row['gl_calls']:9.0f} {row['vertices']:11.0f} "
+              f"{row['uploaded_bytes']:11.0f} {rss if rss is not None else float('nan'):8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scene", action="append", choices=sorted(SCENES), help="Scene to run, repeatable, default all")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--counted-frames", type=int, default=10)
+    parser.add_argument("--backend", choices=("egl", "osmesa"), default=os.environ.get("PYOPENGL_PLATFORM", "egl"))
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression, 0.10 = 10%%")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # PyOpenGL binds its platform on first import, children inherit it
+    os.environ["PYOPENGL_PLATFORM"] = args.backend
+
+    if args.worker:
+        print(json.dumps(run_scene(args.worker, args.frames, args.warmup, args.counted_frames, args.backend)))
+        return 0
+
+    results = {name: run_isolated(name, args) for name in (args.scene or SCENES)}
+    print_table(results)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as file:
+                baseline = json.load(file)
+        baseline.update(results)
+        with open(args.baseline, "w") as file:
+            json.dump(baseline, file, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --update-baseline to create one")
+        return 0
+
+    with open(args.baseline) as file:
+        regressions = compare(results, json.load(file), args.tolerance)
+    for scene, metric, reference, current in regressions:
+        print(f"REGRESSION {scene}.{metric}: {reference:.3f} -> {current:.3f} ({current / reference - 1:+.1%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
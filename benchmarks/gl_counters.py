@@ -0,0 +1,69 @@
+import OpenGL.GL as GL
+
+DRAW_CALLS = {
+    # name: function(args) -> vertices submitted
+    "glDrawArrays": lambda args: args[2],
+    "glDrawElements": lambda args: args[1],
+    "glDrawElementsBaseVertex": lambda args: args[1],
+    "glDrawArraysInstanced": lambda args: args[2] * args[3],
+    "glDrawElementsInstanced": lambda args: args[1] * args[4],
+}
+
+
+def _nbytes(data):
+    return int(getattr(data, "nbytes", 0) or 0)
+
+
+UPLOAD_CALLS = {
+    # name: function(args) -> bytes sent to the GPU, both PyOpenGL call forms
+    "glBufferData": lambda args: int(args[1]) if len(args) == 4 else _nbytes(args[1]),
+    "glBufferSubData": lambda args: int(args[2]) if len(args) == 4 else _nbytes(args[2]),
+    "glTexImage2D": lambda args: _nbytes(args[-1]),
+    "glTexSubImage2D": lambda args: _nbytes(args[-1]),
+}
+
+
+class GLCallCounter:
+    """
+    Counts OpenGL calls while active by wrapping every gl* function of the OpenGL.GL module.
+    Every module here calls through `GL.glXxx`, so all of them are counted.
+
+        with GLCallCounter() as counter:
+            render()
+        counter.gl_calls, counter.draw_calls, counter.vertices, counter.uploaded_bytes
+    """
+    def __init__(self):
+        self.gl_calls = 0
+        self.draw_calls = 0
+        self.vertices = 0
+        self.uploaded_bytes = 0
+        self.originals = {}
+
+    def _wrap(self, name, function):
+        vertices = DRAW_CALLS.get(name)
+        upload = UPLOAD_CALLS.get(name)
+
+        def counted(*args, **kwargs):
+            self.gl_calls += 1
+            if vertices is not None:
+                self.draw_calls += 1
+                self.vertices += int(vertices(args))
+            if upload is not None:
+                self.uploaded_bytes += upload(args)
+            return function(*args, **kwargs)
+
+        return counted
+
+    def __enter__(self):
+        for name in dir(GL):
+            function = getattr(GL, name)
+            if name.startswith("gl") and callable(function):
+                self.originals[name] = function
+                setattr(GL, name, self._wrap(name, function))
+        return self
+
+    def __exit__(self, *exc_info):
+        for name, function in self.originals.items():
+            setattr(GL, name, function)
+        self.originals = {}
+        return False
@@ -0,0 +1,77 @@
+"""
+Import-time report of a launch configuration, a summary of `python -X importtime`. Run from the repository root:
+
+    python -m benchmarks.import_time --model cube --viewer moving
+    python -m benchmarks.import_time --model mesh3d --top 15
+    python -m benchmarks.import_time --model cube --budget 0.5      # exit status 1 above 0.5 s
+
+Imports exactly what main.py imports for that model/viewer pair (main's own imports, the registry
+entries and their dependencies) in a fresh interpreter, without creating a window.
+"""
+import re
+import sys
+import json
+import argparse
+import subprocess
+
+LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(model, viewer):
+    """ [(module, self seconds, cumulative seconds, nesting depth)] in import order """
+    code = (
+        "import os, argparse, glfw, registry\n"
+        "from libs.context import create_context, default_backend\n"
+        f"registry.model_class({model!r})\n"
+        f"registry.load(*registry.VIEWERS[{viewer!r}][:2])\n"
+    )
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code], stderr=subprocess.PIPE, text=True)
+    if completed.returncode != 0:
+        raise Exception(f"Importing {model}/{viewer} failed:\n{completed.stderr[-2000:]}")
+
+    imports = []
+    for line in completed.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            # -X importtime indents nested imports by two spaces per level
+            imports.append((name, int(self_us) / 1e6, int(cumulative_us) / 1e6, (len(indent) - 1) // 2))
+    return imports
+
+
+def main():
+    import registry
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="mesh3d_depth", choices=sorted(registry.MODELS))
+    parser.add_argument("--viewer", default="multiples", choices=sorted(registry.VIEWERS))
+    parser.add_argument("--top", type=int, default=10, help="Rows in each table")
+    parser.add_argument("--budget", type=float, help="Fail when the total import time (seconds) exceeds this")
+    parser.add_argument("--output", help="Also write every import to this JSON file")
+    args = parser.parse_args()
+
+    imports = measure(args.model, args.viewer)
+    total = sum(self_time for _, self_time, _, _ in imports)
+
+    print(f"{args.model} in {args.viewer}: {len(imports)} modules imported in {total:.3f} s")
+    print("\nslowest top-level imports (cumulative)")
+    top_level = sorted((row for row in imports if row[3] == 0), key=lambda row: -row[2])
+    for name, _, cumulative, _ in top_level[:args.top]:
+        print(f"  {cumulative * 1000:9.1f} ms  {name}")
+    print("\nslowest modules (self)")
+    for name, self_time, _, _ in sorted(imports, key=lambda row: -row[1])[:args.top]:
+        print(f"  {self_time * 1000:9.1f} ms  {name}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump([dict(module=name, self_s=self_time, cumulative_s=cumulative, depth=depth)
+                       for name, self_time, cumulative, depth in imports], file, indent=2)
+
+    if args.budget is not None and total > args.budget:
+        print(f"\nREGRESSION import time {total:.3f} s is over the {args.budget:.3f} s budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
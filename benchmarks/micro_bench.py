@@ -0,0 +1,270 @@
+"""
+CPU-only micro-benchmarks of the geometry generators, the OBJ loader and libs.transform, no GL context
+needed. Run from the repository root:
+
+    python -m benchmarks.micro_bench
+    python -m benchmarks.micro_bench --only sphere --only mesh3d --output micro.json
+    python -m benchmarks.micro_bench --update-baseline
+    python -m benchmarks.micro_bench --tolerance 0.2
+
+Each generator is timed over growing input sizes and a power law t ~ size^k is fitted to the curve.
+A fitted exponent above the expected one (plus --exponent-slack) is reported as an algorithmic
+regression even without a baseline, and so is a time over the generator's absolute budget (BUDGETS);
+with a baseline, per-size times above baseline * (1 + tolerance) are reported too. Any of them makes
+the exit status 1.
+"""
+import os
+import sys
+import json
+import timeit
+import argparse
+import tempfile
+
+import numpy as np
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "micro_baseline.json")
+
+
+def measure(function, repeat=5, min_time=0.05):
+    """ Best time (seconds) of one call, over `repeat` runs of enough calls to last min_time """
+    timer = timeit.Timer(function)
+    number = 1
+    while timer.timeit(number) < min_time and number < 1_000_000:
+        number *= 10
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def fit_exponent(sizes, times):
+    """ k of t ~ size^k, the slope of the log-log curve """
+    return float(np.polyfit(np.log(sizes), np.log(times), 1)[0])
+
+
+# ---------------------------------------------------------------------- SCALING CURVES
+# name: (sizes, expected exponent, size label, make(size) -> zero-argument callable)
+
+def sphere_vertices(size):
+    from sphere.sphere import Sphere
+    sphere = Sphere.__new__(Sphere)
+    sphere.N, sphere.r = size, 1.0
+    return sphere.generate_vertices
+
+
+def sphere_indices(size):
+    from sphere.sphere import Sphere
+    sphere = Sphere.__new__(Sphere)
+    sphere.N, sphere.r = size, 1.0
+    return lambda: sphere.generate_triangle_strip_indices(size)
+
+
+def cylinder_vertices(size):
+    from cylinder.cylinder import Cylinder
+    cylinder = Cylinder.__new__(Cylinder)
+    cylinder.N, cylinder.R, cylinder.height = size, 1.0, 2.0
+    return cylinder.generate_vertices
+
+
+def cylinder_indices(size):
+    from cylinder.cylinder import Cylinder
+    cylinder = Cylinder.__new__(Cylinder)
+    cylinder.N, cylinder.R, cylinder.height = size, 1.0, 2.0
+    cylinder.vertices = cylinder.generate_vertices()[0]
+    return cylinder.generate_indices
+
+
+def mesh3d_mesh(size):
+    import torch
+    from mesh_3d.mesh_3d import Mesh3D
+    mesh = Mesh3D.__new__(Mesh3D)
+    func = lambda x, y: torch.sin(3 * x) + torch.cos(3 * y) + 1
+    return lambda: mesh.generate_mesh(func, (-5, 5), (-5, 5), size)
+
+
+def mesh3d_tiled_mesh(size):
+    import torch
+    from mesh_3d.tiled_mesh import generate_tiled_mesh
+    func = lambda x, y: torch.sin(3 * x) + torch.cos(3 * y) + 1
+    return lambda: generate_tiled_mesh(func, (-5, 5), (-5, 5), size)
+
+
+def isolines_50_levels(size):
+    from mesh_3d.isolines import crossing_segments
+    x = np.linspace(-5, 5, size, dtype=np.float32)
+    X, Y = np.meshgrid(x, x, indexing="ij")
+    Z = np.sin(3 * X) + np.cos(3 * Y) + 1
+    levels = np.linspace(Z.min(), Z.max(), 52)[1:-1]
+    return lambda: crossing_segments(Z, x, x, levels)
+
+
+def marching_cubes_gyroid(size):
+    import torch
+    from implicit_surface.marching_cubes import marching_cubes
+    func = lambda x, y, z: torch.sin(x) * torch.cos(y) + torch.sin(y) * torch.cos(z) + torch.sin(z) * torch.cos(x)
+    return lambda: marching_cubes(func, ((-6, 6), (-6, 6), (-6, 6)), size)
+
+
+def point_cloud_sort(size, directory=tempfile.gettempdir()):
+    from point_cloud.chunked_points import PointFile, spatial_sort
+    path = os.path.join(directory, f"micro_bench_cloud_{size}.npy")
+    if not os.path.exists(path):
+        np.save(path, np.random.default_rng(0).random((size, 3), dtype=np.float32))
+    source = PointFile(path)
+    output = os.path.join(directory, f"micro_bench_cloud_{size}.sorted.npy")
+    return lambda: spatial_sort(source, output, chunk_size=65536)
+
+
+def vector_field_sample(size):
+    import torch
+    from vector_3d.vector_field import grid_points, sample_field
+    coordinates, _, _ = grid_points(((-2, 2), (-2, 2), (-2, 2)), size)
+    func = lambda x, y, z, t=0.0: (-y, x, torch.sin(2 * x + t))
+    return lambda: sample_field(func, coordinates, 0.5)
+
+
+def write_grid_obj(path, side):
+    """ side x side vertex grid, 2 * (side - 1)^2 triangles """
+    x, y = np.meshgrid(np.arange(side, dtype=np.float32), np.arange(side, dtype=np.float32), indexing="ij")
+    index = np.arange(1, side * side + 1).reshape(side, side)
+    a, b, c, d = index[:-1, :-1].ravel(), index[1:, :-1].ravel(), index[:-1, 1:].ravel(), index[1:, 1:].ravel()
+    faces = np.concatenate([np.stack([a, b, c], 1), np.stack([c, b, d], 1)])
+    with open(path, "w") as file:
+        np.savetxt(file, np.stack([x.ravel(), y.ravel(), np.zeros(side * side)], 1), fmt="v %.4f %.4f %.4f")
+        np.savetxt(file, faces, fmt="f %d %d %d")
+
+
+def obj_load(size, directory=tempfile.gettempdir()):
+    from model.model import ObjModel
+    path = os.path.join(directory, f"micro_bench_grid_{size}.obj")
+    if not os.path.exists(path):
+        write_grid_obj(path, size)
+    model = ObjModel.__new__(ObjModel)
+    return lambda: model.load_obj(path)
+
+
+CURVES = {
+    "sphere.generate_vertices": ([25, 50, 100, 200, 400], 2, "N", sphere_vertices),
+    "sphere.generate_triangle_strip_indices": ([25, 50, 100, 200, 400], 2, "N", sphere_indices),
+    "cylinder.generate_vertices": ([1000, 4000, 16000, 64000], 1, "N", cylinder_vertices),
+    "cylinder.generate_indices": ([1000, 4000, 16000, 64000], 1, "N", cylinder_indices),
+    "mesh3d.generate_mesh": ([50, 100, 200, 400, 800], 2, "resolution", mesh3d_mesh),
+    "mesh3d.generate_tiled_mesh": ([512, 1024, 2048, 4096], 2, "resolution", mesh3d_tiled_mesh),
+    "isolines.crossing_segments": ([250, 500, 1000, 2000], 2, "resolution", isolines_50_levels),
+    "marching_cubes": ([32, 64, 128, 256], 3, "resolution", marching_cubes_gyroid),
+    "point_cloud.spatial_sort": ([250_000, 500_000, 1_000_000, 2_000_000], 1, "points", point_cloud_sort),
+    "vector_field.sample_field": ([16, 32, 64, 128], 3, "resolution", vector_field_sample),
+    "model.load_obj": ([16, 32, 64, 128, 256], 2, "grid side", obj_load),
+}
+
+# name: {size: seconds}, hard ceilings checked with or without a baseline
+BUDGETS = {
+    "isolines.crossing_segments": {2000: 0.100},
+}
+
+
+# ---------------------------------------------------------------------- TRANSFORMS (per call)
+
+def transform_calls():
+    from libs import transform as T
+    eye, target, up = T.vec(1, 2, 3), T.vec(0, 0, 0), T.vec(0, 1, 0)
+    q0 = T.quaternion_from_euler(10, 20, 30)
+    q1 = T.quaternion_from_euler(40, 50, 60)
+    return {
+        "transform.perspective": lambda: T.perspective(45, 4 / 3, 0.1, 100),
+        "transform.frustum": lambda: T.frustum(-1, 1, -1, 1, 0.1, 100),
+        "transform.lookat": lambda: T.lookat(eye, target, up),
+        "transform.rotate": lambda: T.rotate((1, 1, 0), 30),
+        "transform.quaternion_from_euler": lambda: T.quaternion_from_euler(10, 20, 30),
+        "transform.quaternion_mul": lambda: T.quaternion_mul(q0, q1),
+        "transform.quaternion_matrix": lambda: T.quaternion_matrix(q0),
+        "transform.quaternion_slerp": lambda: T.quaternion_slerp(q0, q1, 0.3),
+    }
+
+
+def run(only=None, repeat=5):
+    results = {}
+    for name, (sizes, expected, label, make) in CURVES.items():
+        if only and not any(part in name for part in only):
+            continue
+        times = [measure(make(size), repeat=repeat) for size in sizes]
+        results[name] = dict(
+            sizes=sizes, size_label=label, seconds=times,
+            exponent=fit_exponent(sizes, times), expected_exponent=expected
+        )
+
+    for name, function in transform_calls().items():
+        if only and not any(part in name for part in only):
+            continue
+        results[name] = dict(seconds_per_call=measure(function, repeat=repeat))
+    return results
+
+
+def print_results(results):
+    for name, row in results.items():
+        if "sizes" in row:
+            curve = "  ".join(f"{size}:{seconds * 1000:.2f}ms" for size, seconds in zip(row["sizes"], row["seconds"]))
+            print(f"{name:42s} k={row['exponent']:.2f} (expected {row['expected_exponent']})  {row['size_label']} {curve}")
+        else:
+            print(f"{name:42s} {row['seconds_per_call'] * 1e6:8.2f} us/call")
+
+
+def regressions(results, baseline, tolerance, exponent_slack):
+    found = []
+    for name, row in results.items():
+        if "sizes" in row and row["exponent"] > row["expected_exponent"] + exponent_slack:
+            found.append(f"{name}: scales as size^{row['exponent']:.2f}, expected size^{row['expected_exponent']}")
+        if "sizes" in row:
+            budget = BUDGETS.get(name, {})
+            for size, seconds in zip(row["sizes"], row["seconds"]):
+                if size in budget and seconds > budget[size]:
+                    found.append(f"{name}[{size}]: {seconds * 1000:.1f}ms, over its {budget[size] * 1000:.0f}ms budget")
+
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        if "sizes" in row:
+            reference_times = dict(zip(reference["sizes"], reference["seconds"]))
+            for size, seconds in zip(row["sizes"], row["seconds"]):
+                if size in reference_times and seconds > reference_times[size] * (1.0 + tolerance):
+                    found.append(f"{name}[{size}]: {reference_times[size] * 1000:.3f}ms -> {seconds * 1000:.3f}ms")
+        elif row["seconds_per_call"] > reference["seconds_per_call"] * (1.0 + tolerance):
+            found.append(f"{name}: {reference['seconds_per_call'] * 1e6:.2f}us -> {row['seconds_per_call'] * 1e6:.2f}us")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", action="append", help="Run benchmarks whose name contains this, repeatable")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown, 0.25 = 25%%")
+    parser.add_argument("--exponent-slack", type=float, default=0.3, help="Allowed excess of the fitted exponent")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args.only, args.repeat)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w") as file:
+            json.dump(baseline, file, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    found = regressions(results, baseline, args.tolerance, args.exponent_slack)
+    for message in found:
+        print(f"REGRESSION {message}")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
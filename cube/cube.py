@@ -1,4 +1,3 @@
-from libs import transform as T
 from libs.buffer import *
 import OpenGL.GL as GL
 import numpy as np
@@ -61,7 +60,7 @@ class Cube(ModelAbstract):
         self.vao.activate()
         GL.glUseProgram(self.shader.render_idx)
 
-        projection = T.perspective(fovy=kwargs["fovy"], aspect=kwargs["aspect"], near=kwargs["near"], far=kwargs["far"])
+        projection = self.get_projection_matrix(**kwargs)
         self.uma.upload_uniform_matrix4fv(projection, "projection", True)
 
         # Create a rotation matrix based on angles
@@ -124,7 +124,7 @@ class Cylinder(ModelAbstract):
         self.vao.activate()
         GL.glUseProgram(self.shader.render_idx)
 
-        projection = T.perspective(fovy=kwargs["fovy"], aspect=kwargs["aspect"], near=kwargs["near"], far=kwargs["far"])
+        projection = self.get_projection_matrix(**kwargs)
         self.uma.upload_uniform_matrix4fv(projection, "projection", True)
 
         # Create a rotation matrix based on angles
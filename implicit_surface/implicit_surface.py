@@ -0,0 +1,70 @@
+import numpy as np
+import OpenGL.GL as GL
+
+from model_interface import ModelAbstract
+from implicit_surface.marching_cubes import marching_cubes
+
+
+class ImplicitSurface(ModelAbstract):
+    def __init__(self, vert_shader, frag_shader, func, bounds=((-1, 1), (-1, 1), (-1, 1)), resolution=128,
+                 level=0.0, slab=16, workers=None):
+        """
+        :param vert_shader: The vertex shader source, with a packed normal at location 2 (mesh_3d/mesh_lit.vert)
+        :param frag_shader: The fragment shader source
+        :param func: The function f(x, y, z) whose isosurface f = level is drawn
+        :param bounds: The ranges of x, y and z values ((x_min, x_max), (y_min, y_max), (z_min, z_max))
+        :param resolution: The number of grid points along every axis (an int, or one per axis), 512 works
+            within a few GB since the grid is only ever held one slab at a time
+        :param slab: Grid cubes along x evaluated together
+        :param workers: Threads extracting slabs, None for the executor's default
+        """
+        super().__init__(vert_shader, frag_shader)
+        self.func = func
+        self.level = level
+
+        self.vertices, self.normals, self.indices = marching_cubes(func, bounds, resolution, level, slab, workers)
+        self.colors = self.generate_colors(self.vertices)
+
+        # Towards the light, for the lit shaders (mesh_lit.frag)
+        self.light_direction = np.array([0.3, 0.5, 1.0], dtype=np.float32)
+
+    @staticmethod
+    def generate_colors(vertices):
+        """ Red to blue with the height, as Mesh3D """
+        colors = np.zeros_like(vertices)
+        if len(vertices) == 0:
+            return colors
+        z = vertices[:, 2]
+        intensity = (z - z.min()) / ((z.max() - z.min()) or 1.0)
+        colors[:, 0] = intensity
+        colors[:, 2] = 1.0 - intensity
+        return colors
+
+    def setup(self):
+        super().setup()
+
+        self.vao.add_vbo(0, self.vertices, ncomponents=3, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None)
+        self.vao.add_vbo(1, self.colors, ncomponents=3, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None)
+        self.vao.add_vbo(2, self.normals, ncomponents=4, dtype=GL.GL_INT_2_10_10_10_REV, normalized=True, stride=0, offset=None)
+        self.vao.add_ebo(indices=self.indices)
+
+    def draw(self, **kwargs):
+        if len(self.indices) == 0:
+            return
+
+        self.vao.activate()
+        GL.glUseProgram(self.shader.render_idx)
+
+        projection = self.get_projection_matrix(**kwargs)
+        self.uma.upload_uniform_matrix4fv(projection, "projection", True)
+
+        modelview = self.get_view_matrix(**kwargs)
+        self.uma.upload_uniform_matrix4fv(modelview, "modelview", True)
+
+        self.uma.upload_uniform_vector3fv(kwargs["camera_pos"], "cameraPos")
+        self.uma.upload_uniform_scalar1f(kwargs["far"], "maxDistance")
+        self.uma.upload_uniform_vector3fv(self.light_direction, "lightDir")
+
+        GL.glDrawElements(GL.GL_TRIANGLES, len(self.indices), GL.GL_UNSIGNED_INT, None)
+
+        self.vao.deactivate()
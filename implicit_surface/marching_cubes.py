@@ -0,0 +1,221 @@
+"""
+Vectorized marching cubes of an implicit surface f(x, y, z) = level. The grid is evaluated slab by
+slab along x (torch, or NumPy functions through torch tensors' __array__), each slab's cubes are
+classified with 8 shifted comparisons and only the cubes the surface crosses look up their triangles
+in a case table, all at once. Triangle corners are keyed by the grid edge they lie on, so vertices
+shared by neighbouring cubes (and neighbouring slabs) are deduplicated with np.unique. Normals are
+the normalized gradient of f at every vertex. Slabs run on a thread pool, torch and NumPy release
+the GIL.
+
+f < level is inside, triangles are counter-clockwise seen from outside (towards increasing f).
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+
+from mesh_3d.normals import pack_normals
+
+# Corner c sits at (c & 1, c >> 1 & 1, c >> 2 & 1); edge e joins EDGES[e][0] to EDGES[e][1] along EDGE_AXES[e]
+EDGES = [(corner, corner | 1 << axis) for axis in range(3) for corner in range(8) if not corner >> axis & 1]
+EDGE_AXES = [axis for axis in range(3) for corner in range(8) if not corner >> axis & 1]
+
+
+def _faces():
+    """ Corner cycles of the 6 faces, counter-clockwise seen from outside the cube """
+    faces = []
+    for axis in range(3):
+        u, v = 1 << (axis + 1) % 3, 1 << (axis + 2) % 3
+        for side in (0, 1):
+            base = side << axis
+            cycle = [base, base | u, base | u | v, base | v]
+            faces.append(cycle if side else cycle[::-1])
+    return faces
+
+
+def _case_triangles(case, faces=_faces()):
+    """
+    Triangles (as edge triples) of the corners set in `case` being inside. Every face contributes one
+    segment per run of inside corners along its cycle, so diagonal inside corners of a face are always
+    separated; the decision only depends on the face's own corners, so neighbouring cubes agree and
+    the surface has no cracks. The segments chain into closed loops, each triangulated as a fan.
+    """
+    edge_of = {frozenset(edge): index for index, edge in enumerate(EDGES)}
+    inside = [bool(case >> corner & 1) for corner in range(8)]
+    following = {}
+    for cycle in faces:
+        crossings = []
+        for k in range(4):
+            a, b = cycle[k], cycle[(k + 1) % 4]
+            if inside[a] != inside[b]:
+                crossings.append((edge_of[frozenset((a, b))], inside[b]))
+        # Rotate so the walk starts at an entry: entries and exits then alternate
+        while crossings and not crossings[0][1]:
+            crossings.append(crossings.pop(0))
+        for (entering, _), (leaving, _) in zip(crossings[0::2], crossings[1::2]):
+            following[entering] = leaving
+
+    triangles = []
+    while following:
+        start, next_edge = following.popitem()
+        loop = [start]
+        while next_edge != start:
+            loop.append(next_edge)
+            next_edge = following.pop(next_edge)
+        triangles.extend((loop[0], loop[i], loop[i + 1]) for i in range(1, len(loop) - 1))
+    return triangles
+
+
+def _case_table():
+    """ :return: (256, 15) int8 edge triples of every case, -1 padded (5 triangles at most), (256,) triangle counts """
+    table = np.full((256, 15), -1, dtype=np.int8)
+    counts = np.zeros(256, dtype=np.int64)
+    for case in range(256):
+        triangles = _case_triangles(case)
+        table[case, :3 * len(triangles)] = np.ravel(triangles)
+        counts[case] = len(triangles)
+    return table, counts
+
+
+TRIANGLES, TRIANGLE_COUNTS = _case_table()
+
+# Grid offset of every edge's first corner, and the axis it runs along
+EDGE_ORIGINS = np.array([[corner & 1, corner >> 1 & 1, corner >> 2 & 1] for corner, _ in EDGES], dtype=np.int64)
+EDGE_DIRECTIONS = np.array(EDGE_AXES, dtype=np.int64)
+
+
+def grid_axes(bounds, resolution):
+    """
+    :param bounds: ((x_min, x_max), (y_min, y_max), (z_min, z_max))
+    :param resolution: Grid vertices along every axis, or one count per axis
+    :return: [x, y, z] float32 sample positions
+    """
+    if isinstance(resolution, int):
+        resolution = (resolution,) * 3
+    if min(resolution) < 2:
+        raise Exception("Marching cubes needs at least 2 grid vertices along every axis")
+    return [np.linspace(low, high, count, dtype=np.float32) for (low, high), count in zip(bounds, resolution)]
+
+
+def is_torch_function(func):
+    """
+    Whether autograd can differentiate func: probed with inputs requiring grad, it has to return a
+    tensor attached to them. NumPy functions fail the probe, by raising (their ufuncs can't take
+    such tensors) or returning something detached (NumPy 2 wraps ufunc results back into tensors).
+    """
+    sample = torch.zeros(1, requires_grad=True)
+    try:
+        with torch.enable_grad():
+            values = func(sample, sample, sample)
+    except Exception:
+        return False
+    return isinstance(values, torch.Tensor) and values.grad_fn is not None
+
+
+def evaluate(func, x, y, z, differentiable):
+    """ func over the x, y, z grid, (len(x), len(y), len(z)) float32 """
+    if not differentiable:
+        # NumPy functions get NumPy arrays, not tensors NumPy would wrap its results back into
+        X, Y, Z = np.meshgrid(x, y, z, indexing="ij", copy=False)
+        values = func(X, Y, Z)
+        return np.broadcast_to(np.asarray(values, dtype=np.float32), X.shape)
+    X, Y, Z = torch.meshgrid(torch.from_numpy(x), torch.from_numpy(y), torch.from_numpy(z), indexing="ij")
+    with torch.no_grad():
+        values = func(X, Y, Z)
+    if isinstance(values, torch.Tensor):
+        values = values.numpy()
+    return np.broadcast_to(np.asarray(values, dtype=np.float32), X.shape)
+
+
+def gradient_normals(func, points, steps, differentiable):
+    """
+    Unit gradients of func at `points`, by one backward over all of them for torch functions, by
+    central differences `steps` wide otherwise.
+    :return: (N, 3) float32 tensor
+    """
+    if differentiable:
+        points = torch.from_numpy(points).requires_grad_(True)
+        with torch.enable_grad():
+            values = func(points[:, 0], points[:, 1], points[:, 2])
+            gradient = torch.autograd.grad(values.sum(), points, allow_unused=True)[0] if values.requires_grad else None
+        if gradient is None:
+            gradient = torch.zeros_like(points)
+    else:
+        gradient = np.empty_like(points)
+        for axis in range(3):
+            forward, backward = points.copy(), points.copy()
+            forward[:, axis] += steps[axis]
+            backward[:, axis] -= steps[axis]
+            gradient[:, axis] = (np.asarray(func(*forward.T)) - np.asarray(func(*backward.T))) / (2 * steps[axis])
+        gradient = torch.from_numpy(gradient)
+    return torch.nn.functional.normalize(gradient.detach().to(torch.float32), dim=1)
+
+
+def extract_slab(func, axes, level, start, stop, differentiable):
+    """
+    Surface in the cubes between x indices [start, stop).
+    :return: sorted edge keys, vertices (float32), packed normals (uint32), triangles (uint32 indices into the keys)
+    """
+    x, y, z = axes
+    values = evaluate(func, x[start:stop + 1], y, z, differentiable)
+    inside = values < level
+    nx, ny, nz = stop - start, len(y) - 1, len(z) - 1
+
+    cases = np.zeros((nx, ny, nz), dtype=np.uint8)
+    for corner in range(8):
+        dx, dy, dz = corner & 1, corner >> 1 & 1, corner >> 2 & 1
+        cases |= inside[dx:dx + nx, dy:dy + ny, dz:dz + nz] * np.uint8(1 << corner)
+
+    cubes = np.flatnonzero((cases != 0) & (cases != 255))
+    case = cases.ravel()[cubes]
+    edges = TRIANGLES[case]
+    # Valid entries lead every row, so the masked entries come cube after cube
+    local_edges = edges[edges >= 0].astype(np.int64)
+    owners = np.repeat(cubes, TRIANGLE_COUNTS[case] * 3)
+
+    # Key of a grid edge: its first vertex's flat index, times 3, plus its axis
+    i, j, k = np.unravel_index(owners, (nx, ny, nz))
+    origin = EDGE_ORIGINS[local_edges]
+    keys = (((i + start + origin[:, 0]) * (ny + 1) + j + origin[:, 1]) * (nz + 1) + k + origin[:, 2]) * 3 + EDGE_DIRECTIONS[local_edges]
+    keys, triangles = np.unique(keys, return_inverse=True)
+
+    axis, cell = keys % 3, keys // 3
+    gk, gj, gi = cell % (nz + 1), cell // (nz + 1) % (ny + 1), cell // ((nz + 1) * (ny + 1))
+    unit = np.eye(3, dtype=np.int64)[axis]
+    f0 = values[gi - start, gj, gk]
+    f1 = values[gi - start + unit[:, 0], gj + unit[:, 1], gk + unit[:, 2]]
+    # One end is inside and the other is not, f1 != f0
+    t = ((level - f0) / (f1 - f0)).astype(np.float32)[:, None]
+    first = np.column_stack((x[gi], y[gj], z[gk]))
+    last = np.column_stack((x[gi + unit[:, 0]], y[gj + unit[:, 1]], z[gk + unit[:, 2]]))
+    vertices = np.ascontiguousarray(first + t * (last - first), dtype=np.float32)
+
+    steps = [(axis_values[-1] - axis_values[0]) / (len(axis_values) - 1) / 2 for axis_values in axes]
+    normals = pack_normals(gradient_normals(func, vertices, steps, differentiable))
+    return keys, vertices, normals, triangles.astype(np.uint32).reshape(-1, 3)
+
+
+def marching_cubes(func, bounds, resolution, level=0.0, slab=16, workers=None):
+    """
+    :param func: f(x, y, z), element-wise over torch tensors or NumPy arrays
+    :param slab: Cubes along x per slab, bounds the memory of each evaluation
+    :param workers: Threads extracting slabs, None for the executor's default
+    :return: vertices (N, 3) float32, packed normals (N,) uint32, triangle indices (M,) uint32
+    """
+    axes = grid_axes(bounds, resolution)
+    differentiable = is_torch_function(func)
+    cubes = len(axes[0]) - 1
+    starts = range(0, cubes, slab)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        slabs = list(pool.map(
+            lambda start: extract_slab(func, axes, level, start, min(start + slab, cubes), differentiable), starts))
+
+    # Edges on the plane between two slabs were extracted by both, with the same values
+    keys, first, inverse = np.unique(np.concatenate([keys for keys, _, _, _ in slabs]),
+                                     return_index=True, return_inverse=True)
+    vertices = np.concatenate([vertices for _, vertices, _, _ in slabs])[first]
+    normals = np.concatenate([normals for _, _, normals, _ in slabs])[first]
+    offsets = np.cumsum([0] + [len(keys) for keys, _, _, _ in slabs[:-1]])
+    indices = np.concatenate([inverse.ravel()[offset + triangles].ravel() for offset, (_, _, _, triangles) in zip(offsets, slabs)])
+    return vertices, normals, indices.astype(np.uint32)
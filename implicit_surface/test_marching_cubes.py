@@ -0,0 +1,79 @@
+import collections
+
+import pytest
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+
+from implicit_surface.marching_cubes import marching_cubes, is_torch_function
+
+BOUNDS = ((-1.5, 1.5),) * 3
+
+
+def unpack_normals(packed):
+    """ Inverse of mesh_3d.normals.pack_normals """
+    components = np.stack([(packed.astype(np.int64) >> (10 * k)) & 0x3FF for k in range(3)], axis=1)
+    components = np.where(components >= 512, components - 1024, components)
+    return components / 511.0
+
+
+def torch_sphere(x, y, z):
+    return torch.sqrt(x * x + y * y + z * z) - 1
+
+
+def numpy_sphere(x, y, z):
+    return np.sqrt(x * x + y * y + z * z) - 1
+
+
+def numpy_gyroid(x, y, z):
+    return np.sin(x) * np.cos(y) + np.sin(y) * np.cos(z) + np.sin(z) * np.cos(x)
+
+
+def test_sphere_is_watertight_and_wound_outwards():
+    vertices, _, indices = marching_cubes(torch_sphere, BOUNDS, 24, slab=5)
+    triangles = indices.reshape(-1, 3)
+    assert len(triangles) > 0
+
+    # Every directed edge once, and its reverse once in the neighbouring triangle
+    edges = collections.Counter()
+    for a, b, c in triangles.tolist():
+        edges.update([(a, b), (b, c), (c, a)])
+    assert all(count == 1 and edges[(b, a)] == 1 for (a, b), count in edges.items())
+
+    # Counter-clockwise seen from outside: the face normal points away from the center
+    corners = vertices[triangles]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    assert np.all(np.einsum("ij,ij->i", normals, corners.mean(axis=1)) > 0)
+
+
+def test_vertices_lie_on_the_surface_and_slabs_share_them():
+    vertices, _, indices = marching_cubes(torch_sphere, BOUNDS, 32, slab=4)
+    assert np.allclose(np.linalg.norm(vertices, axis=1), 1.0, atol=0.02)
+    # Deduplicated across slabs: no two vertices at the same place
+    assert len(np.unique(np.round(vertices, 5), axis=0)) == len(vertices)
+    assert indices.max() < len(vertices)
+
+
+@pytest.mark.parametrize("func", [torch_sphere, numpy_sphere])
+def test_normals_follow_the_gradient(func):
+    vertices, normals, _ = marching_cubes(func, BOUNDS, 16)
+    outward = vertices / np.linalg.norm(vertices, axis=1, keepdims=True)
+    assert np.all(np.einsum("ij,ij->i", unpack_normals(normals), outward) > 0.95)
+
+
+def test_numpy_fields_use_central_differences():
+    assert is_torch_function(torch_sphere)
+    assert not is_torch_function(numpy_sphere)
+    assert not is_torch_function(numpy_gyroid)
+
+    vertices, normals, indices = marching_cubes(numpy_gyroid, ((-3, 3),) * 3, 24)
+    assert len(indices) > 0
+    assert np.all(np.abs(numpy_gyroid(*vertices.T.astype(np.float64))) < 0.1)
+    assert np.all(np.linalg.norm(unpack_normals(normals), axis=1) > 0.9)
+
+
+@pytest.mark.filterwarnings("error::DeprecationWarning")
+def test_numpy_fields_are_evaluated_on_numpy_arrays():
+    # A tensor in a NumPy field has its results wrapped back by the deprecated __array_wrap__
+    vertices, _, indices = marching_cubes(numpy_sphere, BOUNDS, 12, slab=3)
+    assert len(indices) > 0 and vertices.dtype == np.float32
@@ -1,6 +1,5 @@
 from .shader import *
 import OpenGL.GL as GL
-import cv2
 
 
 
@@ -17,7 +16,8 @@ class VAO(object):
 
 
     def add_vbo(self, location, data,
-               ncomponents=3, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None, draw_type=GL.GL_STATIC_DRAW):
+               ncomponents=3, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None, draw_type=GL.GL_STATIC_DRAW,
+               divisor=0):
         self.activate()
         buffer_idx = GL.glGenBuffers(1)
         GL.glBindBuffer(GL.GL_ARRAY_BUFFER, buffer_idx)
@@ -25,6 +25,9 @@ class VAO(object):
         #location = GL.glGetAttribLocation(self.shader.render_idx, name)
         GL.glVertexAttribPointer(location, ncomponents, dtype, normalized, stride, offset)
         GL.glEnableVertexAttribArray(location)
+        if divisor:
+            # Per-instance attribute, advanced once every `divisor` instances
+            GL.glVertexAttribDivisor(location, divisor)
         self.vbo[location] = buffer_idx
         self.deactivate()
 
@@ -55,6 +58,8 @@ class UManager(object):
 
     @staticmethod
     def load_texture(filename):
+        # Only texture loading needs OpenCV, keep it out of every model's import
+        import cv2
         texture = cv2.cvtColor(cv2.imread(filename, 1), cv2.COLOR_BGR2RGB)
         return texture
 
@@ -113,10 +118,10 @@ class UManager(object):
         location = GL.glGetUniformLocation(self.shader.render_idx, name)
         GL.glUniform4fv(location, 1, vector)
 
-    def upload_uniform_vector3fv(self, vector, name):
+    def upload_uniform_vector3fv(self, vector, name, count=1):
         GL.glUseProgram(self.shader.render_idx)
         location = GL.glGetUniformLocation(self.shader.render_idx, name)
-        GL.glUniform3fv(location, 1, vector)
+        GL.glUniform3fv(location, count, vector)
 
     def upload_uniform_scalar1f(self, scalar, name):
         GL.glUseProgram(self.shader.render_idx)
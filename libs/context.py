@@ -0,0 +1,280 @@
+import os
+import time
+import ctypes
+from abc import ABC, abstractmethod
+
+import glfw
+import numpy as np
+import OpenGL.GL as GL
+
+HEADLESS_BACKENDS = ("egl", "osmesa")
+
+
+def default_backend():
+    """ PyOpenGL binds its platform on first import, so the headless choice comes from PYOPENGL_PLATFORM """
+    platform = os.environ.get("PYOPENGL_PLATFORM", "").lower()
+    return platform if platform in HEADLESS_BACKENDS else "glfw"
+
+
+def create_context(width, height, title="Viewer", backend=None, max_frames=None):
+    """
+    Create the OpenGL context the viewers render with.
+    :param backend: "glfw" (window), "egl" (surfaceless EGL) or "osmesa" (llvmpipe), default from default_backend()
+    :param max_frames: Headless only, number of frames to render before should_close() turns True
+    """
+    backend = backend or default_backend()
+    if backend == "glfw":
+        return GlfwContext(width, height, title)
+
+    if os.environ.get("PYOPENGL_PLATFORM", "").lower() != backend:
+        raise Exception(f"Set PYOPENGL_PLATFORM={backend} before OpenGL is imported to use the {backend} backend")
+
+    if backend == "egl":
+        return EGLContext(width, height, max_frames=max_frames)
+    if backend == "osmesa":
+        return OSMesaContext(width, height, max_frames=max_frames)
+    raise Exception(f"Unknown context backend: {backend}")
+
+
+class GlfwContext:
+    """ Context owned by a GLFW window, the default render target is the window framebuffer """
+    interactive = True
+
+    def __init__(self, width, height, title="Viewer"):
+        glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 3)
+        glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 3)
+        glfw.window_hint(glfw.OPENGL_FORWARD_COMPAT, GL.GL_TRUE)
+        glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
+        glfw.window_hint(glfw.RESIZABLE, False)
+
+        self.win = glfw.create_window(width, height, title, None, None)
+
+        if not self.win:
+            raise Exception("Failed to create GLFW Window")
+
+        # make win's OpenGL context current; no OpenGL calls can happen before
+        glfw.make_context_current(self.win)
+
+        self.width, self.height = width, height
+        self.framebuffer = 0
+
+    def make_current(self):
+        glfw.make_context_current(self.win)
+
+    def should_close(self):
+        return glfw.window_should_close(self.win)
+
+    def set_should_close(self, value=True):
+        glfw.set_window_should_close(self.win, value)
+
+    def swap_buffers(self):
+        glfw.swap_buffers(self.win)
+
+    def swap_interval(self, interval):
+        glfw.swap_interval(interval)
+
+    def poll_events(self):
+        glfw.poll_events()
+
+    def wait_events_timeout(self, timeout):
+        glfw.wait_events_timeout(timeout)
+
+    def get_time(self):
+        return glfw.get_time()
+
+    def set_key_callback(self, callback):
+        glfw.set_key_callback(self.win, callback)
+
+    def set_cursor_pos_callback(self, callback):
+        glfw.set_cursor_pos_callback(self.win, callback)
+
+    def set_refresh_callback(self, callback):
+        glfw.set_window_refresh_callback(self.win, callback)
+        glfw.set_window_focus_callback(self.win, lambda win, _focused: callback(win))
+
+    def disable_cursor(self):
+        glfw.set_input_mode(self.win, glfw.CURSOR, glfw.CURSOR_DISABLED)
+
+    def destroy(self):
+        glfw.destroy_window(self.win)
+
+
+class HeadlessContext(ABC):
+    """
+    Window-less context: the default render target is an FBO of the requested size.
+    Input callbacks are accepted and never fire, swap_buffers only counts frames.
+    Backends (EGLContext, OSMesaContext) implement _create_context.
+    """
+    interactive = False
+
+    def __init__(self, width, height, max_frames=None):
+        self.win = None
+        self.width, self.height = width, height
+        self.max_frames = max_frames
+        self.frame_count = 0
+        self.closing = False
+        self.start_time = time.perf_counter()
+
+        self._create_context()
+        self.framebuffer, self.render_buffers = self._create_target()
+
+    @abstractmethod
+    def _create_context(self):
+        """ Create the backend's context and make it current, before the FBO target is created """
+
+    def _create_target(self):
+        framebuffer = GL.glGenFramebuffers(1)
+        color, depth = GL.glGenRenderbuffers(2)
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, framebuffer)
+
+        GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, color)
+        GL.glRenderbufferStorage(GL.GL_RENDERBUFFER, GL.GL_RGBA8, self.width, self.height)
+        GL.glFramebufferRenderbuffer(GL.GL_FRAMEBUFFER, GL.GL_COLOR_ATTACHMENT0, GL.GL_RENDERBUFFER, color)
+
+        GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, depth)
+        GL.glRenderbufferStorage(GL.GL_RENDERBUFFER, GL.GL_DEPTH24_STENCIL8, self.width, self.height)
+        GL.glFramebufferRenderbuffer(GL.GL_FRAMEBUFFER, GL.GL_DEPTH_STENCIL_ATTACHMENT, GL.GL_RENDERBUFFER, depth)
+
+        if GL.glCheckFramebufferStatus(GL.GL_FRAMEBUFFER) != GL.GL_FRAMEBUFFER_COMPLETE:
+            raise Exception("Headless default framebuffer is incomplete")
+
+        GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, 0)
+        GL.glViewport(0, 0, self.width, self.height)
+        return framebuffer, [color, depth]
+
+    def read_pixels(self):
+        """ RGB uint8 image of the default target, top row first """
+        GL.glBindFramebuffer(GL.GL_READ_FRAMEBUFFER, self.framebuffer)
+        GL.glPixelStorei(GL.GL_PACK_ALIGNMENT, 1)
+        data = GL.glReadPixels(0, 0, self.width, self.height, GL.GL_RGB, GL.GL_UNSIGNED_BYTE)
+        image = np.frombuffer(data, dtype=np.uint8).reshape((self.height, self.width, 3))
+        return image[::-1]
+
+    def make_current(self):
+        pass
+
+    def should_close(self):
+        return self.closing or (self.max_frames is not None and self.frame_count >= self.max_frames)
+
+    def set_should_close(self, value=True):
+        self.closing = value
+
+    def swap_buffers(self):
+        GL.glFlush()
+        self.frame_count += 1
+
+    def swap_interval(self, interval):
+        pass
+
+    def poll_events(self):
+        pass
+
+    def wait_events_timeout(self, timeout):
+        pass
+
+    def get_time(self):
+        return time.perf_counter() - self.start_time
+
+    def set_key_callback(self, callback):
+        pass
+
+    def set_cursor_pos_callback(self, callback):
+        pass
+
+    def set_refresh_callback(self, callback):
+        pass
+
+    def disable_cursor(self):
+        pass
+
+    def destroy(self):
+        GL.glDeleteRenderbuffers(2, self.render_buffers)
+        GL.glDeleteFramebuffers(1, [self.framebuffer])
+
+
+class EGLContext(HeadlessContext):
+    """ Surfaceless EGL context (GPU driver or Mesa), needs PYOPENGL_PLATFORM=egl """
+    def _create_context(self):
+        from OpenGL import EGL
+        from OpenGL import arrays
+
+        # Mesa picks its surfaceless platform when no display server is around
+        os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+
+        self.display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+        major, minor = ctypes.c_long(), ctypes.c_long()
+        if not EGL.eglInitialize(self.display, major, minor):
+            raise Exception("Failed to initialize EGL display")
+
+        config_attributes = arrays.GLintArray.asArray([
+            EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+            EGL.EGL_RED_SIZE, 8,
+            EGL.EGL_GREEN_SIZE, 8,
+            EGL.EGL_BLUE_SIZE, 8,
+            EGL.EGL_DEPTH_SIZE, 24,
+            EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+            EGL.EGL_NONE
+        ])
+        context_attributes = arrays.GLintArray.asArray([
+            EGL.EGL_CONTEXT_MAJOR_VERSION, 3,
+            EGL.EGL_CONTEXT_MINOR_VERSION, 3,
+            EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK, EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT,
+            EGL.EGL_NONE
+        ])
+
+        configs = (EGL.EGLConfig * 1)()
+        num_configs = ctypes.c_long()
+        if not EGL.eglChooseConfig(self.display, config_attributes, configs, 1, num_configs) or num_configs.value == 0:
+            raise Exception("No EGL config supports an OpenGL 3.3 core context")
+
+        EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+        self.context = EGL.eglCreateContext(self.display, configs[0], EGL.EGL_NO_CONTEXT, context_attributes)
+        if self.context == EGL.EGL_NO_CONTEXT:
+            raise Exception("Failed to create EGL context")
+
+        # No surface at all, everything renders into the FBO target
+        if not EGL.eglMakeCurrent(self.display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, self.context):
+            raise Exception("Failed to make the EGL context current (EGL_KHR_surfaceless_context missing?)")
+
+    def make_current(self):
+        from OpenGL import EGL
+        EGL.eglMakeCurrent(self.display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, self.context)
+
+    def destroy(self):
+        from OpenGL import EGL
+        super().destroy()
+        EGL.eglDestroyContext(self.display, self.context)
+        EGL.eglTerminate(self.display)
+
+
+class OSMesaContext(HeadlessContext):
+    """ Software (llvmpipe) OSMesa context, needs PYOPENGL_PLATFORM=osmesa """
+    def _create_context(self):
+        from OpenGL import osmesa
+        from OpenGL import arrays
+
+        attributes = arrays.GLintArray.asArray([
+            osmesa.OSMESA_FORMAT, osmesa.OSMESA_RGBA,
+            osmesa.OSMESA_DEPTH_BITS, 24,
+            osmesa.OSMESA_PROFILE, osmesa.OSMESA_CORE_PROFILE,
+            osmesa.OSMESA_CONTEXT_MAJOR_VERSION, 3,
+            osmesa.OSMESA_CONTEXT_MINOR_VERSION, 3,
+            0
+        ])
+        self.context = osmesa.OSMesaCreateContextAttribs(attributes, None)
+        if not self.context:
+            raise Exception("Failed to create OSMesa context")
+
+        # OSMesa needs a client buffer to be current, rendering still goes to the FBO target
+        self.buffer = arrays.GLubyteArray.zeros((self.height, self.width, 4))
+        self.make_current()
+
+    def make_current(self):
+        from OpenGL import osmesa
+        if not osmesa.OSMesaMakeCurrent(self.context, self.buffer, GL.GL_UNSIGNED_BYTE, self.width, self.height):
+            raise Exception("Failed to make the OSMesa context current")
+
+    def destroy(self):
+        from OpenGL import osmesa
+        super().destroy()
+        osmesa.OSMesaDestroyContext(self.context)
@@ -0,0 +1,32 @@
+"""
+Vectorized conversions from the depth buffer of a T.perspective projection to metric values.
+All maps are (height, width) float32 arrays with the top row first, as returned by RenderTarget.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+
+def linearize_depth(depth, near, far):
+    """ Window-space depth in [0, 1] to positive eye-space z (distance along the view axis) """
+    z_ndc = 2.0 * np.asarray(depth, dtype=np.float32) - 1.0
+    return (2.0 * near * far) / (far + near - z_ndc * (far - near))
+
+
+@lru_cache(maxsize=16)
+def ray_lengths(width, height, fovy, aspect):
+    """ Length of the eye-space ray through each pixel center, scaled so that its z component is 1 """
+    tan_half = np.tan(np.radians(fovy) / 2.0)
+    x = ((np.arange(width, dtype=np.float32) + 0.5) / width * 2.0 - 1.0) * tan_half * aspect
+    y = (1.0 - (np.arange(height, dtype=np.float32) + 0.5) / height * 2.0) * tan_half
+    lengths = np.sqrt(1.0 + x[None, :] ** 2 + y[:, None] ** 2).astype(np.float32)
+    lengths.setflags(write=False)
+    return lengths
+
+
+def depth_to_distance(depth, fovy, aspect, near, far):
+    """ Euclidean distance from the camera per pixel, inf where nothing was drawn (depth == 1) """
+    depth = np.asarray(depth, dtype=np.float32)
+    distance = linearize_depth(depth, near, far) * ray_lengths(depth.shape[1], depth.shape[0], float(fovy), float(aspect))
+    distance[depth >= 1.0] = np.inf
+    return distance.astype(np.float32, copy=False)
@@ -0,0 +1,69 @@
+import os
+import queue
+import threading
+
+import cv2
+import numpy as np
+
+
+class AsyncFrameWriter:
+    """
+    Encodes and writes numbered frames on a pool of worker threads.
+    The queue is bounded: submit() blocks once max_pending frames wait, so a slow disk
+    throttles the renderer instead of growing memory without limit.
+    """
+    def __init__(self, output_dir, workers=4, max_pending=32):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.written = 0
+        self.errors = []
+        self.lock = threading.Lock()
+
+        self.workers = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, index, color=None, depth=None):
+        """
+        :param index: Frame number, used for the file names (000042_color.png, 000042_depth.npy)
+        :param color: RGB uint8 image, top row first
+        :param depth: float32 depth map
+        """
+        self.queue.put((index, color, depth))
+
+    def pending(self):
+        return self.queue.qsize()
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+            try:
+                self._write(*item)
+                with self.lock:
+                    self.written += 1
+            except Exception as error:
+                with self.lock:
+                    self.errors.append(error)
+            finally:
+                self.queue.task_done()
+
+    def _write(self, index, color, depth):
+        prefix = os.path.join(self.output_dir, f"{index:06d}")
+        if color is not None:
+            cv2.imwrite(prefix + "_color.png", cv2.cvtColor(np.ascontiguousarray(color), cv2.COLOR_RGB2BGR))
+        if depth is not None:
+            np.save(prefix + "_depth.npy", depth)
+
+    def close(self):
+        """ Wait for the backlog to drain and stop the workers """
+        for _ in self.workers:
+            self.queue.put(None)
+        for worker in self.workers:
+            worker.join()
+        if self.errors:
+            raise Exception(f"{len(self.errors)} frames failed to write, first error: {self.errors[0]}")
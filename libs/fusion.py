@@ -0,0 +1,267 @@
+"""
+Multi-view depth fusion: unproject float distance maps from several cameras into one
+voxel-downsampled point cloud or a voxel-hashed TSDF volume, then stream it to .ply/.npy.
+
+Distance maps are the (height, width) float32 arrays of MultiplesView.read_depth/read_distance
+or BatchRenderer (Euclidean distance to the camera, inf or 0 where nothing was hit).
+Work is split into row chunks of every view and runs in a process pool, with a bounded number of
+chunks in flight; their per-voxel sums are merged in batches (see VoxelSums).
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+KEY_BITS = 21
+KEY_OFFSET = 1 << (KEY_BITS - 1)
+KEY_MASK = (1 << KEY_BITS) - 1
+
+# Chunk entries gathered before the first reduction
+MIN_BATCH = 1 << 20
+
+
+def camera_parameters(camera):
+    """ Plain (picklable) intrinsics/extrinsics of a multiple_viewers.Camera """
+    return dict(
+        position=np.asarray(camera.position, dtype=np.float32),
+        front=np.asarray(camera.front, dtype=np.float32),
+        up=np.asarray(camera.up, dtype=np.float32),
+        fov=float(camera.fov),
+        aspect_ratio=float(camera.aspect_ratio),
+    )
+
+
+def pixel_rays(width, height, params, row_start=0, row_stop=None):
+    """ Unit world-space ray directions through the pixel centers of rows [row_start, row_stop), top row first """
+    row_stop = height if row_stop is None else row_stop
+    front = params["front"] / np.linalg.norm(params["front"])
+    right = np.cross(front, params["up"])
+    right /= np.linalg.norm(right)
+    up = np.cross(right, front)
+
+    tan_half = np.tan(np.radians(params["fov"]) / 2.0)
+    x = ((np.arange(width, dtype=np.float32) + 0.5) / width * 2.0 - 1.0) * tan_half * params["aspect_ratio"]
+    y = (1.0 - (np.arange(row_start, row_stop, dtype=np.float32) + 0.5) / height * 2.0) * tan_half
+
+    rays = x[None, :, None] * right + y[:, None, None] * up + front
+    rays /= np.linalg.norm(rays, axis=-1, keepdims=True)
+    return rays.astype(np.float32)
+
+
+def unproject(distance, params, row_start=0, height=None, colors=None):
+    """
+    World-space points of every valid pixel.
+    :param distance: (rows, width) distances, a row chunk starting at row_start of a full map of `height` rows
+    :return: (N, 3) float32 points and their (N, 3) colors (or None)
+    """
+    rows, width = distance.shape
+    height = rows if height is None else height
+    rays = pixel_rays(width, height, params, row_start, row_start + rows)
+
+    valid = np.isfinite(distance) & (distance > 0)
+    points = params["position"] + rays[valid] * distance[valid][:, None]
+    return points.astype(np.float32), (colors[valid] if colors is not None else None)
+
+
+def voxel_keys(points, voxel_size):
+    """ Pack integer voxel coordinates into one int64 hash key per point """
+    coords = np.floor(points / voxel_size).astype(np.int64) + KEY_OFFSET
+    return (coords[:, 0] << (2 * KEY_BITS)) | (coords[:, 1] << KEY_BITS) | coords[:, 2]
+
+
+def voxel_centers(keys, voxel_size):
+    coords = np.stack([(keys >> (2 * KEY_BITS)) & KEY_MASK, (keys >> KEY_BITS) & KEY_MASK, keys & KEY_MASK], axis=1)
+    return ((coords - KEY_OFFSET + 0.5) * voxel_size).astype(np.float32)
+
+
+def reduce_by_key(keys, values, weights):
+    """ Sum values and weights of identical keys, values are (N, C) """
+    unique, inverse = np.unique(keys, return_inverse=True)
+    summed = np.zeros((len(unique), values.shape[1]), dtype=np.float64)
+    np.add.at(summed, inverse, values)
+    return unique, summed, np.bincount(inverse, weights=weights, minlength=len(unique))
+
+
+def _points_chunk(distance, params, row_start, height, colors, voxel_size):
+    points, colors = unproject(distance, params, row_start, height, colors)
+    if colors is not None and np.issubdtype(colors.dtype, np.integer):
+        colors = colors.astype(np.float32) / 255.0
+    values = points if colors is None else np.hstack([points, colors.astype(np.float32)])
+    return reduce_by_key(voxel_keys(points, voxel_size), values, np.ones(len(points)))
+
+
+def _tsdf_chunk(distance, params, row_start, height, colors, voxel_size, truncation):
+    rows, width = distance.shape
+    rays = pixel_rays(width, height, params, row_start, row_start + rows)
+    valid = np.isfinite(distance) & (distance > 0)
+    rays, surface = rays[valid], distance[valid]
+
+    # Samples every half voxel inside the truncation band around the observed surface
+    offsets = np.arange(-truncation, truncation + 1e-6, voxel_size / 2, dtype=np.float32)
+    t = surface[:, None] + offsets[None, :]
+    points = params["position"] + rays[:, None, :] * t[..., None]
+    sdf = np.clip(-offsets / truncation, -1.0, 1.0)
+
+    keys = voxel_keys(points.reshape(-1, 3), voxel_size)
+    values = np.broadcast_to(sdf, t.shape).reshape(-1, 1)
+    return reduce_by_key(keys, values, np.ones(len(keys)))
+
+
+class VoxelSums:
+    """
+    Per-voxel sums of chunk results. Chunks are kept as they arrive and reduced in batches at least
+    as large as what is already reduced, so every entry is re-sorted a logarithmic number of times
+    instead of once for each chunk that follows it. reduce() before reading keys, sums or weights.
+    """
+    def __init__(self, columns=None):
+        self.keys = np.empty(0, dtype=np.int64)
+        self.sums = np.empty((0, columns or 0), dtype=np.float64)
+        self.weights = np.empty(0, dtype=np.float64)
+        self.columns = columns
+        self.pending = []
+        self.pending_size = 0
+
+    def merge(self, keys, sums, weights):
+        if self.columns is None:
+            self.columns = sums.shape[1]
+            self.sums = np.empty((0, self.columns), dtype=np.float64)
+        elif sums.shape[1] != self.columns:
+            raise Exception("Mixing views with and without colors")
+        self.pending.append((keys, sums, weights))
+        self.pending_size += len(keys)
+        if self.pending_size >= max(len(self.keys), MIN_BATCH):
+            self.reduce()
+
+    def reduce(self):
+        if not self.pending:
+            return
+        keys, sums, weights = zip(*self.pending)
+        self.keys, self.sums, self.weights = reduce_by_key(
+            np.concatenate((self.keys,) + keys),
+            np.vstack((self.sums,) + sums),
+            np.concatenate((self.weights,) + weights)
+        )
+        self.pending, self.pending_size = [], 0
+
+
+class PointCloudFusion(VoxelSums):
+    """ Voxel-downsampled point cloud, one averaged point (and color) per occupied voxel """
+    def __init__(self, voxel_size=0.05):
+        super().__init__()
+        self.voxel_size = voxel_size
+
+    def chunk_task(self, distance, params, row_start, height, colors):
+        return _points_chunk, (distance, params, row_start, height, colors, self.voxel_size)
+
+    def points(self):
+        """ (N, 3) points and (N, 3) colors or None """
+        self.reduce()
+        means = (self.sums / self.weights[:, None]).astype(np.float32)
+        return means[:, :3], (means[:, 3:] if means.shape[1] > 3 else None)
+
+
+class TSDFVolume(VoxelSums):
+    """ Truncated signed distance function stored sparsely, keyed by voxel hash """
+    def __init__(self, voxel_size=0.05, truncation=None):
+        super().__init__(columns=1)
+        self.voxel_size = voxel_size
+        self.truncation = truncation or 4 * voxel_size
+
+    def chunk_task(self, distance, params, row_start, height, colors):
+        return _tsdf_chunk, (distance, params, row_start, height, colors, self.voxel_size, self.truncation)
+
+    def tsdf(self):
+        self.reduce()
+        return (self.sums[:, 0] / self.weights).astype(np.float32)
+
+    def points(self, min_weight=1.0):
+        """ Centers of the voxels the surface passes through, (N, 3) and no colors """
+        band = 0.5 * self.voxel_size / self.truncation
+        keep = (np.abs(self.tsdf()) <= band) & (self.weights >= min_weight)
+        return voxel_centers(self.keys[keep], self.voxel_size), None
+
+
+def fuse_views(views, fusion, workers=None, chunk_rows=64, in_flight=None):
+    """
+    Integrate views into a PointCloudFusion or TSDFVolume using a process pool.
+    :param views: Iterable of (distance, params) or (distance, params, colors) with params from camera_parameters(),
+        read lazily so a generator only holds the views whose chunks are in flight
+    :param workers: Pool size, None uses every core and 0 runs in this process
+    :param chunk_rows: Rows of one view handled by one task
+    :param in_flight: Most chunks submitted and not merged yet, twice the pool size when None
+    """
+    def tasks():
+        for view in views:
+            distance, params = view[0], view[1]
+            colors = view[2] if len(view) > 2 else None
+            height = distance.shape[0]
+            for row_start in range(0, height, chunk_rows):
+                rows = slice(row_start, row_start + chunk_rows)
+                yield fusion.chunk_task(
+                    distance[rows], params, row_start, height, colors[rows] if colors is not None else None
+                )
+
+    if workers == 0:
+        for function, arguments in tasks():
+            fusion.merge(*function(*arguments))
+        fusion.reduce()
+        return fusion
+
+    in_flight = in_flight or 2 * (workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Merged in submission order, the oldest chunk is waited for once the window is full
+        futures = deque()
+        for function, arguments in tasks():
+            if len(futures) == in_flight:
+                fusion.merge(*futures.popleft().result())
+            futures.append(pool.submit(function, *arguments))
+        while futures:
+            fusion.merge(*futures.popleft().result())
+    fusion.reduce()
+    return fusion
+
+
+def write_ply(path, points, colors=None, chunk_size=1_000_000):
+    """ Binary little-endian PLY, written in chunks so the whole vertex record is never built at once """
+    vertex_type = [("x", "<f4"), ("y", "<f4"), ("z", "<f4")]
+    if colors is not None:
+        vertex_type += [("red", "u1"), ("green", "u1"), ("blue", "u1")]
+
+    header = ["ply", "format binary_little_endian 1.0", f"element vertex {len(points)}"]
+    header += [f"property {'float' if kind == '<f4' else 'uchar'} {name}" for name, kind in vertex_type]
+    header += ["end_header", ""]
+
+    with open(path, "wb") as file:
+        file.write("\n".join(header).encode("ascii"))
+        for start in range(0, len(points), chunk_size):
+            stop = start + chunk_size
+            record = np.empty(len(points[start:stop]), dtype=vertex_type)
+            record["x"], record["y"], record["z"] = points[start:stop].T
+            if colors is not None:
+                rgb = np.clip(np.asarray(colors[start:stop]) * 255.0, 0, 255).astype(np.uint8)
+                record["red"], record["green"], record["blue"] = rgb.T
+            file.write(record.tobytes())
+
+
+def write_npy(path, points, colors=None, chunk_size=1_000_000):
+    """ (N, 3) or (N, 6) float32 .npy, filled in chunks through a memory map """
+    columns = 3 if colors is None else 6
+    output = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(len(points), columns))
+    for start in range(0, len(points), chunk_size):
+        stop = start + chunk_size
+        output[start:stop, :3] = points[start:stop]
+        if colors is not None:
+            output[start:stop, 3:] = colors[start:stop]
+    output.flush()
+    del output
+
+
+def save(path, fusion):
+    """ Write the fused result, the extension picks .ply or .npy """
+    points, colors = fusion.points()
+    if os.path.splitext(path)[1].lower() == ".ply":
+        write_ply(path, points, colors)
+    else:
+        write_npy(path, points, colors)
+    return len(points)
@@ -0,0 +1,184 @@
+"""
+Per-pass CPU/GPU frame profiler.
+
+    profiler = FrameProfiler()
+    profiler.begin_frame()
+    with profiler.scope("camera[0]"):
+        with profiler.scope("camera[0]/Mesh3D#0"):
+            drawable.draw(...)
+    profiler.end_frame()
+    ...
+    profiler.write_csv("profile.csv")
+    profiler.write_chrome_trace("trace.json")   # chrome://tracing or ui.perfetto.dev
+
+CPU time comes from time.perf_counter. GPU time comes from a pair of GL_TIMESTAMP queries per scope,
+which (unlike GL_TIME_ELAPSED) may nest. A frame's queries are only read back `latency` frames later,
+once the last one is available, so collecting results never stalls the pipeline.
+"""
+import csv
+import json
+import time
+from collections import defaultdict, deque, namedtuple
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+import OpenGL.GL as GL
+
+Scope = namedtuple("Scope", ["name", "start", "duration", "start_query", "stop_query"])
+
+PERCENTILES = (50, 95, 99)
+
+
+class NullProfiler:
+    """ Stand-in when profiling is off, every scope is a no-op """
+    def begin_frame(self):
+        pass
+
+    def end_frame(self):
+        pass
+
+    def scope(self, name):
+        return nullcontext()
+
+
+class FrameProfiler:
+    def __init__(self, window=300, gpu=True, latency=2, max_events=200_000):
+        """
+        :param window: Frames kept per scope for the rolling statistics
+        :param gpu: Also time scopes on the GPU with timestamp queries
+        :param latency: Frames to wait before reading a frame's queries back
+        :param max_events: Scopes kept for the Chrome trace, the oldest are dropped
+        """
+        self.window = window
+        self.gpu = gpu
+        self.latency = latency
+
+        self.cpu_times = defaultdict(lambda: deque(maxlen=window))
+        self.gpu_times = defaultdict(lambda: deque(maxlen=window))
+        self.events = deque(maxlen=max_events)
+
+        self.frame_index = 0
+        self.frame_start = None
+        self.current = None
+
+        self.free_queries = []
+        self.pending = deque()  # (frame index, frame start, scopes), oldest first
+
+    def _query(self):
+        if self.free_queries:
+            return self.free_queries.pop()
+        return int(GL.glGenQueries(1))
+
+    def _timestamp(self):
+        query = self._query()
+        GL.glQueryCounter(query, GL.GL_TIMESTAMP)
+        return query
+
+    def begin_frame(self):
+        self.current = []
+        self.frame_start = time.perf_counter()
+
+    @contextmanager
+    def scope(self, name):
+        """ Time the enclosed block on the CPU and the GPU, scopes outside begin/end_frame are ignored """
+        if self.current is None:
+            yield
+            return
+
+        start_query = self._timestamp() if self.gpu else None
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            stop_query = self._timestamp() if self.gpu else None
+            self.current.append(Scope(name, start, duration, start_query, stop_query))
+
+    def end_frame(self):
+        if self.current is None:
+            return
+        self.cpu_times["frame"].append((time.perf_counter() - self.frame_start) * 1000.0)
+        self.pending.append((self.frame_index, self.frame_start, self.current))
+        self.current = None
+        self.frame_index += 1
+        self.collect()
+
+    def collect(self, wait=False):
+        """ Read back the finished frames, wait=True blocks until every pending frame is in """
+        while self.pending:
+            frame, frame_start, scopes = self.pending[0]
+            if not wait and self.frame_index - frame < self.latency:
+                break
+            if self.gpu and scopes and not wait:
+                # Queries complete in order, the frame's last one being ready means all are
+                if not GL.glGetQueryObjectiv(scopes[-1].stop_query, GL.GL_QUERY_RESULT_AVAILABLE):
+                    break
+            self.pending.popleft()
+            self._record(frame, frame_start, scopes)
+
+    def _record(self, frame, frame_start, scopes):
+        gpu = {}
+        for index, scope in enumerate(scopes):
+            if scope.start_query is not None:
+                gpu[index] = (
+                    int(GL.glGetQueryObjectui64v(scope.start_query, GL.GL_QUERY_RESULT)),
+                    int(GL.glGetQueryObjectui64v(scope.stop_query, GL.GL_QUERY_RESULT))
+                )
+                self.free_queries += [scope.start_query, scope.stop_query]
+        # GPU timestamps have their own origin, line the frame up with its CPU start
+        gpu_origin = min((start for start, _ in gpu.values()), default=0)
+
+        for index, scope in enumerate(scopes):
+            self.cpu_times[scope.name].append(scope.duration * 1000.0)
+            self.events.append(dict(
+                name=scope.name, ph="X", pid=0, tid="cpu", args=dict(frame=frame),
+                ts=scope.start * 1e6, dur=scope.duration * 1e6
+            ))
+            if index in gpu:
+                start, stop = gpu[index]
+                self.gpu_times[scope.name].append((stop - start) / 1e6)
+                self.events.append(dict(
+                    name=scope.name, ph="X", pid=0, tid="gpu", args=dict(frame=frame),
+                    ts=frame_start * 1e6 + (start - gpu_origin) / 1e3, dur=(stop - start) / 1e3
+                ))
+
+    def summary(self):
+        """ {scope: {count, cpu_mean_ms, cpu_p50_ms, ..., gpu_mean_ms, ...}} over the rolling window """
+        result = {}
+        for name in sorted(set(self.cpu_times) | set(self.gpu_times)):
+            row = dict(count=len(self.cpu_times[name]))
+            for kind, times in (("cpu", self.cpu_times.get(name)), ("gpu", self.gpu_times.get(name))):
+                if not times:
+                    continue
+                values = np.fromiter(times, dtype=np.float64)
+                row[f"{kind}_mean_ms"] = float(values.mean())
+                for percentile, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+                    row[f"{kind}_p{percentile}_ms"] = float(value)
+            result[name] = row
+        return result
+
+    def report(self):
+        lines = [f"{'scope':40s} {'cpu mean':>9s} {'cpu p95':>9s} {'gpu mean':>9s} {'gpu p95':>9s}"]
+        for name, row in self.summary().items():
+            values = [row.get(key) for key in ("cpu_mean_ms", "cpu_p95_ms", "gpu_mean_ms", "gpu_p95_ms")]
+            lines.append(f"{name:40s} " + " ".join(f"{value:9.3f}" if value is not None else f"{'-':>9s}" for value in values))
+        return "\n".join(lines)
+
+    def write_csv(self, path):
+        summary = self.summary()
+        columns = ["scope"] + sorted({key for row in summary.values() for key in row})
+        with open(path, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=columns)
+            writer.writeheader()
+            for name, row in summary.items():
+                writer.writerow(dict(scope=name, **row))
+
+    def write_json(self, path):
+        with open(path, "w") as file:
+            json.dump(self.summary(), file, indent=2)
+
+    def write_chrome_trace(self, path):
+        """ Trace Event Format file, the cpu and gpu timelines show up as two threads """
+        self.collect(wait=True)
+        with open(path, "w") as file:
+            json.dump(dict(traceEvents=list(self.events), displayTimeUnit="ms"), file)
@@ -0,0 +1,123 @@
+import ctypes
+from collections import deque
+
+import numpy as np
+import OpenGL.GL as GL
+
+WAIT_TIMEOUT_NS = 1_000_000_000
+
+
+class PBOReadback:
+    """
+    Asynchronous framebuffer readback through a ring of pixel buffer objects.
+
+    issue() starts a glReadPixels into the next free PBO and fences it, so the call returns
+    without waiting for the GPU. poll() maps every buffer whose fence has signaled (usually one
+    or two frames later) and hands it to on_ready(tag, image). The image is a zero-copy view of
+    the mapped buffer: it is only valid inside on_ready, copy it to keep it. The owner calls
+    release() once done, with its context current.
+    """
+    def __init__(self, width, height, on_ready, buffers=3,
+                 format=GL.GL_RGB, type=GL.GL_UNSIGNED_BYTE, channels=3, dtype=np.uint8):
+        """
+        :param on_ready: Called as on_ready(tag, image) with a (height, width[, channels]) view, top row first
+        :param buffers: Number of PBOs in the ring, i.e. how many reads may be in flight
+        :param format, type: glReadPixels format and type, e.g. GL_DEPTH_COMPONENT / GL_FLOAT with channels=1
+        """
+        self.width, self.height = width, height
+        self.on_ready = on_ready
+        self.format, self.type = format, type
+        self.shape = (height, width, channels) if channels > 1 else (height, width)
+        self.dtype = np.dtype(dtype)
+        self.nbytes = width * height * channels * self.dtype.itemsize
+
+        self.pbos = list(np.atleast_1d(GL.glGenBuffers(buffers)))
+        for pbo in self.pbos:
+            GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, pbo)
+            GL.glBufferData(GL.GL_PIXEL_PACK_BUFFER, self.nbytes, None, GL.GL_STREAM_READ)
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, 0)
+
+        self.next_slot = 0
+        self.in_flight = deque()  # (slot, fence, tag), oldest first
+
+    def release(self):
+        """ Delete the PBOs and the fences of reads still in flight (flush() first to keep them) """
+        for _, fence, _ in self.in_flight:
+            GL.glDeleteSync(fence)
+        self.in_flight.clear()
+        if self.pbos:
+            GL.glDeleteBuffers(len(self.pbos), self.pbos)
+            self.pbos = []
+
+    def full(self):
+        return len(self.in_flight) == len(self.pbos)
+
+    def issue(self, framebuffer, tag=None, attachment=GL.GL_COLOR_ATTACHMENT0, block=True):
+        """
+        Start reading framebuffer into the next PBO.
+        :param block: When every PBO is still in flight, wait for the oldest one (True) or skip this read (False)
+        :return: False when the read was skipped
+        """
+        if self.full():
+            if not block:
+                return False
+            self.poll(wait=True, limit=1)
+
+        slot = self.next_slot
+        self.next_slot = (self.next_slot + 1) % len(self.pbos)
+
+        GL.glBindFramebuffer(GL.GL_READ_FRAMEBUFFER, framebuffer)
+        if self.format != GL.GL_DEPTH_COMPONENT:
+            GL.glReadBuffer(attachment)
+        GL.glPixelStorei(GL.GL_PACK_ALIGNMENT, 1)
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, self.pbos[slot])
+        GL.glReadPixels(0, 0, self.width, self.height, self.format, self.type, ctypes.c_void_p(0))
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, 0)
+        if self.format != GL.GL_DEPTH_COMPONENT:
+            # Blits read the framebuffer's first color buffer, don't leave another one selected
+            GL.glReadBuffer(GL.GL_BACK if framebuffer == 0 else GL.GL_COLOR_ATTACHMENT0)
+
+        fence = GL.glFenceSync(GL.GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+        self.in_flight.append((slot, fence, tag))
+        return True
+
+    def poll(self, wait=False, limit=None):
+        """
+        Deliver finished reads in issue order.
+        :param wait: Block until the reads are done instead of only taking the ones already finished
+        :param limit: Deliver at most this many reads
+        :return: Number of reads delivered
+        """
+        delivered = 0
+        while self.in_flight and (limit is None or delivered < limit):
+            slot, fence, tag = self.in_flight[0]
+            status = GL.glClientWaitSync(fence, GL.GL_SYNC_FLUSH_COMMANDS_BIT, WAIT_TIMEOUT_NS if wait else 0)
+            if status == GL.GL_TIMEOUT_EXPIRED:
+                if wait:
+                    continue
+                break
+            if status == GL.GL_WAIT_FAILED:
+                raise Exception("glClientWaitSync failed on a readback fence")
+
+            self.in_flight.popleft()
+            GL.glDeleteSync(fence)
+            self._deliver(slot, tag)
+            delivered += 1
+        return delivered
+
+    def flush(self):
+        """ Wait for and deliver every read still in flight """
+        return self.poll(wait=True)
+
+    def _deliver(self, slot, tag):
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, self.pbos[slot])
+        pointer = GL.glMapBufferRange(GL.GL_PIXEL_PACK_BUFFER, 0, self.nbytes, GL.GL_MAP_READ_BIT)
+        try:
+            address = getattr(pointer, "value", pointer)
+            buffer = (ctypes.c_ubyte * self.nbytes).from_address(address)
+            # GL rows start at the bottom, the flipped view keeps it zero-copy
+            image = np.frombuffer(buffer, dtype=self.dtype).reshape(self.shape)[::-1]
+            self.on_ready(tag, image)
+        finally:
+            GL.glUnmapBuffer(GL.GL_PIXEL_PACK_BUFFER)
+            GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, 0)
@@ -0,0 +1,99 @@
+import queue
+import threading
+
+import cv2
+import numpy as np
+import OpenGL.GL as GL
+
+from libs.readback import PBOReadback
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+BLOCK = "block"
+
+
+class VideoRecorder:
+    """
+    Records a framebuffer to a video file in the background.
+
+    capture() is called once per rendered frame: every k-th frame is read back through a PBO ring
+    and pushed into a bounded queue that a writer thread encodes with cv2.VideoWriter.
+    When the encoder falls behind, drop_policy decides what happens to new frames:
+    DROP_OLDEST discards the oldest queued frame, DROP_NEWEST discards the new one,
+    BLOCK waits for the encoder (stalls rendering, every frame ends up in the video).
+    """
+    def __init__(self, path, width, height, fps=30, every=1, queue_size=64, drop_policy=DROP_OLDEST,
+                 fourcc="mp4v", buffers=3):
+        if drop_policy not in (DROP_OLDEST, DROP_NEWEST, BLOCK):
+            raise Exception(f"Unknown drop policy: {drop_policy}")
+
+        self.path = path
+        self.width, self.height = width, height
+        self.fps = fps
+        self.every = every
+        self.drop_policy = drop_policy
+        self.fourcc = fourcc
+
+        self.frame_index = 0
+        self.captured = 0
+        self.dropped = 0
+        self.written = 0
+
+        self.readback = PBOReadback(width, height, on_ready=self._on_frame, buffers=buffers)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.writer_thread = threading.Thread(target=self._encode, daemon=True)
+        self.writer_thread.start()
+
+    def capture(self, framebuffer):
+        """ Call after rendering a frame into framebuffer (0 is the window's back buffer) """
+        if self.frame_index % self.every == 0:
+            attachment = GL.GL_BACK if framebuffer == 0 else GL.GL_COLOR_ATTACHMENT0
+            if not self.readback.issue(framebuffer, tag=self.frame_index, attachment=attachment, block=False):
+                # Every PBO still in flight, the GPU is behind as well
+                self.dropped += 1
+        self.frame_index += 1
+        self.readback.poll()
+
+    def _on_frame(self, _index, image):
+        # One copy out of the mapped PBO, RGB -> BGR on the way
+        frame = np.ascontiguousarray(image[..., ::-1])
+        self.captured += 1
+
+        if self.drop_policy == BLOCK:
+            self.queue.put(frame)
+        elif self.drop_policy == DROP_NEWEST:
+            try:
+                self.queue.put_nowait(frame)
+            except queue.Full:
+                self.dropped += 1
+        else:
+            while True:
+                try:
+                    self.queue.put_nowait(frame)
+                    break
+                except queue.Full:
+                    try:
+                        self.queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+
+    def _encode(self):
+        writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, (self.width, self.height))
+        try:
+            while True:
+                frame = self.queue.get()
+                if frame is None:
+                    break
+                writer.write(frame)
+                self.written += 1
+        finally:
+            writer.release()
+
+    def close(self):
+        """ Finish the reads in flight, drain the queue and close the file """
+        self.readback.flush()
+        self.readback.release()
+        self.queue.put(None)
+        self.writer_thread.join()
+        print(f"Recorded {self.written} frames to {self.path} ({self.dropped} dropped)")
@@ -0,0 +1,84 @@
+import numpy as np
+import OpenGL.GL as GL
+
+
+class RenderTarget:
+    """
+    Offscreen framebuffer whose attachments can all be read back:
+    RGB8 color, optional GL_R32F distance (COLOR_ATTACHMENT1) and GL_DEPTH_COMPONENT32F depth.
+    """
+    def __init__(self, width, height, distance=False):
+        """
+        :param distance: Add the R32F attachment, fragment shaders write it as `layout(location = 1) out float`
+        """
+        self.width, self.height = width, height
+        self.distance = distance
+
+        self.framebuffer = GL.glGenFramebuffers(1)
+        self.color_texture = self._create_texture(GL.GL_RGB8, GL.GL_RGB, GL.GL_UNSIGNED_BYTE, GL.GL_LINEAR)
+        self.depth_texture = self._create_texture(GL.GL_DEPTH_COMPONENT32F, GL.GL_DEPTH_COMPONENT, GL.GL_FLOAT, GL.GL_NEAREST)
+        self.distance_texture = self._create_texture(GL.GL_R32F, GL.GL_RED, GL.GL_FLOAT, GL.GL_NEAREST) if distance else None
+
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.framebuffer)
+        GL.glFramebufferTexture2D(GL.GL_FRAMEBUFFER, GL.GL_COLOR_ATTACHMENT0, GL.GL_TEXTURE_2D, self.color_texture, 0)
+        GL.glFramebufferTexture2D(GL.GL_FRAMEBUFFER, GL.GL_DEPTH_ATTACHMENT, GL.GL_TEXTURE_2D, self.depth_texture, 0)
+        if distance:
+            GL.glFramebufferTexture2D(GL.GL_FRAMEBUFFER, GL.GL_COLOR_ATTACHMENT1, GL.GL_TEXTURE_2D, self.distance_texture, 0)
+            GL.glDrawBuffers(2, [GL.GL_COLOR_ATTACHMENT0, GL.GL_COLOR_ATTACHMENT1])
+        if GL.glCheckFramebufferStatus(GL.GL_FRAMEBUFFER) != GL.GL_FRAMEBUFFER_COMPLETE:
+            raise Exception("Render target framebuffer is incomplete")
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, 0)
+
+    def _create_texture(self, internal_format, format, type, filter):
+        texture = GL.glGenTextures(1)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, texture)
+        GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, internal_format, self.width, self.height, 0, format, type, None)
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, filter)
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, filter)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        return texture
+
+    def release(self):
+        """ Delete the framebuffer and its textures, with the owner's context current """
+        if self.framebuffer is None:
+            return
+        GL.glDeleteFramebuffers(1, [self.framebuffer])
+        textures = [self.color_texture, self.depth_texture] + ([self.distance_texture] if self.distance else [])
+        GL.glDeleteTextures(len(textures), textures)
+        self.framebuffer = None
+
+    def bind(self):
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.framebuffer)
+        GL.glViewport(0, 0, self.width, self.height)
+
+    def clear_distance(self, value=0.0):
+        """ glClear fills every draw buffer with the clear color, reset the distance to 'no hit' after it """
+        if self.distance:
+            GL.glClearBufferfv(GL.GL_COLOR, 1, np.array([value, 0, 0, 0], dtype=np.float32))
+
+    def _read(self, attachment, format, type, dtype, channels, width=None, height=None):
+        width, height = width or self.width, height or self.height
+        GL.glBindFramebuffer(GL.GL_READ_FRAMEBUFFER, self.framebuffer)
+        if attachment is not None:
+            GL.glReadBuffer(attachment)
+        GL.glPixelStorei(GL.GL_PACK_ALIGNMENT, 1)
+        data = GL.glReadPixels(0, 0, width, height, format, type)
+        if attachment is not None:
+            # Blits read COLOR_ATTACHMENT0, don't leave the float attachment selected
+            GL.glReadBuffer(GL.GL_COLOR_ATTACHMENT0)
+        shape = (height, width, channels) if channels > 1 else (height, width)
+        return np.frombuffer(data, dtype=dtype).reshape(shape)[::-1]
+
+    def read_color(self, width=None, height=None):
+        """ RGB uint8 image, top row first, optionally only the lower left width x height corner """
+        return self._read(GL.GL_COLOR_ATTACHMENT0, GL.GL_RGB, GL.GL_UNSIGNED_BYTE, np.uint8, 3, width, height)
+
+    def read_depth(self):
+        """ Window-space depth in [0, 1] as float32, top row first, see libs.depth to linearize it """
+        return self._read(None, GL.GL_DEPTH_COMPONENT, GL.GL_FLOAT, np.float32, 1)
+
+    def read_distance(self):
+        """ The R32F distance attachment as float32, top row first """
+        if not self.distance:
+            raise Exception("Render target was created without a distance attachment")
+        return self._read(GL.GL_COLOR_ATTACHMENT1, GL.GL_RED, GL.GL_FLOAT, np.float32, 1)
@@ -1,6 +1,5 @@
 import OpenGL.GL as GL              # standard Python OpenGL wrapper
 import numpy as np
-import pandas as pd
 import sys
 import os
 
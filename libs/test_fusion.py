@@ -0,0 +1,66 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from libs import fusion
+from libs.fusion import PointCloudFusion, TSDFVolume, fuse_views, reduce_by_key
+
+
+def view(seed, width=48, height=40):
+    rng = np.random.default_rng(seed)
+    distance = rng.uniform(2.0, 4.0, (height, width)).astype(np.float32)
+    distance[rng.random((height, width)) < 0.1] = np.inf
+    params = dict(
+        position=rng.uniform(-1, 1, 3).astype(np.float32),
+        front=np.array([0, 0, -1], dtype=np.float32),
+        up=np.array([0, 1, 0], dtype=np.float32),
+        fov=60.0,
+        aspect_ratio=width / height,
+    )
+    colors = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    return distance, params, colors
+
+
+def test_batched_merge_matches_a_single_reduction(monkeypatch):
+    # Small batches so the 30 chunks below go through several intermediate reductions
+    monkeypatch.setattr(fusion, "MIN_BATCH", 50)
+    rng = np.random.default_rng(0)
+    chunks = []
+    for _ in range(30):
+        keys = np.unique(rng.integers(0, 400, 40))
+        chunks.append((keys, rng.random((len(keys), 4)), rng.random(len(keys))))
+
+    accumulator = PointCloudFusion()
+    for chunk in chunks:
+        accumulator.merge(*chunk)
+    assert accumulator.pending
+    accumulator.reduce()
+
+    keys, sums, weights = reduce_by_key(*(np.concatenate(parts) for parts in zip(*chunks)))
+    np.testing.assert_array_equal(accumulator.keys, keys)
+    np.testing.assert_allclose(accumulator.sums, sums)
+    np.testing.assert_allclose(accumulator.weights, weights)
+
+
+def test_mixing_views_with_and_without_colors():
+    accumulator = PointCloudFusion()
+    accumulator.merge(np.arange(3), np.zeros((3, 6)), np.ones(3))
+    with pytest.raises(Exception):
+        accumulator.merge(np.arange(3), np.zeros((3, 3)), np.ones(3))
+
+
+@pytest.mark.parametrize("make_fusion", [lambda: PointCloudFusion(0.1), lambda: TSDFVolume(0.1)])
+def test_process_pool_matches_serial_fusion(make_fusion):
+    views = [view(seed) for seed in range(3)]
+    serial = fuse_views(views, make_fusion(), workers=0, chunk_rows=8)
+    pooled = fuse_views(iter(views), make_fusion(), workers=2, chunk_rows=8, in_flight=3)
+
+    assert not serial.pending and not pooled.pending
+    np.testing.assert_array_equal(serial.keys, pooled.keys)
+    np.testing.assert_allclose(serial.sums, pooled.sums, rtol=1e-6)
+    np.testing.assert_allclose(serial.weights, pooled.weights)
+
+    points, colors = pooled.points()
+    assert points.shape[1] == 3 and np.all(np.isfinite(points))
+    if isinstance(pooled, PointCloudFusion):
+        assert colors.shape == points.shape and colors.min() >= 0 and colors.max() <= 1
@@ -1,131 +1,78 @@
-from triangle.triangle import Triangle
-from rectangle.rectangle import Rectangle
-from point_3d.point_3d import Point3D
-from vector_3d.vector_3d import Vector3D
-from line_segment.line_segment import LineSegments
-from tetrahedron.tetrahedron import Tetrahedron
-from cube.cube import Cube
-from sphere.sphere import Sphere
-from cylinder.cylinder import Cylinder
-from mesh_3d.mesh_3d import Mesh3D
-from model.model import ObjModel
-from model.model1 import ObjModel1
-
-from view_folder.viewer import Viewer
-from view_folder.moving_viewer import MovingViewer
-from view_folder.rotating_viewer import RotatingViewer
-from view_folder.multiple_viewers import MultiplesView, Camera
+import os
+import argparse
 
 import glfw
-import torch
+
+import registry
+from libs.context import create_context, default_backend
 
 WIN_WIDTH = 640
 WIN_HEIGHT = 480
 
-if __name__ == "__main__":
+# Headless runs (PYOPENGL_PLATFORM=egl or osmesa) render this many frames and exit
+HEADLESS_FRAMES = int(os.environ.get("HEADLESS_FRAMES", 300))
 
-    if not glfw.init():
-        raise Exception("Failed to initialize GLFW")
+# RECORD=demo.mp4 records the whole window in the background
+RECORD_PATH = os.environ.get("RECORD")
 
-    # view = Viewer(width=WIN_WIDTH, height=WIN_HEIGHT)
-    # view = RotatingViewer(width=WIN_WIDTH, height=WIN_HEIGHT)
-
-    # view = MovingViewer(
-    #     move_speed=5, 
-    #     mouse_sentitive=0.1, 
-    #     width=WIN_WIDTH, 
-    #     height=WIN_HEIGHT
-    # )
-
-    view = MultiplesView(
-        vert_shader="multiple_cams_normal.vert",
-        frag_shader="multiple_cams_normal.frag",
-        move_speed=5, 
-        mouse_sentitive=0.1,
-        width=WIN_WIDTH * 2, height=WIN_HEIGHT,
-        cameras=[
-            Camera(position=[0, 0, 5], aspect_ratio=WIN_WIDTH / WIN_HEIGHT, far=30),
-            Camera(position=[0, 0, 10], aspect_ratio=WIN_WIDTH / WIN_HEIGHT, far=30),
-        ],
-    )
+# PROFILE=trace.json profiles every pass, prints the summary and writes a Chrome trace
+PROFILE_PATH = os.environ.get("PROFILE")
 
-    # model = Triangle(
-    #     vert_shader="triangle/triangle.vert",
-    #     frag_shader="triangle/triangle.frag"
-    # )
-
-    # model = Rectangle(
-    #     vert_shader="rectangle/rectangle.vert",
-    #     frag_shader="rectangle/rectangle.frag"
-    # )
-
-    # model = Point3D(
-    #     vert_shader="point_3d/point.vert",
-    #     frag_shader="point_3d/point.frag"
-    # )
-
-    # model = Vector3D(
-    #     vert_shader="vector_3d/vector.vert",
-    #     frag_shader="vector_3d/vector.frag"
-    # )
-
-    # model = LineSegments(
-    #     vert_shader="line_segment/line_segment.vert",
-    #     frag_shader="line_segment/line_segment.frag"
-    # )
-
-    # model = Tetrahedron(
-    #     vert_shader="tetrahedron/tetrahedron.vert",
-    #     frag_shader="tetrahedron/tetrahedron.frag"
-    # )
-
-    # model = Cube(
-    #     vert_shader="cube/cube.vert",
-    #     frag_shader="cube/cube.frag"
-    # )
-
-    # model = Sphere(
-    #     vert_shader="sphere/sphere.vert",
-    #     frag_shader="sphere/sphere.frag",
-    #     N=100,
-    #     r=0.5
-    # )
-
-    # model = Cylinder(
-    #     vert_shader="cylinder/cylinder.vert",
-    #     frag_shader="cylinder/cylinder.frag",
-    #     N=100,
-    #     R=1,
-    #     height=2
-    # )
-
-    model = Mesh3D(
-        # vert_shader="mesh_3d/mesh.vert",
-        # frag_shader="mesh_3d/mesh.frag",
-        vert_shader="multiple_cams_depth.vert",
-        frag_shader="multiple_cams_depth.frag",
-        # func=lambda x, y: x**2 + y**2,
-        func=lambda x, y: torch.sin(3*x) + torch.cos(3*y) + 1,
-        x_range=(-5, 5),
-        y_range=(-5, 5),
-        resolution=50,
-        lr=0.0001,
-    )
+if __name__ == "__main__":
 
-    # model = ObjModel(
-    #     model_path='model/cottage_obj.obj', 
-    #     vert_shader='model/model.vert',
-    #     frag_shader='model/model.frag'
-    # )
+    parser = argparse.ArgumentParser(description="Open a viewer on one of the registered models")
+    parser.add_argument("--model", default="mesh3d_depth", choices=sorted(registry.MODELS))
+    parser.add_argument("--viewer", default="multiples", choices=sorted(registry.VIEWERS))
+    parser.add_argument("--scene", help="JSON/TOML scene manifest, replaces --model and --viewer")
+    parser.add_argument("--workers", type=int, help="Scene loading processes, 0 loads on the main thread")
+    args = parser.parse_args()
+
+    loader = None
+    if args.scene:
+        import scene_manifest
+        loader = scene_manifest.SceneLoader.from_file(args.scene, workers=args.workers)
+        # Models are built in the background while the window and viewer are created
+        loader.start()
+        args.viewer = loader.viewer
+
+    headless = default_backend() != "glfw"
+    if not headless and not glfw.init():
+        raise Exception("Failed to initialize GLFW")
 
-    # model = ObjModel1(
-    #     model_path='model/cottage_obj.obj', 
-    #     vert_shader='model/model1.vert',
-    #     frag_shader='model/model1.frag',
-    #     texture_path='model/Liberty-Pavimentazione-1.bmp'
-    # )
+    if loader:
+        window_width, window_height = loader.window_size()
+    else:
+        window_width, window_height = registry.window_size(args.viewer, WIN_WIDTH, WIN_HEIGHT)
+    viewer_kwargs = dict(
+        context=create_context(window_width, window_height, "View", max_frames=HEADLESS_FRAMES if headless else None)
+    )
+    if PROFILE_PATH:
+        if args.viewer != "multiples":
+            raise Exception("PROFILE is only supported by the multiples viewer")
+        from libs.profiler import FrameProfiler
+        viewer_kwargs["profiler"] = FrameProfiler()
+
+    # Only the chosen viewer's and model's modules (and their dependencies) get imported
+    if loader:
+        view = loader.create_viewer(**viewer_kwargs)
+        loader.finish(view)
+    else:
+        view = registry.create_viewer(args.viewer, WIN_WIDTH, WIN_HEIGHT, **viewer_kwargs)
+        model = registry.create_model(args.model)
+
+        view.add(model)
+
+    if RECORD_PATH:
+        from libs.recorder import VideoRecorder
+        view.record(VideoRecorder(RECORD_PATH, window_width, window_height, fps=60))
 
-    view.add(model)
     view.run()
+    view.stop_recording()
+    view.release()
+
+    if PROFILE_PATH:
+        print(view.profiler.report())
+        view.profiler.write_chrome_trace(PROFILE_PATH)
 
-    glfw.terminate()
+    if not headless:
+        glfw.terminate()
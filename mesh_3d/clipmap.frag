@@ -0,0 +1,16 @@
+# version 330
+
+in vec3 fragment_color;
+in vec3 fragPos;
+
+// Extent (x0, y0, x1, y1) of the next finer level, drawn there instead
+uniform vec4 inner;
+
+out vec4 out_color;
+
+void main()
+{
+    if (all(greaterThan(fragPos.xy, inner.xy)) && all(lessThan(fragPos.xy, inner.zw)))
+        discard;
+    out_color = vec4(fragment_color, 1);
+}
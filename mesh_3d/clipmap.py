@@ -0,0 +1,190 @@
+import ctypes
+import numpy as np
+import OpenGL.GL as GL
+import torch
+
+from model_interface import ModelAbstract
+
+
+def grid_indices(cells, hole=None):
+    """
+    uint16 triangle indices of a (cells + 1)^2 vertex grid, optionally leaving out the cells
+    [hole[0], hole[1]) along both axes.
+    """
+    size = cells + 1
+    index = np.arange(size * size, dtype=np.uint16).reshape(size, size)
+    keep = np.ones((cells, cells), dtype=bool)
+    if hole is not None:
+        keep[hole[0]:hole[1], hole[0]:hole[1]] = False
+    top_left, top_right = index[:-1, :-1][keep], index[:-1, 1:][keep]
+    bottom_left, bottom_right = index[1:, :-1][keep], index[1:, 1:][keep]
+    return np.concatenate([
+        np.stack((top_left, bottom_left, top_right), axis=1).ravel(),
+        np.stack((top_right, bottom_left, bottom_right), axis=1).ravel(),
+    ])
+
+
+class Clipmap(ModelAbstract):
+    """
+    Geometry clipmap of the surface z = func(x, y): `levels` nested grids of cells x cells, each
+    twice the spacing of the previous one, centered on the focus point. Every level is one static
+    uint16 grid whose heights come from a layer of a toroidally addressed height texture, so when the
+    focus moves only the rows and columns that scroll in are evaluated and uploaded. The vertex
+    count is constant whatever the extent of the surface.
+
+    Levels other than the finest leave out the cells the finer level always covers; the fragments
+    of the at most one cell wide band left over are discarded in the fragment shader.
+    """
+    def __init__(self, func, levels=6, cells=64, spacing=0.1, z_range=None,
+                 vert_shader="mesh_3d/clipmap.vert", frag_shader="mesh_3d/clipmap.frag"):
+        if cells % 4 != 0 or cells > 252:
+            raise Exception("Clipmap cells must be a multiple of 4 of at most 252 (uint16 grid indices)")
+        super().__init__(vert_shader, frag_shader)
+
+        self.func = func
+        self.levels = levels
+        self.cells = cells
+        self.size = cells + 1
+        self.spacing = spacing
+        self.z_range = z_range
+
+        i, j = np.meshgrid(np.arange(self.size), np.arange(self.size), indexing="ij")
+        # (i, j) with j the fastest, so vertex i * size + j is grid_indices' vertex
+        self.vertices = np.column_stack((i.ravel(), j.ravel())).astype(np.float32)
+        self.full_indices = grid_indices(cells)
+        self.ring_indices = grid_indices(cells, hole=(cells // 4 + 1, 3 * cells // 4))
+
+        # Grid index of every level's first vertex, None until it is first evaluated
+        self.origins = [None] * levels
+        # Heights evaluated since creation, to check that moving only evaluates the new strips
+        self.evaluated = 0
+
+    def setup(self):
+        super().setup()
+
+        self.vao.add_vbo(0, self.vertices, ncomponents=2, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None)
+        self.vao.add_ebo(np.concatenate([self.full_indices, self.ring_indices]))
+
+        self.heights = GL.glGenTextures(1)
+        GL.glBindTexture(GL.GL_TEXTURE_2D_ARRAY, self.heights)
+        GL.glTexImage3D(GL.GL_TEXTURE_2D_ARRAY, 0, GL.GL_R32F, self.size, self.size, self.levels, 0,
+                        GL.GL_RED, GL.GL_FLOAT, None)
+        GL.glTexParameteri(GL.GL_TEXTURE_2D_ARRAY, GL.GL_TEXTURE_MIN_FILTER, GL.GL_NEAREST)
+        GL.glTexParameteri(GL.GL_TEXTURE_2D_ARRAY, GL.GL_TEXTURE_MAG_FILTER, GL.GL_NEAREST)
+        GL.glBindTexture(GL.GL_TEXTURE_2D_ARRAY, 0)
+
+    def level_spacing(self, level):
+        return self.spacing * 2 ** level
+
+    def level_origin(self, level, focus):
+        """ Snapped to twice the level's spacing, so every level sits on the grid of the next coarser one """
+        snapped = np.floor(np.asarray(focus[:2], dtype=np.float64) / (2 * self.level_spacing(level))).astype(np.int64)
+        return snapped * 2 - self.cells // 2
+
+    def _evaluate(self, level, x0, x1, y0, y1):
+        """ Heights of grid indices [x0, x1) x [y0, y1) into the level's texture layer """
+        spacing = self.level_spacing(level)
+        x = torch.arange(x0, x1, dtype=torch.float64) * spacing
+        y = torch.arange(y0, y1, dtype=torch.float64) * spacing
+        # Texture rows are y, columns x
+        Y, X = torch.meshgrid(y.to(torch.float32), x.to(torch.float32), indexing="ij")
+        with torch.no_grad():
+            heights = np.ascontiguousarray(self.func(X, Y).to(torch.float32).numpy())
+        self.evaluated += heights.size
+
+        # The region may wrap around the torus, upload it in up to four rectangles
+        for rows, texel_y in self._wrap(y0, y1):
+            for columns, texel_x in self._wrap(x0, x1):
+                block = np.ascontiguousarray(heights[rows, columns])
+                GL.glTexSubImage3D(GL.GL_TEXTURE_2D_ARRAY, 0, texel_x, texel_y, level,
+                                   block.shape[1], block.shape[0], 1, GL.GL_RED, GL.GL_FLOAT, block)
+        return heights
+
+    def _wrap(self, start, stop):
+        """ [(slice into start..stop, texel offset)] of the at most two runs the range makes modulo size """
+        first = start % self.size
+        length = stop - start
+        if first + length <= self.size:
+            return [(slice(0, length), first)]
+        split = self.size - first
+        return [(slice(0, split), first), (slice(split, length), 0)]
+
+    def recenter(self, focus):
+        """ Move every level to the focus, evaluating only the rows and columns that come into view """
+        changed = False
+        GL.glBindTexture(GL.GL_TEXTURE_2D_ARRAY, self.heights)
+        for level in range(self.levels):
+            origin = self.level_origin(level, focus)
+            previous = self.origins[level]
+            if previous is not None and np.array_equal(origin, previous):
+                continue
+            changed = True
+
+            (x0, y0), size = origin, self.size
+            if previous is None or np.any(np.abs(origin - previous) >= size):
+                heights = self._evaluate(level, x0, x0 + size, y0, y0 + size)
+                if self.z_range is None and level == self.levels - 1:
+                    # Colors span the heights the coarsest level first sees
+                    self.z_range = (float(heights.min()), float(heights.max()))
+            else:
+                dx, dy = origin - previous
+                # Columns entering on the side the focus moved to, over the new rows
+                if dx > 0:
+                    self._evaluate(level, previous[0] + size, x0 + size, y0, y0 + size)
+                elif dx < 0:
+                    self._evaluate(level, x0, previous[0], y0, y0 + size)
+                # Rows entering, over the columns not just evaluated
+                kept_x0, kept_x1 = max(x0, previous[0]), min(x0, previous[0]) + size
+                if dy > 0:
+                    self._evaluate(level, kept_x0, kept_x1, previous[1] + size, y0 + size)
+                elif dy < 0:
+                    self._evaluate(level, kept_x0, kept_x1, y0, previous[1])
+            self.origins[level] = origin
+        GL.glBindTexture(GL.GL_TEXTURE_2D_ARRAY, 0)
+        if changed:
+            self.mark_dirty()
+
+    def extent(self, level):
+        """ (x0, y0, x1, y1) world extent of a level """
+        spacing = self.level_spacing(level)
+        x0, y0 = self.origins[level] * spacing
+        return np.array([x0, y0, x0 + self.cells * spacing, y0 + self.cells * spacing], dtype=np.float32)
+
+    def draw(self, **kwargs):
+        """ :param focus: Point the clipmap follows, the camera position when omitted """
+        focus = kwargs.get("focus")
+        self.recenter(kwargs["camera_pos"] if focus is None else focus)
+
+        self.vao.activate()
+        GL.glUseProgram(self.shader.render_idx)
+
+        self.uma.upload_uniform_matrix4fv(self.get_projection_matrix(**kwargs), "projection", True)
+        self.uma.upload_uniform_matrix4fv(self.get_view_matrix(**kwargs), "modelview", True)
+        self.uma.upload_uniform_scalar1i(self.size, "size")
+        low, high = self.z_range
+        GL.glUniform2f(GL.glGetUniformLocation(self.shader.render_idx, "z_range"), low, high if high > low else low + 1.0)
+
+        GL.glActiveTexture(GL.GL_TEXTURE0)
+        GL.glBindTexture(GL.GL_TEXTURE_2D_ARRAY, self.heights)
+        self.uma.upload_uniform_scalar1i(0, "heights")
+
+        origin_location = GL.glGetUniformLocation(self.shader.render_idx, "origin")
+        texel_location = GL.glGetUniformLocation(self.shader.render_idx, "origin_texel")
+        ring_offset = ctypes.c_void_p(self.full_indices.nbytes)
+        for level in range(self.levels):
+            origin = self.origins[level]
+            GL.glUniform2i(origin_location, int(origin[0]), int(origin[1]))
+            GL.glUniform2i(texel_location, int(origin[0] % self.size), int(origin[1] % self.size))
+            self.uma.upload_uniform_scalar1i(level, "level")
+            self.uma.upload_uniform_scalar1f(self.level_spacing(level), "spacing")
+            # Nothing is finer than level 0, an empty extent discards nothing
+            inner = self.extent(level - 1) if level > 0 else np.array([1, 1, 0, 0], dtype=np.float32)
+            self.uma.upload_uniform_vector4fv(inner, "inner")
+
+            if level == 0:
+                GL.glDrawElements(GL.GL_TRIANGLES, len(self.full_indices), GL.GL_UNSIGNED_SHORT, None)
+            else:
+                GL.glDrawElements(GL.GL_TRIANGLES, len(self.ring_indices), GL.GL_UNSIGNED_SHORT, ring_offset)
+
+        GL.glBindTexture(GL.GL_TEXTURE_2D_ARRAY, 0)
+        self.vao.deactivate()
@@ -0,0 +1,32 @@
+# version 330 core
+
+// Vertex (i, j) of the level's grid
+layout(location = 0) in vec2 grid;
+
+// One layer of size x size heights per level, stored toroidally
+uniform sampler2DArray heights;
+uniform int level;
+uniform int size;
+uniform ivec2 origin;           // Grid index of the level's first vertex
+uniform ivec2 origin_texel;     // origin modulo size
+uniform float spacing;
+uniform vec2 z_range;
+
+uniform mat4 projection, modelview;
+
+out vec3 fragment_color;
+out vec3 fragPos;
+
+void main()
+{
+    ivec2 cell = ivec2(grid);
+    ivec2 texel = (origin_texel + cell) % size;
+    float z = texelFetch(heights, ivec3(texel, level), 0).r;
+
+    vec3 position = vec3(vec2(origin + cell) * spacing, z);
+    float intensity = clamp((z - z_range.x) / (z_range.y - z_range.x), 0.0, 1.0);
+
+    fragment_color = vec3(intensity, 0.0, 1.0 - intensity);
+    fragPos = position;
+    gl_Position = projection * modelview * vec4(position, 1.0);
+}
@@ -0,0 +1,186 @@
+"""
+Translation of a surface function z = func(x, y) into GLSL, by tracing: func is called once with
+symbolic x and y whose arithmetic, torch functions (via __torch_function__) and NumPy ufuncs (via
+__array_ufunc__) build the GLSL expression instead of computing anything.
+
+    func = lambda x, y, t=0.0, k=3.0: torch.sin(k * x + t) * torch.cos(k * y) + 0.1 * x ** 2
+    source, parameters = surface_shader(func)
+    # parameters == {"k": 3.0}, `t` is the time uniform
+
+Supported: + - * / **, abs, sin/cos/tan and their inverses, sinh/cosh/tanh, exp/log/sqrt and their
+base 2 forms, floor/ceil/sign, sigmoid, atan2, pow, minimum/maximum, clamp, and float constants.
+Arguments after x and y are uniforms and need a float default (used by the CPU path): `t` is the
+time, the others are parameters. Anything else (branches on values, indexing, math.* on the
+symbols, ...) raises TranspileError.
+"""
+import os
+import numbers
+import inspect
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), "surface.vert")
+
+UNARY = {
+    "sin": "sin({0})", "cos": "cos({0})", "tan": "tan({0})",
+    "asin": "asin({0})", "arcsin": "asin({0})", "acos": "acos({0})", "arccos": "acos({0})",
+    "atan": "atan({0})", "arctan": "atan({0})",
+    "sinh": "sinh({0})", "cosh": "cosh({0})", "tanh": "tanh({0})",
+    "exp": "exp({0})", "exp2": "exp2({0})", "log": "log({0})", "log2": "log2({0})", "sqrt": "sqrt({0})",
+    "abs": "abs({0})", "absolute": "abs({0})", "floor": "floor({0})", "ceil": "ceil({0})", "sign": "sign({0})",
+    "neg": "(-{0})", "negative": "(-{0})", "square": "({0} * {0})", "sigmoid": "(1.0 / (1.0 + exp(-{0})))",
+}
+
+BINARY = {
+    "add": "({0} + {1})", "sub": "({0} - {1})", "subtract": "({0} - {1})",
+    "mul": "({0} * {1})", "multiply": "({0} * {1})",
+    "div": "({0} / {1})", "divide": "({0} / {1})", "true_divide": "({0} / {1})",
+    "atan2": "atan({0}, {1})", "arctan2": "atan({0}, {1})",
+    "maximum": "max({0}, {1})", "max": "max({0}, {1})", "minimum": "min({0}, {1})", "min": "min({0}, {1})",
+}
+
+
+class TranspileError(Exception):
+    pass
+
+
+def literal(value):
+    if isinstance(value, GLSLExpr):
+        return value.code
+    if isinstance(value, bool) or not isinstance(value, numbers.Real):
+        raise TranspileError(f"Can't translate {type(value).__name__} values to GLSL")
+    value = float(value)
+    if value != value or value in (float("inf"), float("-inf")):
+        raise TranspileError("Non-finite constant")
+    return repr(value)
+
+
+def power(base, exponent):
+    # GLSL's pow is undefined for negative bases, small integer powers are expanded
+    if not isinstance(exponent, GLSLExpr) and float(exponent).is_integer() and 0 <= exponent <= 4:
+        exponent = int(exponent)
+        if exponent == 0:
+            return GLSLExpr("1.0")
+        return GLSLExpr("(" + " * ".join([literal(base)] * exponent) + ")")
+    return GLSLExpr(f"pow({literal(base)}, {literal(exponent)})")
+
+
+class GLSLExpr:
+    """ A symbolic float, every operation returns the GLSL expression of its result """
+    def __init__(self, code):
+        self.code = code
+
+    def _binary(self, other, name, reverse=False):
+        left, right = (other, self) if reverse else (self, other)
+        return GLSLExpr(BINARY[name].format(literal(left), literal(right)))
+
+    def __add__(self, other): return self._binary(other, "add")
+    def __radd__(self, other): return self._binary(other, "add", reverse=True)
+    def __sub__(self, other): return self._binary(other, "sub")
+    def __rsub__(self, other): return self._binary(other, "sub", reverse=True)
+    def __mul__(self, other): return self._binary(other, "mul")
+    def __rmul__(self, other): return self._binary(other, "mul", reverse=True)
+    def __truediv__(self, other): return self._binary(other, "div")
+    def __rtruediv__(self, other): return self._binary(other, "div", reverse=True)
+    def __pow__(self, other): return power(self, other)
+    def __rpow__(self, other): return power(other, self)
+    def __neg__(self): return GLSLExpr(f"(-{self.code})")
+    def __pos__(self): return self
+    def __abs__(self): return GLSLExpr(f"abs({self.code})")
+
+    def __bool__(self):
+        raise TranspileError("Branching on the surface's values can't be traced")
+
+    def __getattr__(self, name):
+        # Tensor methods: x.sin(), x.pow(2), x.clamp(0, 1), ...
+        if name in UNARY or name in BINARY or name in ("pow", "clamp"):
+            return lambda *args, **kwargs: apply(name, (self, *args), kwargs)
+        raise AttributeError(name)
+
+    @classmethod
+    def __torch_function__(cls, func, types, args=(), kwargs=None):
+        return apply(getattr(func, "__name__", str(func)), args, kwargs or {})
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != "__call__" or kwargs:
+            raise TranspileError(f"numpy.{ufunc.__name__}.{method} can't be translated")
+        return apply(ufunc.__name__, inputs, {})
+
+
+def apply(name, args, kwargs):
+    name = name.strip("_")
+    if name in UNARY and len(args) == 1 and not kwargs:
+        return GLSLExpr(UNARY[name].format(literal(args[0])))
+    if name in BINARY and len(args) == 2 and not kwargs:
+        return GLSLExpr(BINARY[name].format(literal(args[0]), literal(args[1])))
+    if name in ("pow", "power", "float_power") and len(args) == 2 and not kwargs:
+        return power(*args)
+    if name in ("clamp", "clip"):
+        low = kwargs.get("min", args[1] if len(args) > 1 else None)
+        high = kwargs.get("max", args[2] if len(args) > 2 else None)
+        code = literal(args[0])
+        if low is not None:
+            code = f"max({code}, {literal(low)})"
+        if high is not None:
+            code = f"min({code}, {literal(high)})"
+        return GLSLExpr(code)
+    raise TranspileError(f"'{name}' has no GLSL translation")
+
+
+def transpile(func):
+    """
+    :return: (GLSL expression of the height in terms of x, y, t and u_<parameter> uniforms,
+        {parameter: default value})
+    """
+    try:
+        signature = inspect.signature(func)
+    except (TypeError, ValueError):
+        raise TranspileError("The function's signature can't be inspected")
+    names = list(signature.parameters)
+    if len(names) < 2:
+        raise TranspileError("The function needs (x, y) arguments")
+
+    arguments, parameters = {}, {}
+    for name in names[2:]:
+        default = signature.parameters[name].default
+        if not isinstance(default, numbers.Real) or isinstance(default, bool):
+            raise TranspileError(f"Parameter '{name}' needs a float default")
+        if name == "t":
+            arguments[name] = GLSLExpr("t")
+        else:
+            arguments[name] = GLSLExpr(f"u_{name}")
+            parameters[name] = float(default)
+
+    try:
+        result = func(GLSLExpr("x"), GLSLExpr("y"), **arguments)
+    except TranspileError:
+        raise
+    except Exception as error:
+        raise TranspileError(f"Tracing failed: {error!r}")
+    return literal(result), parameters
+
+
+class SurfaceAtTime:
+    """
+    func(x, y) as GPUSurface currently draws it: at `time` and the current parameter values, for what
+    evaluates the surface on the CPU. A class rather than a closure so it pickles out of
+    scene_manifest's pool.
+    """
+    def __init__(self, func, parameters):
+        self.func = func
+        # Shared with the owner's set_parameter
+        self.parameters = parameters
+        self.time = 0.0
+        self.timed = "t" in inspect.signature(func).parameters
+
+    def __call__(self, x, y):
+        if self.timed:
+            return self.func(x, y, t=self.time, **self.parameters)
+        return self.func(x, y, **self.parameters)
+
+
+def surface_shader(func):
+    """ :return: (vertex shader source computing the surface on the GPU, {parameter: default value}) """
+    expression, parameters = transpile(func)
+    with open(TEMPLATE) as file:
+        source = file.read()
+    uniforms = "\n".join(f"uniform float u_{name};" for name in parameters)
+    return source.replace("/* PARAMETERS */", uniforms).replace("/* HEIGHT */", expression), parameters
@@ -0,0 +1,94 @@
+import numpy as np
+import OpenGL.GL as GL
+import torch
+
+from model_interface import ModelAbstract
+from mesh_3d.mesh_3d import Mesh3D
+from mesh_3d.glsl_transpile import SurfaceAtTime, surface_shader
+
+
+class GPUSurface(ModelAbstract):
+    """
+    The surface z = func(x, y) computed in the vertex shader: func is translated to GLSL (see
+    glsl_transpile) and only a flat (x, y) grid is uploaded, so heights, colors and normals follow the
+    time (`t`) and set_parameter without any re-upload. Functions that can't be translated raise
+    TranspileError, Mesh3D draws those on the CPU.
+    """
+    def __init__(self, func, x_range, y_range, resolution, frag_shader="mesh_3d/mesh_lit.frag"):
+        """
+        :param func: The function f(x, y) to visualize, optionally with a time `t` and float parameters
+        :param x_range: The range of x values (tuple: (x_min, x_max))
+        :param y_range: The range of y values (tuple: (y_min, y_max))
+        :param resolution: The number of points along x and y axis
+        :param frag_shader: The fragment shader source, lit by the normals the vertex shader computes
+        """
+        vert_shader, parameters = surface_shader(func)
+        super().__init__(vert_shader, frag_shader)
+        # func's parameters as uniforms, changed with set_parameter
+        self.parameters = parameters
+        # func at the drawn time and parameters, for what evaluates the surface on the CPU
+        self.func = SurfaceAtTime(func, self.parameters)
+
+        x_values = torch.linspace(x_range[0], x_range[1], resolution)
+        y_values = torch.linspace(y_range[0], y_range[1], resolution)
+        X, Y = torch.meshgrid(x_values, y_values, indexing='ij')
+        self.vertices = np.asarray(torch.column_stack((X.flatten(), Y.flatten())), dtype=np.float32)
+        self.indices = Mesh3D.generate_indices(resolution)
+
+        # Colors span the heights of a coarse CPU sample at the starting time and parameters
+        stride = max(1, resolution // 64)
+        with torch.no_grad():
+            sample = self.func(*torch.meshgrid(x_values[::stride], y_values[::stride], indexing='ij'))
+        self.z_range = (float(sample.min()), float(sample.max()))
+        # Step of the shader's central differences giving the normals
+        self.epsilon = 0.5 * (x_range[1] - x_range[0]) / (resolution - 1)
+
+        # Towards the light, for the lit shaders (mesh_lit.frag)
+        self.light_direction = np.array([0.3, 0.5, 1.0], dtype=np.float32)
+
+    def setup(self):
+        super().setup()
+
+        self.vao.add_vbo(0, self.vertices, ncomponents=2, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None)
+        self.vao.add_ebo(indices=self.indices)
+
+    def is_animating(self):
+        return self.func.timed
+
+    def update(self, dt):
+        """ Time goes by for surfaces with a `t` argument """
+        if self.func.timed:
+            self.func.time += dt
+            self.mark_dirty()
+
+    def set_parameter(self, name, value):
+        """ Change one of func's parameters, the surface follows on the next draw without re-upload """
+        if name not in self.parameters:
+            raise Exception(f"'{name}' is not a parameter of the GPU surface: {', '.join(self.parameters)}")
+        self.parameters[name] = float(value)
+        self.mark_dirty()
+
+    def draw(self, **kwargs):
+        self.vao.activate()
+        GL.glUseProgram(self.shader.render_idx)
+
+        projection = self.get_projection_matrix(**kwargs)
+        self.uma.upload_uniform_matrix4fv(projection, "projection", True)
+
+        modelview = self.get_view_matrix(**kwargs)
+        self.uma.upload_uniform_matrix4fv(modelview, "modelview", True)
+
+        self.uma.upload_uniform_vector3fv(kwargs["camera_pos"], "cameraPos")
+        self.uma.upload_uniform_scalar1f(kwargs["far"], "maxDistance")
+        self.uma.upload_uniform_vector3fv(self.light_direction, "lightDir")
+
+        self.uma.upload_uniform_scalar1f(self.func.time, "t")
+        self.uma.upload_uniform_scalar1f(self.epsilon, "epsilon")
+        low, high = self.z_range
+        GL.glUniform2f(GL.glGetUniformLocation(self.shader.render_idx, "z_range"), low, high if high > low else low + 1.0)
+        for name, value in self.parameters.items():
+            self.uma.upload_uniform_scalar1f(value, f"u_{name}")
+
+        GL.glDrawElements(GL.GL_TRIANGLES, len(self.indices), GL.GL_UNSIGNED_INT, None)
+
+        self.vao.deactivate()
@@ -0,0 +1,277 @@
+import numpy as np
+import OpenGL.GL as GL
+
+from model_interface import ModelAbstract
+
+
+# Marching squares corners counter-clockwise: (i, j), (i + 1, j), (i + 1, j + 1), (i, j + 1), and edge k
+# joining corner k and k + 1. Every edge is interpolated from its lower corner, at (EDGE_I, EDGE_J) from
+# the cell's first corner and along i (x) or j (y), so the two cells sharing an edge find the same crossing.
+EDGE_I = np.array([0, 1, 0, 0])
+EDGE_J = np.array([0, 0, 1, 0])
+EDGE_ALONG_I = np.array([True, False, True, False])
+
+
+def _case_edges():
+    """ First and last crossed edge of every corner case, bit k set when corner k is above the level """
+    first, last = np.zeros(16, dtype=np.intp), np.zeros(16, dtype=np.intp)
+    for case in range(16):
+        crossed = [k for k in range(4) if (case >> k & 1) != (case >> (k + 1) % 4 & 1)]
+        if crossed:
+            first[case], last[case] = crossed[0], crossed[-1]
+    return first, last
+
+
+CASE_FIRST, CASE_LAST = _case_edges()
+SADDLES = (0b0101, 0b1010)
+
+
+def _level_bands(Z, sorted_levels, dtype):
+    """
+    Number of levels at or below every value of Z. Evenly spaced levels (a count of levels, linspace)
+    are bucketed arithmetically instead of searched, which can only put values within rounding of a
+    level on its other side: marching squares just needs every vertex on one side of every level.
+    """
+    steps = np.diff(sorted_levels.astype(np.float64))
+    step = steps.mean() if len(steps) else 1.0
+    if not len(sorted_levels) or step <= 0 or np.any(np.abs(steps - step) > 1e-4 * step):
+        return np.searchsorted(sorted_levels, Z, side="right").astype(dtype)
+    origin, scale = Z.dtype.type(sorted_levels[0] - step), Z.dtype.type(1.0 / step)
+    result = np.empty(Z.shape, dtype)
+    # In row blocks: a temporary of the whole grid in Z's dtype is four to eight times the bands
+    rows = max(1, (1 << 16) // Z.shape[1])
+    with np.errstate(invalid="ignore"):
+        for first in range(0, len(Z), rows):
+            bands = Z[first:first + rows] - origin
+            bands *= scale
+            np.clip(bands, 0, len(sorted_levels), out=result[first:first + rows], casting="unsafe")
+    return result
+
+
+def _edge_tables(Z, edges):
+    """
+    Per entry of `edges`: flat offsets of the edge's lower corner and of the next vertex along it, and the
+    shifts of its crossing's t across i and across j. A shift is 0 along the edge and -2 or +2 across it,
+    so clipping t + shift to [0, 1] lands on the edge's grid line.
+    """
+    columns, real = Z.shape[1], Z.dtype.type
+    start = EDGE_I * columns + EDGE_J
+    end = start + np.where(EDGE_ALONG_I, columns, 1)
+    shift_i = np.where(EDGE_ALONG_I, 0, 4 * EDGE_I - 2).astype(real)
+    shift_j = np.where(EDGE_ALONG_I, 4 * EDGE_J - 2, 0).astype(real)
+    return [table.take(edges) for table in (start, end, shift_i, shift_j)]
+
+
+def _edge_points(Z, tables, x, y, corner, level, key, points):
+    """
+    Crossings of `level` on the edges tables[...].take(key) of the cells whose first corner is Z.flat[corner],
+    written to the (N, 2) points. x and y are (value, step to the next grid line) of the cells' first corner.
+    """
+    start, end, shift_i, shift_j = (table.take(key) for table in tables)
+    flat = Z.ravel()
+    start += corner
+    end += corner
+    start_value = flat.take(start)
+    t = level - start_value
+    t /= flat.take(end) - start_value
+    for axis, (value, step), local in ((0, x, shift_i), (1, y, shift_j)):
+        local += t
+        # Also clips t itself, only off [0, 1] for a vertex bucketed across a level it is within rounding of
+        np.clip(local, 0, 1, out=local)
+        local *= step
+        np.add(local, value, out=points[:, axis])
+
+
+# Pairs interpolated at a time: their temporaries stay in cache instead of faulting in fresh pages
+PAIR_CHUNK = 1 << 16
+
+
+def crossing_segments(Z, x_values, y_values, levels):
+    """
+    Vectorized marching squares of every level at once over the grid Z[i, j] = f(x_values[i], y_values[j]).
+
+    Each vertex gets its band, the number of levels at or below it (_level_bands); a cell crosses
+    exactly the levels between its lowest and highest corner band, so only those (cell, level) pairs
+    are ever looked at, whatever the number of levels. The pairs are interpolated in chunks, in cell
+    order: the corner bands give each pair its case, only the two edges it crosses are interpolated, in
+    Z's own precision, and the chunk's segments are copied to the rows of their levels.
+    :return: [(segments, 2, 2) float32 segment end points (x, y) of every level, in `levels` order]
+    """
+    Z = Z if Z.dtype.kind == "f" else Z.astype(np.float64)
+    levels = np.asarray(levels, dtype=np.float64)
+    order = np.argsort(levels)
+    # Levels of another dtype than Z would make the comparisons convert the whole grid first
+    sorted_levels = levels[order].astype(Z.dtype)
+
+    band_type = next(dtype for dtype in (np.int8, np.int16, np.int32) if len(levels) < np.iinfo(dtype).max)
+    band = _level_bands(Z, sorted_levels, band_type)
+    low = np.minimum(band[:, :-1], band[:, 1:])
+    low = np.minimum(low[:-1], low[1:]).ravel()
+    high = np.maximum(band[:, :-1], band[:, 1:])
+    high = np.maximum(high[:-1], high[1:]).ravel()
+
+    # Every (cell, sorted level) pair with low <= level < high: each cell at its lowest level, then at
+    # the next one for the cells that still cross it, and so on
+    cells = np.flatnonzero(high > low)
+    low, high = low.take(cells), high.take(cells)
+    pair_cells, pair_levels = [cells], [low]
+    while len(cells):
+        low = low + 1
+        more = high > low
+        cells, low, high = cells[more], low[more], high[more]
+        pair_cells.append(cells)
+        pair_levels.append(low)
+    # Most grids cross at most one level per cell, and the copy of every pair is then for nothing
+    if len(pair_cells) > 2:
+        pair_cells, pair_levels = np.concatenate(pair_cells), np.concatenate(pair_levels)
+    else:
+        pair_cells, pair_levels = pair_cells[0], pair_levels[0]
+
+    columns = Z.shape[1]
+    flat, flat_band = Z.ravel(), band.ravel()
+    x_values, y_values = (np.asarray(values).astype(Z.dtype) for values in (x_values, y_values))
+    x_steps, y_steps = (np.append(np.diff(values), values.dtype.type(0)) for values in (x_values, y_values))
+    edge_tables = _edge_tables(Z, np.arange(4))
+    case_tables = [_edge_tables(Z, CASE_FIRST), _edge_tables(Z, CASE_LAST)]
+
+    counts = np.bincount(pair_levels, minlength=len(levels))
+    segments = np.empty((len(pair_cells), 2, 2), dtype=np.float32)
+    filled = np.cumsum(counts) - counts
+    extra, extra_levels = [], []
+    for first in range(0, len(pair_cells), PAIR_CHUNK):
+        cells, in_band = pair_cells[first:first + PAIR_CHUNK], pair_levels[first:first + PAIR_CHUNK]
+        # Twice as fast as np.divmod
+        i = cells // (columns - 1)
+        j = cells - i * (columns - 1)
+        corner = cells + i
+        level = sorted_levels.take(in_band)
+        x, y = (x_values.take(i), x_steps.take(i)), (y_values.take(j), y_steps.take(j))
+
+        # The band test itself, so every pair found above has its crossed edges
+        case = np.zeros(len(cells), dtype=np.uint8)
+        for bit, offset in enumerate((0, columns, columns + 1, 1)):
+            case |= (flat_band[offset:].take(corner) > in_band).view(np.uint8) << bit
+        chunk = np.empty((len(cells), 2, 2), dtype=np.float32)
+        key = case.astype(np.intp)
+        for end, tables in enumerate(case_tables):
+            _edge_points(Z, tables, x, y, corner, level, key, chunk[:, end])
+
+        saddle = np.flatnonzero((case == SADDLES[0]) | (case == SADDLES[1]))
+        if len(saddle):
+            # Both diagonals are on one side: the center value decides which corners are cut off, and
+            # the segments joining edges cut, cut + 1 and edges cut + 2, cut + 3 replace the pair's own
+            s_corner, s_level = corner[saddle], level[saddle]
+            center = (flat[s_corner].astype(np.float64) + flat[s_corner + columns] + flat[s_corner + columns + 1] + flat[s_corner + 1]) / 4
+            cut = np.where((center >= s_level) == (case[saddle] == SADDLES[0]), 0, 3)
+            s_x, s_y = (x[0][saddle], x[1][saddle]), (y[0][saddle], y[1][saddle])
+            split = np.empty((2, len(saddle), 2, 2), dtype=np.float32)
+            for half in range(2):
+                for end in range(2):
+                    _edge_points(Z, edge_tables, s_x, s_y, s_corner, s_level, (cut + 2 * half + end) % 4, split[half, :, end])
+            chunk[saddle] = split[0]
+            extra.append(split[1])
+            extra_levels.append(in_band[saddle])
+
+        # take() of (N, 4) rows, the (N, 2, 2) fancy index is several times slower
+        by_level = np.argsort(in_band, kind="stable")
+        chunk = chunk.reshape(-1, 4).take(by_level, axis=0).reshape(-1, 2, 2)
+        chunk_starts = np.searchsorted(in_band.take(by_level), np.arange(len(levels) + 1))
+        chunk_counts = np.diff(chunk_starts)
+        for sorted_index in np.flatnonzero(chunk_counts):
+            count, start = chunk_counts[sorted_index], chunk_starts[sorted_index]
+            segments[filled[sorted_index]:filled[sorted_index] + count] = chunk[start:start + count]
+            filled[sorted_index] += count
+
+    per_sorted_level = np.split(segments, np.cumsum(counts)[:-1])
+    if extra:
+        extra, extra_levels = np.concatenate(extra), np.concatenate(extra_levels)
+        for sorted_index in np.unique(extra_levels):
+            per_sorted_level[sorted_index] = np.concatenate((per_sorted_level[sorted_index], extra[extra_levels == sorted_index]))
+
+    result = [None] * len(levels)
+    for sorted_index, original_index in enumerate(order):
+        result[original_index] = per_sorted_level[sorted_index]
+    return result
+
+
+class Isolines(ModelAbstract):
+    """
+    Contour lines of a gridded surface, every level's segments in one GL_LINES buffer drawn like
+    LineSegments. Segments are cached per level value, so set_levels only runs marching squares for
+    the levels that are new.
+    """
+    def __init__(self, x_values, y_values, Z, levels=10, color=(0.0, 0.0, 0.0), lift=0.01,
+                 vert_shader="line_segment/line_segment.vert", frag_shader="line_segment/line_segment.frag"):
+        super().__init__(vert_shader, frag_shader)
+        self.x_values = np.asarray(x_values, dtype=np.float32)
+        self.y_values = np.asarray(y_values, dtype=np.float32)
+        self.Z = np.asarray(Z, dtype=np.float32)
+        self.color = np.asarray(color, dtype=np.float32)
+        # Lines sit this far above their level, out of the surface's depth
+        self.lift = lift
+
+        # level value: (segments * 2, 3) float32 vertices
+        self.segments = {}
+        self.levels = []
+        self.vertices = np.zeros((0, 3), dtype=np.float32)
+        self.colors = np.zeros((0, 3), dtype=np.float32)
+        self.uploaded_version = None
+
+        self.set_levels(levels)
+
+    def set_levels(self, levels):
+        """ :param levels: Level values, or a count of levels evenly spaced strictly inside the surface's range """
+        if isinstance(levels, int):
+            z_min, z_max = float(self.Z.min()), float(self.Z.max())
+            levels = np.linspace(z_min, z_max, levels + 2)[1:-1]
+        levels = [float(level) for level in levels]
+
+        new = [level for level in dict.fromkeys(levels) if level not in self.segments]
+        if new:
+            for level, segments in zip(new, crossing_segments(self.Z, self.x_values, self.y_values, new)):
+                vertices = np.empty((len(segments) * 2, 3), dtype=np.float32)
+                vertices[:, :2] = segments.reshape(-1, 2)
+                vertices[:, 2] = level + self.lift
+                self.segments[level] = vertices
+        # Only the current levels stay cached
+        self.segments = {level: self.segments[level] for level in levels}
+        self.levels = levels
+
+        self.vertices = np.concatenate([self.segments[level] for level in levels] or [np.zeros((0, 3), dtype=np.float32)])
+        self.colors = np.ascontiguousarray(np.broadcast_to(self.color, self.vertices.shape))
+        self.mark_dirty()
+
+    def setup(self):
+        super().setup()
+
+        self.vao.add_vbo(0, self.vertices, ncomponents=3, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None,
+                         draw_type=GL.GL_DYNAMIC_DRAW)
+        self.vao.add_vbo(1, self.colors, ncomponents=3, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None,
+                         draw_type=GL.GL_DYNAMIC_DRAW)
+        self.uploaded_version = self.version
+
+    def _upload(self):
+        for location, data in ((0, self.vertices), (1, self.colors)):
+            GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.vao.vbo[location])
+            GL.glBufferData(GL.GL_ARRAY_BUFFER, data, GL.GL_DYNAMIC_DRAW)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+        self.uploaded_version = self.version
+
+    def draw(self, **kwargs):
+        if self.uploaded_version != self.version:
+            self._upload()
+        if len(self.vertices) == 0:
+            return
+
+        self.vao.activate()
+        GL.glUseProgram(self.shader.render_idx)
+
+        projection = self.get_projection_matrix(**kwargs)
+        self.uma.upload_uniform_matrix4fv(projection, "projection", True)
+
+        modelview = self.get_view_matrix(**kwargs)
+        self.uma.upload_uniform_matrix4fv(modelview, "modelview", True)
+
+        GL.glDrawArrays(GL.GL_LINES, 0, len(self.vertices))
+
+        self.vao.deactivate()
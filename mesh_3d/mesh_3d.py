@@ -1,8 +1,13 @@
+import ctypes
 import numpy as np
 import OpenGL.GL as GL
 from sphere.sphere import Sphere
-from libs import transform as T
 from model_interface import ModelAbstract
+from mesh_3d.optimizer_engine import OptimizerEngine
+from mesh_3d.particles import ParticleOptimizer, ParticleSwarm, grid_starts
+from mesh_3d.tiled_mesh import TILE_SIZE, tile_indices, tile_layout, generate_tiled_mesh
+from mesh_3d.normals import surface_heights_and_normals, pack_normals
+from mesh_3d.isolines import Isolines
 
 import torch
 import random
@@ -29,7 +34,7 @@ class SphereObj(Sphere):
 
         self.update_position(current_position=kwargs["position"])
 
-        projection = T.perspective(fovy=kwargs["fovy"], aspect=kwargs["aspect"], near=kwargs["near"], far=kwargs["far"])
+        projection = self.get_projection_matrix(**kwargs)
         self.uma.upload_uniform_matrix4fv(projection, "projection", True)
 
         modelview = self.get_view_matrix(**kwargs)
@@ -38,7 +43,9 @@ class SphereObj(Sphere):
         GL.glDrawElements(GL.GL_TRIANGLE_STRIP, len(self.indices) * 2, GL.GL_UNSIGNED_INT, None)
 
 class Mesh3D(ModelAbstract):
-    def __init__(self, vert_shader, frag_shader, func, x_range, y_range, resolution, lr=0.0001):
+    def __init__(self, vert_shader, frag_shader, func, x_range, y_range, resolution, lr=0.0001,
+                 background=True, steps_per_second=60, particles=0, optimizers=("sgd",), particle_lr=0.01,
+                 trail_length=64, tile_size=TILE_SIZE, workers=None, mmap_dir=None, isolines=0):
         """
         :param vert_shader: The vertex shader source
         :param frag_shader: The fragment shader source
@@ -46,11 +53,30 @@ class Mesh3D(ModelAbstract):
         :param x_range: The range of x values (tuple: (x_min, x_max))
         :param y_range: The range of y values (tuple: (y_min, y_max))
         :param resolution: The number of points along x and y axis
+        :param background: Run the gradient descent on an OptimizerEngine thread instead of in update()
+        :param steps_per_second: Step-rate limit of the background optimizer, None for no limit
+        :param particles: Batched mode when > 0, every optimizer of `optimizers` (names of particles.OPTIMIZERS)
+            descends from this many starting points spread over the ranges, instead of the single sphere
+        :param particle_lr: Learning rate of the batched optimizers
+        :param trail_length: Steps kept in each particle's trail
+        :param tile_size: Above this resolution the surface is generated and drawn in uint16-indexed tiles
+            of at most tile_size x tile_size vertices (see tiled_mesh)
+        :param workers: Threads evaluating the tiles, None for the default
+        :param mmap_dir: Memory-map the tiled vertex and color arrays into this directory
+        :param isolines: Overlay this many contour levels (or a list of level values), untiled grids only
         """
         # Compile shader
         super().__init__(vert_shader, frag_shader)
 
-        self.vertices, self.indices, self.colors = self.generate_mesh(func, x_range, y_range, resolution)
+        # None below tile_size, else (row, rows, col, cols, first_vertex) of every tile
+        self.tiles = None
+        if resolution > tile_size:
+            self.tiles, _ = tile_layout(resolution, tile_size)
+            self.indices = None
+            self.vertices, self.colors, self.normals = generate_tiled_mesh(
+                func, x_range, y_range, resolution, tile_size=tile_size, workers=workers, mmap_dir=mmap_dir)
+        else:
+            self.vertices, self.indices, self.colors, self.normals = self.generate_mesh(func, x_range, y_range, resolution)
 
         self.sphere_obj = SphereObj(vert=vert_shader, frag=frag_shader, r=0.2, N=20)
 
@@ -65,6 +91,32 @@ class Mesh3D(ModelAbstract):
             requires_grad=True,
             dtype=torch.float32
         )
+        # Position before the last step, draw interpolates between the two
+        self.previous_variables = self.variables.detach().clone()
+
+        self.background = background
+        self.steps_per_second = steps_per_second
+        # Created in setup(), a thread can't be pickled out of scene_manifest's pool processes
+        self.engine = None
+        self.engine_sequence = None
+
+        self.isolines = None
+        if isinstance(isolines, int) and isolines == 0:
+            pass
+        elif self.tiles is not None:
+            raise Exception("Mesh3D isolines need an untiled grid (resolution <= tile_size)")
+        else:
+            # Z[i, j] = func(x_values[i], y_values[j]) as laid out by generate_mesh
+            Z = self.vertices[:, 2].reshape(resolution, resolution)
+            self.isolines = Isolines(self.vertices[::resolution, 0], self.vertices[:resolution, 1], Z, levels=isolines)
+
+        # Towards the light, for the lit shaders (mesh_lit.frag)
+        self.light_direction = np.array([0.3, 0.5, 1.0], dtype=np.float32)
+
+        self.swarm = None
+        if particles > 0:
+            starts = grid_starts(particles, x_range, y_range)
+            self.swarm = ParticleSwarm(ParticleOptimizer(self.func, starts, optimizers, particle_lr), trail_length=trail_length)
 
     def generate_mesh(self, func, x_range, y_range, resolution):
         """
@@ -73,7 +125,7 @@ class Mesh3D(ModelAbstract):
         :param x_range: Range of x values
         :param y_range: Range of y values
         :param resolution: Number of divisions in the mesh grid
-        :return: vertices, indices, and color tensors
+        :return: vertices, indices, colors and packed normals (see normals.pack_normals)
         """
         x_min, x_max = x_range
         y_min, y_max = y_range
@@ -82,7 +134,8 @@ class Mesh3D(ModelAbstract):
         y_values = torch.linspace(y_min, y_max, resolution)
 
         X, Y = torch.meshgrid(x_values, y_values, indexing='ij')
-        Z = func(X, Y)
+        # Heights and every vertex's normal from a single batched backward pass
+        Z, normals = surface_heights_and_normals(func, X, Y)
 
         vertices = torch.column_stack((X.flatten(), Y.flatten(), Z.flatten()))
 
@@ -96,6 +149,15 @@ class Mesh3D(ModelAbstract):
             1.0 - color_intensities.flatten()
         ))
 
+        return (np.asarray(vertices.to(torch.float32)), self.generate_indices(resolution),
+                np.asarray(colors.to(torch.float32)), pack_normals(normals))
+
+    @staticmethod
+    def generate_indices(resolution):
+        """
+        Triangle indices of a resolution x resolution grid, two triangles per cell.
+        :return: int32 indices
+        """
         vertex_indices = torch.arange(resolution * resolution, dtype=torch.int32).reshape((resolution, resolution))
 
         top_left_indices = vertex_indices[:-1, :-1].flatten()
@@ -107,7 +169,7 @@ class Mesh3D(ModelAbstract):
         triangle_2 = torch.column_stack((top_right_indices, bottom_left_indices, bottom_right_indices))
 
         indices = torch.vstack((triangle_1, triangle_2)).flatten()
-        return np.asarray(vertices.to(torch.float32)), np.asarray(indices.to(torch.int32)), np.asarray(colors.to(torch.float32))
+        return np.asarray(indices.to(torch.int32))
 
     def setup(self):
         """
@@ -117,31 +179,108 @@ class Mesh3D(ModelAbstract):
 
         self.vao.add_vbo(0, self.vertices, ncomponents=3, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None)
         self.vao.add_vbo(1, self.colors, ncomponents=3, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None)
-        self.vao.add_ebo(indices=self.indices)
+        self.vao.add_vbo(2, self.normals, ncomponents=4, dtype=GL.GL_INT_2_10_10_10_REV, normalized=True, stride=0, offset=None)
+        if self.tiles is None:
+            self.vao.add_ebo(indices=self.indices)
+        else:
+            self.setup_tiles()
+
+        if self.isolines is not None:
+            self.isolines.setup()
+
+        if self.swarm is not None:
+            self.swarm.setup()
+            return
 
         self.sphere_obj.setup()
 
-    def draw(self, **kwargs):
+        if self.background and self.engine is None:
+            self.engine = OptimizerEngine(self.func, self.variables.tolist(), self.lr, self.steps_per_second)
+            self.engine.start()
+
+    def release(self):
+        """ Stop the background optimizer, its thread would otherwise outlive the model """
+        if self.engine is not None:
+            self.engine.stop()
+            self.engine = None
+
+    def setup_tiles(self):
         """
-        Draw the mesh using OpenGL.
+        One EBO holding each distinct tile shape's uint16 indices once (at most four: full tiles and the
+        last row/column), every tile then draws its shape's range with its first vertex as base vertex.
+        """
+        shapes, offset = {}, 0
+        for _, rows, _, cols, _ in self.tiles:
+            if (rows, cols) not in shapes:
+                shapes[(rows, cols)] = (len(tile_indices(rows, cols)), offset)
+                offset += tile_indices(rows, cols).nbytes
+        self.vao.add_ebo(indices=np.concatenate([tile_indices(*shape) for shape in shapes]))
+
+        self.tile_draws = [(*shapes[(rows, cols)], first) for _, rows, _, cols, first in self.tiles]
+
+    def is_animating(self):
+        # Every simulation step (or engine step) takes one gradient descent step
+        return self.engine is None or self.engine.is_running()
+
+    def set_isolines(self, levels):
+        """ New contour levels, only the values not drawn yet are computed """
+        if self.isolines is None:
+            raise Exception("This Mesh3D was created without isolines")
+        self.isolines.set_levels(levels)
+        self.mark_dirty()
+
+    def update(self, dt):
         """
+        One gradient descent step per fixed timestep, so the descent speed doesn't depend on the frame rate.
+        With the background engine the step happens on its thread, this only notices new positions.
+        """
+        if self.swarm is not None:
+            self.swarm.update(dt)
+            self.mark_dirty()
+            return
+
+        if self.engine is not None:
+            self.engine.check()
+            sequence, _ = self.engine.position()
+            if sequence != self.engine_sequence:
+                self.engine_sequence = sequence
+                self.mark_dirty()
+            return
+
+        self.previous_variables = self.variables.detach().clone()
+
         self.variables.grad = None
         z = self.func(self.variables[0], self.variables[1])
         z.backward()
 
         with torch.no_grad():
             self.variables -= self.lr * self.variables.grad
+            self.mark_dirty()
 
-            self.sphere_obj.draw(position=[
-                self.variables[0].tolist(), 
-                self.variables[1].tolist(), 
-                self.func(self.variables[0], self.variables[1])
-            ], **kwargs)
+    def draw(self, **kwargs):
+        """
+        Draw the mesh using OpenGL.
+        :param alpha: Interpolation factor between the previous and the current step, 1 when omitted
+        """
+        if self.swarm is not None:
+            self.swarm.draw(**kwargs)
+        elif self.engine is not None:
+            # Only reads the engine's published snapshot, no torch work on the render thread
+            _, position = self.engine.position()
+            self.sphere_obj.draw(position=position.tolist(), **kwargs)
+        else:
+            with torch.no_grad():
+                x, y = torch.lerp(self.previous_variables, self.variables, kwargs.get("alpha", 1.0))
+                self.sphere_obj.draw(position=[
+                    x.tolist(), 
+                    y.tolist(), 
+                    self.func(x, y)
+                ], **kwargs)
 
         self.vao.activate()
         GL.glUseProgram(self.shader.render_idx)
 
-        projection = T.perspective(fovy=kwargs["fovy"], aspect=kwargs["aspect"], near=kwargs["near"], far=kwargs["far"])
+        projection = self.get_projection_matrix(**kwargs)
         self.uma.upload_uniform_matrix4fv(projection, "projection", True)
 
         # Create rotation matrix based on angles
@@ -150,8 +289,16 @@ class Mesh3D(ModelAbstract):
         
         self.uma.upload_uniform_vector3fv(kwargs["camera_pos"], "cameraPos")
         self.uma.upload_uniform_scalar1f(kwargs["far"], "maxDistance")
+        self.uma.upload_uniform_vector3fv(self.light_direction, "lightDir")
 
         # Draw the mesh using triangles
-        GL.glDrawElements(GL.GL_TRIANGLES, len(self.indices), GL.GL_UNSIGNED_INT, None)
+        if self.tiles is None:
+            GL.glDrawElements(GL.GL_TRIANGLES, len(self.indices), GL.GL_UNSIGNED_INT, None)
+        else:
+            for count, offset, first in self.tile_draws:
+                GL.glDrawElementsBaseVertex(GL.GL_TRIANGLES, count, GL.GL_UNSIGNED_SHORT, ctypes.c_void_p(offset), first)
 
         self.vao.deactivate()
+
+        if self.isolines is not None:
+            self.isolines.draw(**kwargs)
@@ -0,0 +1,24 @@
+# version 330
+
+in vec3 fragment_color;
+in vec3 fragPos;
+in vec3 normal;
+
+uniform vec3 cameraPos;
+uniform vec3 lightDir;     // Towards the light, world space
+
+out vec4 out_color;
+
+void main()
+{
+    vec3 n = normalize(normal);
+    vec3 l = normalize(lightDir);
+    vec3 v = normalize(cameraPos - fragPos);
+    // Both sides of the surface are visible
+    if (dot(n, v) < 0.0)
+        n = -n;
+
+    float diffuse = max(dot(n, l), 0.0);
+    float specular = pow(max(dot(n, normalize(l + v)), 0.0), 32.0);
+    out_color = vec4(fragment_color * (0.25 + 0.75 * diffuse) + vec3(0.3) * specular, 1);
+}
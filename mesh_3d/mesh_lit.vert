@@ -0,0 +1,20 @@
+# version 330 core
+
+layout(location = 0) in vec3 position;
+layout(location = 1) in vec3 color;
+// Packed 2_10_10_10 normal, unpacked to [-1, 1] by the attribute format
+layout(location = 2) in vec3 vertex_normal;
+
+uniform mat4 projection, modelview;
+
+out vec3 fragment_color;
+out vec3 fragPos;
+out vec3 normal;
+
+void main()
+{
+    fragment_color = color;
+    fragPos = position;
+    normal = vertex_normal;
+    gl_Position = projection * modelview * vec4(position, 1.0);
+}
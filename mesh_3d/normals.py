@@ -0,0 +1,53 @@
+import numpy as np
+import torch
+
+
+def surface_heights_and_normals(func, X, Y):
+    """
+    Heights of z = func(x, y) over the grid X, Y and their unit normals (-dz/dx, -dz/dy, 1), the
+    derivatives of every vertex coming from one backward pass over the whole grid (func works
+    element-wise, so d(sum z)/dX is each vertex's own dz/dx).
+    :return: Z (detached), normals (N, 3) float32 tensor in X.flatten() order
+    """
+    # Fresh leaves on X and Y's storage, func is element-wise and never writes into them
+    X = X.detach().requires_grad_(True)
+    Y = Y.detach().requires_grad_(True)
+    with torch.enable_grad():
+        Z = func(X, Y)
+        if Z.requires_grad:
+            dzdx, dzdy = torch.autograd.grad(Z.sum(), (X, Y), allow_unused=True)
+        else:
+            dzdx = dzdy = None
+
+    # Component after component, so the (N, 3) result is a transposed view and each column stays contiguous
+    normals = torch.empty((3, X.numel()), dtype=torch.float32)
+    if dzdx is None and dzdy is None:
+        normals[:2] = 0.0
+        normals[2] = 1.0
+        return Z.detach(), normals.T
+    dzdx = torch.zeros_like(X) if dzdx is None else dzdx
+    dzdy = torch.zeros_like(Y) if dzdy is None else dzdy
+    dzdx, dzdy = dzdx.reshape(-1), dzdy.reshape(-1)
+
+    # z of the unit normal, 1 / sqrt(1 + dz/dx^2 + dz/dy^2), scales the other two
+    inverse_length = normals[2]
+    torch.mul(dzdx, dzdx, out=inverse_length).addcmul_(dzdy, dzdy).add_(1.0).rsqrt_()
+    torch.mul(dzdx, inverse_length, out=normals[0]).neg_()
+    torch.mul(dzdy, inverse_length, out=normals[1]).neg_()
+    return Z.detach(), normals.T
+
+
+def pack_normals(normals):
+    """
+    (N, 3) unit normals into GL_INT_2_10_10_10_REV words, 4 bytes a normal instead of 12.
+    :return: (N,) uint32 array, upload with ncomponents=4, dtype=GL_INT_2_10_10_10_REV, normalized=True
+    """
+    packed = torch.zeros(len(normals), dtype=torch.int32)
+    scaled = torch.empty(len(normals), dtype=torch.float32)
+    bits = scaled.view(torch.int32)
+    for k, component in enumerate(normals.unbind(1)):
+        # Adding 1.5 * 2^23 rounds c * 511 to the nearest integer and leaves it, in two's complement,
+        # in the low mantissa bits, which are the component's 10-bit field as they stand
+        torch.mul(component, 511.0, out=scaled).add_(12582912.0)
+        packed.bitwise_or_(bits.bitwise_and_(0x3FF).bitwise_left_shift_(10 * k))
+    return packed.numpy().view(np.uint32)
@@ -0,0 +1,135 @@
+import time
+import threading
+
+import numpy as np
+import torch
+
+
+class OptimizerEngine:
+    """
+    Gradient descent on func(x, y) on a worker thread, at its own step rate apart from rendering
+    (torch releases the GIL inside its kernels, so the render loop keeps running meanwhile).
+
+    Positions are published through a double buffer: the worker writes the back slot, flips `front`
+    and bumps `sequence`. Readers copy the front slot and retry if `sequence` moved meanwhile, so
+    neither side ever waits on a lock.
+
+        engine = OptimizerEngine(func, start=[0.5, 0], lr=0.0001, steps_per_second=60)
+        engine.start()
+        sequence, (x, y, z) = engine.position()
+        engine.pause(); engine.resume(); engine.set_rate(None)   # None runs as fast as possible
+        engine.stop()
+    """
+    # Seconds over which the steps-per-second metric is measured
+    RATE_WINDOW = 0.5
+
+    def __init__(self, func, start, lr=0.0001, steps_per_second=60):
+        self.func = func
+        self.lr = lr
+        self.steps_per_second = steps_per_second
+        self.variables = torch.tensor(start, requires_grad=True, dtype=torch.float32)
+
+        self.slots = np.zeros((2, 3), dtype=np.float32)
+        self.front = 0
+        self.sequence = 0
+
+        self.steps = 0
+        self.rate = 0.0
+        self.error = None
+
+        self.resumed = threading.Event()
+        self.resumed.set()
+        self.stopping = False
+        self.thread = None
+
+        with torch.no_grad():
+            x, y = self.variables.tolist()
+            self._publish(x, y, float(self.func(self.variables[0], self.variables[1])))
+
+    def _publish(self, x, y, z):
+        back = 1 - self.front
+        self.slots[back] = (x, y, z)
+        self.front = back
+        self.sequence += 1
+
+    def position(self):
+        """ (sequence, [x, y, z]) of the latest published step, sequence grows with every step """
+        while True:
+            sequence = self.sequence
+            position = self.slots[self.front].copy()
+            if sequence == self.sequence:
+                return sequence, position
+
+    def step(self):
+        self.variables.grad = None
+        z = self.func(self.variables[0], self.variables[1])
+        z.backward()
+
+        with torch.no_grad():
+            self.variables -= self.lr * self.variables.grad
+            x, y = self.variables.tolist()
+            z = float(self.func(self.variables[0], self.variables[1]))
+
+        self._publish(x, y, z)
+        self.steps += 1
+
+    def _run(self):
+        next_step = window_start = time.perf_counter()
+        window_steps = self.steps
+        try:
+            while not self.stopping:
+                if not self.resumed.wait(timeout=0.1) or self.stopping:
+                    continue
+
+                self.step()
+
+                now = time.perf_counter()
+                if now - window_start >= self.RATE_WINDOW:
+                    self.rate = (self.steps - window_steps) / (now - window_start)
+                    window_start, window_steps = now, self.steps
+
+                if self.steps_per_second:
+                    next_step = max(next_step + 1.0 / self.steps_per_second, now - 0.25)
+                    if next_step > now:
+                        time.sleep(next_step - now)
+                else:
+                    next_step = now
+        except Exception as error:
+            # Raised again on the main thread by check()
+            self.error = error
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.stopping = False
+        self.thread = threading.Thread(target=self._run, name="Mesh3D optimizer", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stopping = True
+        self.resumed.set()
+        self.thread.join()
+        self.thread = None
+
+    def pause(self):
+        self.resumed.clear()
+        self.rate = 0.0
+
+    def resume(self):
+        self.resumed.set()
+
+    def is_paused(self):
+        return not self.resumed.is_set()
+
+    def is_running(self):
+        return self.thread is not None and not self.is_paused() and self.error is None
+
+    def set_rate(self, steps_per_second):
+        """ Step-rate limit, None or 0 for no limit """
+        self.steps_per_second = steps_per_second
+
+    def check(self):
+        if self.error is not None:
+            raise Exception(f"Mesh3D optimizer stopped: {self.error!r}")
@@ -0,0 +1,17 @@
+# version 330 core
+
+layout(location = 0) in vec3 position;
+// Per instance: the particle's position on the surface
+layout(location = 1) in vec3 offset;
+
+uniform mat4 projection, modelview;
+uniform vec3 group_colors[8];
+uniform int group_size;
+
+out vec3 fragment_color;
+
+void main()
+{
+    fragment_color = group_colors[gl_InstanceID / group_size];
+    gl_Position = projection * modelview * vec4(position + offset, 1.0);
+}
@@ -0,0 +1,188 @@
+import numpy as np
+import OpenGL.GL as GL
+import torch
+
+from sphere.sphere import Sphere
+from libs.buffer import *
+from model_interface import ModelAbstract
+
+# name: function(parameters, lr) -> torch.optim optimizer
+OPTIMIZERS = {
+    "sgd": lambda parameters, lr: torch.optim.SGD(parameters, lr=lr),
+    "momentum": lambda parameters, lr: torch.optim.SGD(parameters, lr=lr, momentum=0.9),
+    "nesterov": lambda parameters, lr: torch.optim.SGD(parameters, lr=lr, momentum=0.9, nesterov=True),
+    "adam": lambda parameters, lr: torch.optim.Adam(parameters, lr=lr),
+    "rmsprop": lambda parameters, lr: torch.optim.RMSprop(parameters, lr=lr),
+}
+
+# One color per optimizer group, the shaders hold up to 8
+GROUP_COLORS = np.array([
+    [1.0, 0.2, 0.2], [0.2, 0.8, 0.2], [0.2, 0.4, 1.0], [1.0, 0.7, 0.0],
+    [0.8, 0.2, 0.8], [0.0, 0.8, 0.8], [0.5, 0.5, 0.5], [0.0, 0.0, 0.0],
+], dtype=np.float32)
+
+
+def grid_starts(count, x_range, y_range):
+    """ `count` starting points spread on a regular grid over the ranges, (count, 2) float32 """
+    side = int(np.ceil(np.sqrt(count)))
+    x, y = torch.meshgrid(torch.linspace(*x_range, side), torch.linspace(*y_range, side), indexing="ij")
+    return torch.column_stack((x.flatten(), y.flatten()))[:count].to(torch.float32)
+
+
+class ParticleOptimizer:
+    """
+    Gradient descent of many points at once. Every optimizer of `optimizers` runs from the same
+    `starts`, each group as its own (K, 2) leaf tensor; a step evaluates func once over all of them
+    concatenated and runs a single backward.
+    """
+    def __init__(self, func, starts, optimizers=("sgd",), lr=0.01):
+        if len(optimizers) > len(GROUP_COLORS):
+            raise Exception(f"At most {len(GROUP_COLORS)} optimizers can be compared at once")
+        for name in optimizers:
+            if name not in OPTIMIZERS:
+                raise Exception(f"Unknown optimizer '{name}', choose from: {', '.join(OPTIMIZERS)}")
+
+        self.func = func
+        self.names = list(optimizers)
+        self.group_size = len(starts)
+        self.groups = [starts.clone().requires_grad_(True) for _ in optimizers]
+        self.optimizers = [OPTIMIZERS[name]([group], lr) for name, group in zip(optimizers, self.groups)]
+        self.steps = 0
+
+        with torch.no_grad():
+            points = torch.cat(self.groups)
+            self.positions = self._positions(points, self.func(points[:, 0], points[:, 1]))
+
+    @property
+    def count(self):
+        return self.group_size * len(self.groups)
+
+    @staticmethod
+    def _positions(points, z):
+        return torch.column_stack((points, z)).detach().numpy().astype(np.float32)
+
+    def step(self):
+        """ One step of every optimizer, positions are the points the gradients were taken at """
+        for optimizer in self.optimizers:
+            optimizer.zero_grad(set_to_none=True)
+
+        points = torch.cat(self.groups)
+        z = self.func(points[:, 0], points[:, 1])
+        z.sum().backward()
+        self.positions = self._positions(points, z)
+
+        for optimizer in self.optimizers:
+            optimizer.step()
+        self.steps += 1
+
+
+class ParticleSwarm(ModelAbstract):
+    """
+    The particles of a ParticleOptimizer drawn as instanced spheres, one draw call for all of them,
+    with trails kept in a GPU ring buffer of the last `trail_length` positions: each step uploads only
+    its own slot, and every particle's trail is one instance of a single instanced line strip draw.
+    """
+    def __init__(self, optimizer, r=0.05, N=8, trail_length=64,
+                 vert_shader="mesh_3d/particle.vert", frag_shader="mesh_3d/particle.frag",
+                 trail_vert_shader="mesh_3d/trail.vert", trail_frag_shader="mesh_3d/trail.frag"):
+        super().__init__(vert_shader, frag_shader)
+        self.optimizer = optimizer
+        self.trail_length = trail_length
+        self.trail_vert_shader = trail_vert_shader
+        self.trail_frag_shader = trail_frag_shader
+
+        sphere = Sphere(vert_shader, frag_shader, r=r, N=N)
+        self.vertices, self.indices = sphere.vertices, sphere.indices
+
+        self.head = 0
+        # Positions of the steps taken since the last upload, at most a whole ring
+        self.pending = []
+
+    def setup(self):
+        super().setup()
+
+        positions = self.optimizer.positions
+        self.vao.add_vbo(0, self.vertices, ncomponents=3, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None)
+        self.vao.add_vbo(1, positions, ncomponents=3, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None,
+                         draw_type=GL.GL_STREAM_DRAW, divisor=1)
+        self.vao.add_ebo(self.indices)
+
+        # Trails: every slot starts at the starting positions, the strips are degenerate until they fill
+        self.trail_shader = Shader(vertex_source=self.trail_vert_shader, fragment_source=self.trail_frag_shader)
+        self.trail_uma = UManager(self.trail_shader)
+        self.trail_vao = VAO()
+
+        self.trail_buffer = GL.glGenBuffers(1)
+        GL.glBindBuffer(GL.GL_TEXTURE_BUFFER, self.trail_buffer)
+        GL.glBufferData(GL.GL_TEXTURE_BUFFER, np.tile(self._rgba(positions), (self.trail_length, 1)), GL.GL_STREAM_DRAW)
+        self.trail_texture = GL.glGenTextures(1)
+        GL.glBindTexture(GL.GL_TEXTURE_BUFFER, self.trail_texture)
+        # RGB32F buffer textures need GL 4.0, positions are padded to RGBA
+        GL.glTexBuffer(GL.GL_TEXTURE_BUFFER, GL.GL_RGBA32F, self.trail_buffer)
+        GL.glBindTexture(GL.GL_TEXTURE_BUFFER, 0)
+        GL.glBindBuffer(GL.GL_TEXTURE_BUFFER, 0)
+
+    @staticmethod
+    def _rgba(positions):
+        return np.concatenate([positions, np.ones((len(positions), 1), dtype=np.float32)], axis=1)
+
+    def is_animating(self):
+        return True
+
+    def update(self, dt):
+        self.optimizer.step()
+        self.pending.append(self.optimizer.positions)
+        del self.pending[:-self.trail_length]
+        self.mark_dirty()
+
+    def _upload(self):
+        """ Latest positions into the instance buffer, every pending step into its own trail slot """
+        positions = self.pending[-1]
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.vao.vbo[1])
+        GL.glBufferSubData(GL.GL_ARRAY_BUFFER, 0, positions.nbytes, positions)
+
+        GL.glBindBuffer(GL.GL_TEXTURE_BUFFER, self.trail_buffer)
+        for positions in self.pending:
+            self.head = (self.head + 1) % self.trail_length
+            slot = self._rgba(positions)
+            GL.glBufferSubData(GL.GL_TEXTURE_BUFFER, self.head * slot.nbytes, slot.nbytes, slot)
+        GL.glBindBuffer(GL.GL_TEXTURE_BUFFER, 0)
+
+        self.pending = []
+
+    def _upload_common(self, uma, projection, modelview):
+        uma.upload_uniform_matrix4fv(projection, "projection", True)
+        uma.upload_uniform_matrix4fv(modelview, "modelview", True)
+        uma.upload_uniform_vector3fv(GROUP_COLORS, "group_colors", len(GROUP_COLORS))
+        uma.upload_uniform_scalar1i(self.optimizer.group_size, "group_size")
+
+    def draw(self, **kwargs):
+        # Once per frame, not once per camera pass
+        if self.pending:
+            self._upload()
+
+        projection = self.get_projection_matrix(**kwargs)
+        modelview = self.get_view_matrix(**kwargs)
+        count = self.optimizer.count
+
+        self.vao.activate()
+        GL.glUseProgram(self.shader.render_idx)
+        self._upload_common(self.uma, projection, modelview)
+        GL.glDrawElementsInstanced(GL.GL_TRIANGLES, len(self.indices), GL.GL_UNSIGNED_INT, None, count)
+        self.vao.deactivate()
+
+        if self.trail_length < 2:
+            return
+        self.trail_vao.activate()
+        GL.glUseProgram(self.trail_shader.render_idx)
+        self._upload_common(self.trail_uma, projection, modelview)
+        GL.glActiveTexture(GL.GL_TEXTURE0)
+        GL.glBindTexture(GL.GL_TEXTURE_BUFFER, self.trail_texture)
+        self.trail_uma.upload_uniform_scalar1i(0, "trail")
+        self.trail_uma.upload_uniform_scalar1i(self.trail_length, "trail_length")
+        self.trail_uma.upload_uniform_scalar1i(count, "particle_count")
+        self.trail_uma.upload_uniform_scalar1i(self.head, "head")
+        # One line strip instance per particle, vertex ids head+1 .. head+trail_length cover the ring oldest first
+        GL.glDrawArraysInstanced(GL.GL_LINE_STRIP, self.head + 1, self.trail_length, count)
+        GL.glBindTexture(GL.GL_TEXTURE_BUFFER, 0)
+        self.trail_vao.deactivate()
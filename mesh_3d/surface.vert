@@ -0,0 +1,38 @@
+# version 330 core
+
+// Flat (x, y) grid, the surface's height is computed here
+layout(location = 0) in vec2 grid;
+
+uniform mat4 projection, modelview;
+uniform float t;            // Time in seconds
+uniform vec2 z_range;       // Heights mapped to the blue..red colors
+uniform float epsilon;      // Step of the central differences giving the normal
+
+/* PARAMETERS */
+
+out vec3 fragment_color;
+out vec3 fragPos;
+out vec3 normal;
+
+float height(float x, float y)
+{
+    return /* HEIGHT */;
+}
+
+void main()
+{
+    float x = grid.x;
+    float y = grid.y;
+    float z = height(x, y);
+
+    float dzdx = (height(x + epsilon, y) - height(x - epsilon, y)) / (2.0 * epsilon);
+    float dzdy = (height(x, y + epsilon) - height(x, y - epsilon)) / (2.0 * epsilon);
+    normal = normalize(vec3(-dzdx, -dzdy, 1.0));
+
+    float intensity = clamp((z - z_range.x) / (z_range.y - z_range.x), 0.0, 1.0);
+    fragment_color = vec3(intensity, 0.0, 1.0 - intensity);
+
+    vec3 position = vec3(x, y, z);
+    fragPos = position;
+    gl_Position = projection * modelview * vec4(position, 1.0);
+}
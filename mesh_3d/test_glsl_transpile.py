@@ -0,0 +1,64 @@
+import math
+
+import pytest
+
+from mesh_3d.glsl_transpile import SurfaceAtTime, TranspileError, transpile
+
+
+def ripples(x, y, t=0.0, k=3.0):
+    return k * x + t * y + abs(x) ** 2
+
+
+def test_transpile_maps_time_and_parameters_to_uniforms():
+    expression, parameters = transpile(ripples)
+    assert parameters == {"k": 3.0}
+    assert "u_k" in expression and "t" in expression
+    assert "pow" not in expression
+
+
+def test_transpile_rejects_branches_and_missing_defaults():
+    with pytest.raises(TranspileError):
+        transpile(lambda x, y: x if x > 0 else y)
+    with pytest.raises(TranspileError):
+        transpile(lambda x, y, k: k * x)
+
+
+def test_surface_at_time_follows_time_and_parameters():
+    parameters = {"k": 3.0}
+    surface = SurfaceAtTime(ripples, parameters)
+    assert surface(1.0, 2.0) == ripples(1.0, 2.0)
+
+    surface.time = 0.5
+    parameters["k"] = 1.0
+    assert surface(1.0, 2.0) == ripples(1.0, 2.0, t=0.5, k=1.0)
+
+    untimed = SurfaceAtTime(lambda x, y: math.hypot(x, y), {})
+    untimed.time = 4.0
+    assert untimed(3.0, 4.0) == 5.0
+
+
+def evaluate(expression, **values):
+    # The traced GLSL is also a valid Python expression over these functions
+    return eval(expression, {"sin": math.sin, "cos": math.cos, "exp": math.exp}, values)
+
+
+def test_torch_functions_trace_through_torch_function():
+    torch = pytest.importorskip("torch")
+    expression, parameters = transpile(lambda x, y, t=0.0, k=2.0: torch.sin(k * x + t) * torch.cos(y))
+    assert parameters == {"k": 2.0}
+    assert evaluate(expression, x=0.3, y=-1.2, t=0.7, u_k=2.0) == pytest.approx(math.sin(2.0 * 0.3 + 0.7) * math.cos(-1.2))
+
+
+def test_numpy_ufuncs_trace_through_array_ufunc():
+    np = pytest.importorskip("numpy")
+    expression, parameters = transpile(lambda x, y: np.exp(-(x * x + y * y)))
+    assert parameters == {}
+    assert evaluate(expression, x=0.5, y=-0.25) == pytest.approx(math.exp(-(0.5 ** 2 + 0.25 ** 2)))
+
+
+def test_transpile_rejects_ufunc_methods():
+    np = pytest.importorskip("numpy")
+    with pytest.raises(TranspileError):
+        transpile(lambda x, y: np.add.reduce(x))
+    with pytest.raises(TranspileError):
+        transpile(lambda x, y: np.multiply.outer(x, y))
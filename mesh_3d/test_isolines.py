@@ -0,0 +1,76 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("OpenGL")
+
+from mesh_3d.isolines import crossing_segments
+
+
+def grid(func, resolution=64, dtype=np.float32):
+    x_values = np.linspace(-1, 1, resolution, dtype=np.float32)
+    y_values = np.linspace(-1, 1, resolution + 7, dtype=np.float32)
+    X, Y = np.meshgrid(x_values.astype(np.float64), y_values.astype(np.float64), indexing="ij")
+    return x_values, y_values, func(X, Y).astype(dtype)
+
+
+def plane(x, y):
+    return 0.3 * x - 0.7 * y
+
+
+def paraboloid(x, y):
+    return x * x + y * y
+
+
+def test_endpoints_lie_on_their_level():
+    # Marching squares interpolates linearly along the edges, so a plane is contoured exactly
+    x_values, y_values, Z = grid(plane)
+    levels = [0.4, -0.5, 0.0, 0.25]
+    for level, segments in zip(levels, crossing_segments(Z, x_values, y_values, levels)):
+        assert len(segments)
+        end_points = segments.reshape(-1, 2).astype(np.float64)
+        np.testing.assert_allclose(plane(end_points[:, 0], end_points[:, 1]), level, atol=1e-5)
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_contours_of_a_paraboloid_are_closed_circles(dtype):
+    x_values, y_values, Z = grid(paraboloid, dtype=dtype)
+    levels = np.linspace(0.1, 0.8, 8)
+    spacing = 2 / 63
+    for level, segments in zip(levels, crossing_segments(Z, x_values, y_values, levels)):
+        end_points = segments.reshape(-1, 2).astype(np.float64)
+        # Off the circle by the interpolation error only
+        np.testing.assert_allclose(paraboloid(end_points[:, 0], end_points[:, 1]), level, atol=spacing ** 2)
+        # Every end point is shared by exactly two segments, itself and the neighbour's
+        distances = np.linalg.norm(end_points[:, None] - end_points[None], axis=2)
+        assert np.all(np.sum(distances < 1e-5, axis=1) == 2)
+
+
+def test_levels_between_grid_values_and_outside_the_range():
+    x_values, y_values, Z = grid(paraboloid, resolution=16)
+    levels = [5.0, float(Z[3, 4]), -1.0]
+    outside_high, on_a_vertex, outside_low = crossing_segments(Z, x_values, y_values, levels)
+    assert len(outside_high) == 0 and len(outside_low) == 0
+    # A level equal to a grid value still contours, with no degenerate crossings
+    assert len(on_a_vertex)
+    assert np.all(np.isfinite(on_a_vertex))
+
+
+def waves(x, y):
+    return np.sin(5 * x) * np.cos(4 * y)
+
+
+def test_evenly_spaced_levels_match_searched_bands():
+    # Evenly spaced levels are bucketed arithmetically; one extra level forces the searched bands
+    x_values, y_values, Z = grid(waves, resolution=96)
+    levels = list(np.linspace(-0.9, 0.9, 7))
+    bucketed = crossing_segments(Z, x_values, y_values, levels)
+    searched = crossing_segments(Z, x_values, y_values, levels + [5.0])[:-1]
+    for first, second in zip(bucketed, searched):
+        assert len(first) == len(second)
+        np.testing.assert_allclose(first, second, atol=1e-6)
+
+
+def test_no_levels_or_none_crossed():
+    x_values, y_values, Z = grid(waves, resolution=8)
+    assert crossing_segments(Z, x_values, y_values, []) == []
+    assert [len(segments) for segments in crossing_segments(Z, x_values, y_values, [2.0, 3.0])] == [0, 0]
@@ -0,0 +1,62 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+
+from mesh_3d.tiled_mesh import tile_indices, tile_layout, generate_tiled_mesh
+
+
+def surface(x, y):
+    return torch.sin(2 * x) * torch.cos(3 * y)
+
+
+def unpack_normals(packed):
+    """ Inverse of mesh_3d.normals.pack_normals """
+    components = np.stack([(packed.astype(np.int64) >> (10 * k)) & 0x3FF for k in range(3)], axis=1)
+    components = np.where(components >= 512, components - 1024, components)
+    return components / 511.0
+
+
+@pytest.mark.parametrize("resolution, tile_size", [(2, 4), (10, 4), (17, 6), (33, 256)])
+def test_tiles_cover_every_cell_once(resolution, tile_size):
+    tiles, vertex_count = tile_layout(resolution, tile_size)
+    covered = np.zeros((resolution - 1, resolution - 1), dtype=np.int64)
+    for row, rows, col, cols, first in tiles:
+        assert rows <= tile_size and cols <= tile_size
+        covered[row:row + rows - 1, col:col + cols - 1] += 1
+    assert np.all(covered == 1)
+    assert vertex_count == sum(rows * cols for _, rows, _, cols, _ in tiles)
+
+
+def test_tile_indices_stay_inside_their_tile():
+    indices = tile_indices(5, 7)
+    assert indices.dtype == np.uint16
+    assert len(indices) == 2 * 4 * 6 * 3
+    assert indices.max() == 5 * 7 - 1
+    # First triangle of the first cell: top left, bottom left, top right
+    assert list(indices[:3]) == [0, 7, 1]
+
+
+def test_tiled_vertices_match_the_full_grid():
+    resolution, tile_size = 13, 5
+    vertices, colors, normals = generate_tiled_mesh(surface, (-1, 1), (-2, 2), resolution, tile_size, workers=2)
+    tiles, vertex_count = tile_layout(resolution, tile_size)
+    assert vertices.shape == (vertex_count, 3) and colors.shape == (vertex_count, 3) and normals.shape == (vertex_count,)
+
+    x_values = np.linspace(-1, 1, resolution, dtype=np.float32)
+    y_values = np.linspace(-2, 2, resolution, dtype=np.float32)
+    for row, rows, col, cols, first in tiles:
+        block = vertices[first:first + rows * cols].reshape(rows, cols, 3)
+        X, Y = np.meshgrid(x_values[row:row + rows], y_values[col:col + cols], indexing="ij")
+        np.testing.assert_allclose(block[..., 0], X, atol=1e-6)
+        np.testing.assert_allclose(block[..., 1], Y, atol=1e-6)
+        np.testing.assert_allclose(block[..., 2], np.sin(2 * X) * np.cos(3 * Y), atol=1e-5)
+
+    # Normals (-dz/dx, -dz/dy, 1) normalized, to the 10-bit packing's precision
+    x, y = vertices[:, 0].astype(np.float64), vertices[:, 1].astype(np.float64)
+    expected = np.stack((-2 * np.cos(2 * x) * np.cos(3 * y), 3 * np.sin(2 * x) * np.sin(3 * y), np.ones_like(x)), axis=1)
+    expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+    np.testing.assert_allclose(unpack_normals(normals), expected, atol=4e-3)
+
+    # Colors normalized over the whole surface, not per tile
+    assert colors[:, 0].min() == pytest.approx(0.0, abs=1e-6) and colors[:, 0].max() == pytest.approx(1.0, abs=1e-6)
@@ -0,0 +1,104 @@
+"""
+Surface generation for very high resolutions. The grid is split in tiles of at most
+TILE_SIZE x TILE_SIZE vertices, neighbours sharing their border row/column, each tile stored
+contiguously so its triangles index it with uint16 and are drawn on their own with a base vertex.
+Tiles are evaluated in parallel (torch releases the GIL) straight into preallocated, optionally
+memory-mapped, vertex, color and normal arrays, so no full-grid temporary is ever built.
+"""
+import os
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+
+from mesh_3d.normals import surface_heights_and_normals, pack_normals
+
+# Vertices per tile side, 256 * 256 keeps every tile-local index within uint16
+TILE_SIZE = 256
+
+
+@functools.lru_cache(maxsize=None)
+def tile_indices(rows, cols):
+    """ uint16 triangle indices of a rows x cols vertex tile, with the winding of Mesh3D.generate_mesh """
+    if rows * cols > 65536:
+        raise Exception(f"A {rows}x{cols} tile doesn't fit uint16 indices")
+    index = np.arange(rows * cols, dtype=np.uint16).reshape(rows, cols)
+    top_left, top_right = index[:-1, :-1].ravel(), index[:-1, 1:].ravel()
+    bottom_left, bottom_right = index[1:, :-1].ravel(), index[1:, 1:].ravel()
+    indices = np.concatenate([
+        np.stack((top_left, bottom_left, top_right), axis=1).ravel(),
+        np.stack((top_right, bottom_left, bottom_right), axis=1).ravel(),
+    ])
+    indices.flags.writeable = False
+    return indices
+
+
+@functools.lru_cache(maxsize=16)
+def tile_layout(resolution, tile_size=TILE_SIZE):
+    """
+    Topology of a resolution x resolution grid, independent of the surface function.
+    :return: ((row, rows, col, cols, first_vertex) of every tile, total vertex count)
+    """
+    if resolution < 2:
+        raise Exception("A tiled mesh needs a resolution of at least 2")
+    starts = range(0, resolution - 1, tile_size - 1)
+    tiles, first = [], 0
+    for row in starts:
+        rows = min(tile_size, resolution - row)
+        for col in starts:
+            cols = min(tile_size, resolution - col)
+            tiles.append((row, rows, col, cols, first))
+            first += rows * cols
+    return tuple(tiles), first
+
+
+def allocate(shape, mmap_dir=None, name="array", dtype=np.float32):
+    if mmap_dir is None:
+        return np.empty(shape, dtype=dtype)
+    os.makedirs(mmap_dir, exist_ok=True)
+    return np.lib.format.open_memmap(os.path.join(mmap_dir, f"{name}.npy"), mode="w+", dtype=dtype, shape=shape)
+
+
+def generate_tiled_mesh(func, x_range, y_range, resolution, tile_size=TILE_SIZE, workers=None, mmap_dir=None):
+    """
+    :param workers: Threads evaluating tiles, None for the executor's default
+    :param mmap_dir: Write vertices, colors and normals there as .npy memory maps instead of holding them in RAM
+    :return: vertices, colors (float32), packed normals (uint32), tile after tile as laid out by tile_layout
+    """
+    tiles, vertex_count = tile_layout(resolution, tile_size)
+    vertices = allocate((vertex_count, 3), mmap_dir, "vertices")
+    colors = allocate((vertex_count, 3), mmap_dir, "colors")
+    normals = allocate((vertex_count,), mmap_dir, "normals", dtype=np.uint32)
+
+    x_values = torch.linspace(x_range[0], x_range[1], resolution)
+    y_values = torch.linspace(y_range[0], y_range[1], resolution)
+
+    def evaluate(tile):
+        row, rows, col, cols, first = tile
+        X, Y = torch.meshgrid(x_values[row:row + rows], y_values[col:col + cols], indexing="ij")
+        Z, tile_normals = surface_heights_and_normals(func, X, Y)
+        Z = Z.to(torch.float32)
+        normals[first:first + rows * cols] = pack_normals(tile_normals)
+        block = vertices[first:first + rows * cols]
+        block[:, 0] = X.flatten().numpy()
+        block[:, 1] = Y.flatten().numpy()
+        block[:, 2] = Z.flatten().numpy()
+        return float(Z.min()), float(Z.max())
+
+    def shade(tile, z_min, span):
+        _, rows, _, cols, first = tile
+        intensity = (vertices[first:first + rows * cols, 2] - z_min) / span
+        block = colors[first:first + rows * cols]
+        block[:, 0] = intensity
+        block[:, 1] = 0.0
+        block[:, 2] = 1.0 - intensity
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        bounds = list(pool.map(evaluate, tiles))
+        # Colors are normalized over the whole surface, so they wait for every tile's bounds
+        z_min = min(low for low, _ in bounds)
+        span = (max(high for _, high in bounds) - z_min) or 1.0
+        list(pool.map(lambda tile: shade(tile, z_min, span), tiles))
+
+    return vertices, colors, normals
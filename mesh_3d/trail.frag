@@ -0,0 +1,12 @@
+# version 330
+
+in vec3 fragment_color;
+in float age;
+
+out vec4 out_color;
+
+void main()
+{
+    // Older trail points fade towards white
+    out_color = vec4(mix(fragment_color, vec3(1.0), clamp(age, 0.0, 1.0) * 0.8), 1);
+}
@@ -0,0 +1,25 @@
+# version 330 core
+
+// Ring buffer of trail_length steps, each holding every particle's position
+uniform samplerBuffer trail;
+uniform int trail_length;
+uniform int particle_count;
+uniform int head;
+
+uniform mat4 projection, modelview;
+uniform vec3 group_colors[8];
+uniform int group_size;
+
+out vec3 fragment_color;
+out float age;
+
+void main()
+{
+    // Drawn from first = head + 1, so the strip runs from the oldest slot to the newest (head)
+    int slot = gl_VertexID % trail_length;
+    age = float(head + trail_length - gl_VertexID) / float(trail_length - 1);
+
+    fragment_color = group_colors[gl_InstanceID / group_size];
+    vec3 position = texelFetch(trail, slot * particle_count + gl_InstanceID).xyz;
+    gl_Position = projection * modelview * vec4(position, 1.0);
+}
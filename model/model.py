@@ -1,7 +1,6 @@
 import tinyobjloader
 import numpy as np
 import OpenGL.GL as GL
-from libs import transform as T
 from libs.buffer import *
 from model_interface import ModelAbstract
 
@@ -48,7 +47,7 @@ class ObjModel(ModelAbstract):
         self.vao.activate()
         GL.glUseProgram(self.shader.render_idx)
 
-        projection = T.perspective(fovy=kwargs["fovy"], aspect=kwargs["aspect"], near=kwargs["near"], far=kwargs["far"])
+        projection = self.get_projection_matrix(**kwargs)
         self.uma.upload_uniform_matrix4fv(projection, "projection", True)
 
         # Apply rotation transformations
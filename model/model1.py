@@ -1,7 +1,6 @@
 import tinyobjloader
 import numpy as np
 import OpenGL.GL as GL
-from libs import transform as T
 from libs.buffer import *
 from PIL import Image
 from model_interface import ModelAbstract
@@ -12,6 +11,8 @@ class ObjModel1(ModelAbstract):
         self.vertices, self.texcoords, self.colors = self.load_obj(model_path)
 
         self.texture_path = texture_path
+        # Decoded here with the rest of the CPU work, setup() only uploads it
+        self.texture_data = self.decode_texture(texture_path)
 
         # Setup shader, VAO, and UManager
         super().__init__(vert_shader, frag_shader)
@@ -49,10 +50,13 @@ class ObjModel1(ModelAbstract):
 
         return np.array(vertices, dtype=np.float32), np.array(texcoords, dtype=np.float32), np.array(colors, dtype=np.float32)
     
-    def load_texture(self, texture_file):
+    def decode_texture(self, texture_file):
         # Load the image file
         img = Image.open(texture_file)
-        img_data = np.array(img.convert("RGB"), dtype=np.uint8)
+        return np.array(img.convert("RGB"), dtype=np.uint8)
+
+    def load_texture(self, img_data):
+        height, width = img_data.shape[:2]
 
         # Generate and bind the texture in OpenGL
         texture_id = GL.glGenTextures(1)
@@ -65,7 +69,7 @@ class ObjModel1(ModelAbstract):
         GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_LINEAR)
 
         # Upload texture data
-        GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGB, img.width, img.height, 0, GL.GL_RGB, GL.GL_UNSIGNED_BYTE, img_data)
+        GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGB, width, height, 0, GL.GL_RGB, GL.GL_UNSIGNED_BYTE, img_data)
         GL.glGenerateMipmap(GL.GL_TEXTURE_2D)
 
         return texture_id
@@ -80,14 +84,14 @@ class ObjModel1(ModelAbstract):
         GL.glUseProgram(self.shader.render_idx)
 
         # Bind the texture
-        self.texture_id = self.load_texture(self.texture_path)
+        self.texture_id = self.load_texture(self.texture_data)
         GL.glBindTexture(GL.GL_TEXTURE_2D, self.texture_id)
 
     def draw(self, **kwargs):
         self.vao.activate()
         GL.glUseProgram(self.shader.render_idx)
 
-        projection = T.perspective(fovy=kwargs["fovy"], aspect=kwargs["aspect"], near=kwargs["near"], far=kwargs["far"])
+        projection = self.get_projection_matrix(**kwargs)
         self.uma.upload_uniform_matrix4fv(projection, "projection", True)
 
         # Apply rotation transformations
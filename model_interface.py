@@ -7,6 +7,28 @@ class ModelAbstract:
         self.vert_shader = vert_shader
         self.frag_shader = frag_shader
 
+        # Bumped whenever the drawable's content changes, viewers use it to skip unchanged passes
+        self.version = 0
+
+    def mark_dirty(self):
+        self.version += 1
+
+    def request_redraw(self):
+        """ Ask on-demand viewers for another frame after changing the drawable outside draw """
+        self.mark_dirty()
+
+    def is_animating(self):
+        """ Drawables that change on every frame keep on-demand viewers in continuous mode """
+        return False
+
+    def update(self, dt):
+        """ One fixed simulation step of dt seconds, called by the viewers' run loop apart from draw """
+        pass
+
+    def release(self):
+        """ Stop what the drawable runs besides drawing (threads, pools), viewers call it when they close """
+        pass
+
     def setup(self):
         self.vao = VAO()
         self.shader = Shader(vertex_source=self.vert_shader, fragment_source=self.frag_shader)
@@ -15,7 +37,13 @@ class ModelAbstract:
     def get_view_matrix(self, **kwargs):
         modelview = T.lookat(eye=kwargs["camera_pos"], target=kwargs["camera_pos"] + kwargs["camera_front"], up=kwargs["camera_up"])
         return modelview
-    
+
+    def get_projection_matrix(self, **kwargs):
+        """ An explicit projection (e.g. an off-axis tile frustum) wins over the fovy/aspect perspective """
+        if kwargs.get("projection") is not None:
+            return kwargs["projection"]
+        return T.perspective(fovy=kwargs["fovy"], aspect=kwargs["aspect"], near=kwargs["near"], far=kwargs["far"])
+
     # def get_view_matrix(self, **kwargs):
     #     return T.lookat(eye=kwargs["camera_pos"], target=kwargs["camera_front"], up=kwargs["camera_up"]) @ \
     #         T.rotate(axis=(1, 0, 0), angle=kwargs["x_angle"]) @ \
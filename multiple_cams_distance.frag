@@ -0,0 +1,17 @@
+#version 330 core
+
+uniform float maxDistance; // Maximum possible distance for normalization
+uniform vec3 cameraPos;    // Position of the camera
+
+in vec3 fragPos;           // Position of the fragment
+in vec3 fragment_color;    // Color of the fragment
+
+layout(location = 0) out vec4 FragColor; // 8-bit heatmap for display
+layout(location = 1) out float Distance; // Unnormalized distance for float_depth render targets
+
+void main() {
+    float distance = length(fragPos - cameraPos);
+    float intensity = clamp(distance / maxDistance, 0.0, 1.0);
+    FragColor = vec4(vec3(intensity), 1.0);
+    Distance = distance;
+}
@@ -0,0 +1,203 @@
+"""
+Out-of-core preparation of large point clouds for PointCloud. A .npy ((N, 3) or (N, 6) float32, as
+libs.fusion.write_npy writes them) or binary little-endian .ply cloud is memory-mapped and rewritten
+once, block by block, into a spatially sorted cache of interleaved POINT_DTYPE records: points are
+counting-sorted by the Morton code of a coarse grid cell, so consecutive fixed-size chunks of the
+cache are compact regions with tight bounds. No step holds more than one block of points in memory.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# 16 bytes a point, the layout of one chunk's VBO: position at offset 0, RGBA8 color at offset 12
+POINT_DTYPE = np.dtype([("position", "<f4", (3,)), ("color", "u1", (4,))])
+
+PLY_TYPES = {
+    "char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1",
+    "short": "<i2", "int16": "<i2", "ushort": "<u2", "uint16": "<u2",
+    "int": "<i4", "int32": "<i4", "uint": "<u4", "uint32": "<u4",
+    "float": "<f4", "float32": "<f4", "double": "<f8", "float64": "<f8",
+}
+
+# Morton cells hold 8^levels keys, 7 levels keep the histogram at 2M bins
+MAX_LEVELS = 7
+
+
+def open_ply(path):
+    """ The vertex element of a binary little-endian .ply as a structured memory map """
+    with open(path, "rb") as file:
+        if file.readline().strip() != b"ply":
+            raise Exception(f"{path} is not a PLY file")
+        format_name, elements = None, []
+        while True:
+            line = file.readline()
+            if not line:
+                raise Exception(f"{path} has no end_header")
+            words = line.decode("ascii").split()
+            if not words or words[0] in ("comment", "obj_info"):
+                continue
+            if words[0] == "end_header":
+                break
+            if words[0] == "format":
+                format_name = words[1]
+            elif words[0] == "element":
+                elements.append((words[1], int(words[2]), []))
+            elif words[0] == "property":
+                if words[1] == "list":
+                    raise Exception(f"{path}: list properties are not supported")
+                elements[-1][2].append((words[2], PLY_TYPES[words[1]]))
+        offset = file.tell()
+
+    if format_name != "binary_little_endian":
+        raise Exception(f"{path}: only binary_little_endian PLY files can be memory-mapped")
+    if not elements or elements[0][0] != "vertex":
+        raise Exception(f"{path}: the vertex element must come first")
+    _, count, properties = elements[0]
+    return np.memmap(path, dtype=np.dtype(properties), mode="r", offset=offset, shape=(count,))
+
+
+class PointFile:
+    """ Block access to the positions (float32) and colors (uint8 RGB, or None) of a memory-mapped cloud """
+    def __init__(self, path):
+        self.path = path
+        if os.path.splitext(path)[1].lower() == ".ply":
+            self.data = open_ply(path)
+            names = self.data.dtype.names
+            for name in ("x", "y", "z"):
+                if name not in names:
+                    raise Exception(f"{path}: vertices have no '{name}' property")
+            self.has_colors = all(name in names for name in ("red", "green", "blue"))
+        else:
+            self.data = np.load(path, mmap_mode="r")
+            if self.data.dtype == POINT_DTYPE:
+                self.has_colors = True
+            elif self.data.ndim == 2 and self.data.shape[1] in (3, 6):
+                self.has_colors = self.data.shape[1] == 6
+            else:
+                raise Exception(f"{path}: expected (N, 3) or (N, 6) points, got {self.data.shape} {self.data.dtype}")
+
+    def __len__(self):
+        return len(self.data)
+
+    def read(self, start, stop):
+        """ :return: (n, 3) float32 positions, (n, 3) uint8 colors or None """
+        block = self.data[start:stop]
+        if self.data.dtype == POINT_DTYPE:
+            return block["position"].astype(np.float32), block["color"][:, :3].copy()
+        if self.data.dtype.names is not None:
+            positions = np.column_stack([block[name] for name in ("x", "y", "z")]).astype(np.float32)
+            colors = np.column_stack([block[name] for name in ("red", "green", "blue")]) if self.has_colors else None
+            if colors is not None and colors.dtype != np.uint8:
+                # Wider integer colors are scaled down, float ones are taken as 0..1
+                colors = colors / np.iinfo(colors.dtype).max if colors.dtype.kind in "iu" else colors
+                colors = np.clip(colors * 255.0, 0, 255).astype(np.uint8)
+            return positions, colors
+        positions = np.asarray(block[:, :3], dtype=np.float32)
+        colors = np.clip(block[:, 3:] * 255.0, 0, 255).astype(np.uint8) if self.has_colors else None
+        return positions, colors
+
+    def blocks(self, block_size):
+        for start in range(0, len(self), block_size):
+            yield start, self.read(start, start + block_size)
+
+
+def morton_keys(positions, low, high, levels):
+    """ Morton code of every point's cell in the 2^levels per axis grid over [low, high] """
+    extent = np.where(high > low, high - low, 1.0)
+    cells = ((positions - low) / extent * (1 << levels)).astype(np.int64)
+    cells = np.clip(cells, 0, (1 << levels) - 1)
+    keys = np.zeros(len(positions), dtype=np.int64)
+    for bit in range(levels):
+        for axis in range(3):
+            keys |= ((cells[:, axis] >> bit) & 1) << (3 * bit + axis)
+    return keys
+
+
+def height_colors(positions, low, high):
+    """ Red to blue with the height, as Mesh3D, for clouds without colors """
+    intensity = (positions[:, 2] - low[2]) / ((high[2] - low[2]) or 1.0)
+    colors = np.zeros((len(positions), 3), dtype=np.uint8)
+    colors[:, 0] = np.clip(intensity * 255.0, 0, 255)
+    colors[:, 2] = np.clip((1.0 - intensity) * 255.0, 0, 255)
+    return colors
+
+
+def spatial_sort(source, output_path, chunk_size, block_size=4_000_000):
+    """
+    Counting sort of `source` (a PointFile) by Morton cell into a POINT_DTYPE .npy memory map, in
+    three passes of block_size points: bounds, cell histogram, scatter.
+    :return: The sorted memory map
+    """
+    count = len(source)
+    low = np.full(3, np.inf, dtype=np.float64)
+    high = np.full(3, -np.inf, dtype=np.float64)
+    for _, (positions, _) in source.blocks(block_size):
+        if len(positions):
+            low = np.minimum(low, positions.min(axis=0))
+            high = np.maximum(high, positions.max(axis=0))
+
+    # About 8 cells a chunk, so every chunk spans a handful of neighbouring cells
+    chunks = max(1, -(-count // chunk_size))
+    levels = int(np.clip(np.ceil(np.log2(chunks) / 3) + 1, 1, MAX_LEVELS))
+    histogram = np.zeros(8 ** levels, dtype=np.int64)
+    for _, (positions, _) in source.blocks(block_size):
+        histogram += np.bincount(morton_keys(positions, low, high, levels), minlength=len(histogram))
+
+    # Next free slot of every cell in the output
+    offsets = np.concatenate([[0], np.cumsum(histogram)[:-1]])
+    output = np.lib.format.open_memmap(output_path, mode="w+", dtype=POINT_DTYPE, shape=(count,))
+    for _, (positions, colors) in source.blocks(block_size):
+        keys = morton_keys(positions, low, high, levels)
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        # Rank of every point within its cell in this block, file order kept
+        rank = np.arange(len(keys)) - np.searchsorted(keys, keys, side="left")
+
+        records = np.empty(len(keys), dtype=POINT_DTYPE)
+        records["position"] = positions[order]
+        records["color"][:, :3] = colors[order] if colors is not None else height_colors(positions[order], low, high)
+        records["color"][:, 3] = 255
+        output[offsets[keys] + rank] = records
+        offsets += np.bincount(keys, minlength=len(offsets))
+    output.flush()
+    return output
+
+
+def prepare(path, chunk_size, cache_dir=None, block_size=4_000_000):
+    """
+    The spatially sorted POINT_DTYPE memory map of the cloud at `path`, built once as
+    <cache_dir or the file's directory>/<name>.sorted.npy and reused while newer than the file.
+    Files already holding POINT_DTYPE records are taken as sorted.
+    """
+    source = PointFile(path)
+    if source.data.dtype == POINT_DTYPE:
+        return source.data
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    directory = cache_dir or os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    cache = os.path.join(directory, f"{name}.sorted.npy")
+    if os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(path):
+        return np.load(cache, mmap_mode="r")
+    spatial_sort(source, cache, chunk_size, block_size)
+    return np.load(cache, mmap_mode="r")
+
+
+def chunk_bounds(points, chunk_size, workers=None):
+    """
+    Axis-aligned bounds of every chunk_size chunk of the sorted records.
+    :return: (C, 3) lows, (C, 3) highs, (C,) point counts
+    """
+    starts = range(0, len(points), chunk_size)
+
+    def bounds(start):
+        positions = points[start:start + chunk_size]["position"]
+        return positions.min(axis=0), positions.max(axis=0), len(positions)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(bounds, starts))
+    if not results:
+        return np.zeros((0, 3), dtype=np.float32), np.zeros((0, 3), dtype=np.float32), np.zeros(0, dtype=np.int64)
+    lows, highs, counts = zip(*results)
+    return np.array(lows, dtype=np.float32), np.array(highs, dtype=np.float32), np.array(counts, dtype=np.int64)
@@ -0,0 +1,244 @@
+import ctypes
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import OpenGL.GL as GL
+
+from model_interface import ModelAbstract
+from point_cloud.chunked_points import POINT_DTYPE, prepare, chunk_bounds
+
+# Level of detail strides, every stride draws one point out of `stride` of a chunk
+STRIDES = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+def frustum_planes(clip):
+    """ The 6 planes (a, b, c, d) of a projection @ modelview matrix, inside where a x + b y + c z + d >= 0 """
+    return np.array([clip[3] + clip[0], clip[3] - clip[0], clip[3] + clip[1],
+                     clip[3] - clip[1], clip[3] + clip[2], clip[3] - clip[2]], dtype=np.float64)
+
+
+def boxes_in_frustum(planes, lows, highs):
+    """ Boolean mask of the boxes not entirely behind any plane, tested on each plane's farthest corner """
+    normals = planes[:, None, :3]
+    corners = np.where(normals >= 0, highs[None], lows[None])
+    return np.all(np.sum(normals * corners, axis=2) + planes[:, 3:] >= 0, axis=0)
+
+
+class PointCloud(ModelAbstract):
+    """
+    A point cloud far larger than GPU memory, streamed from a memory-mapped file in fixed-size chunks.
+
+    The file is spatially sorted once (chunked_points.prepare) so every chunk of `chunk_size`
+    consecutive points is a compact region with its own bounds. Each frame, chunks outside the view
+    frustum are culled, and distant chunks draw a strided subset of their points, sized by how many
+    pixels they cover. Visible chunks are read from disk on loader threads nearest first, then
+    uploaded at most `uploads_per_frame` a frame into a fixed pool of chunk VBOs. The pool holds
+    `budget_mb` of points, and the least recently drawn chunks are evicted first.
+
+    Viewers drawing one frame from several cameras pass the same `frame` number to every pass: a
+    chunk visible in any pass of the frame (or of the last one) is then never evicted for another
+    pass, and the upload budget is shared by the frame's passes. Without it every draw is a frame.
+    """
+    def __init__(self, vert_shader, frag_shader, path, chunk_size=65536, budget_mb=512, point_size=2.0,
+                 points_per_pixel=1.0, uploads_per_frame=8, loaders=4, cache_dir=None):
+        """
+        :param path: .npy ((N, 3) or (N, 6) float32) or binary little-endian .ply point cloud
+        :param points_per_pixel: Points a chunk draws per pixel of its screen-space size before taking a stride
+        :param loaders: Threads reading chunks from the memory map
+        :param cache_dir: Where the spatially sorted copy of the file goes, next to the file when None
+        """
+        super().__init__(vert_shader, frag_shader)
+        self.chunk_size = chunk_size
+        self.point_size = point_size
+        self.points_per_pixel = points_per_pixel
+        self.uploads_per_frame = uploads_per_frame
+        self.loaders = loaders
+
+        self.points = prepare(path, chunk_size, cache_dir)
+        self.lows, self.highs, self.counts = chunk_bounds(self.points, chunk_size)
+        self.centers = (self.lows + self.highs) / 2
+        self.radii = np.linalg.norm(self.highs - self.lows, axis=1) / 2
+
+        chunk_bytes = chunk_size * POINT_DTYPE.itemsize
+        self.slot_count = max(1, min(len(self.counts), budget_mb * 1024 * 1024 // chunk_bytes))
+
+        # chunk: slot, least recently drawn first
+        self.resident = OrderedDict()
+        # chunk: Future of its records
+        self.loading = {}
+        # Whether the last frame left visible chunks missing, viewers keep drawing until they arrive
+        self.streaming = False
+        # The frame being drawn, the chunks its passes showed so far, the last frame's and the uploads done
+        self.frame = None
+        self.frame_visible = set()
+        self.previous_visible = set()
+        self.frame_uploads = 0
+        self.pool = None
+
+    def __getstate__(self):
+        # The memory map is reopened where the model is unpickled (scene_manifest's pool) rather than copied
+        state = dict(self.__dict__)
+        state["points"] = self.points.filename
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.points = np.load(state["points"], mmap_mode="r")
+
+    def setup(self):
+        super().setup()
+
+        # The strided index lists of one chunk, every stride's list one after the other
+        index_type = np.uint16 if self.chunk_size <= 65536 else np.uint32
+        self.index_type = GL.GL_UNSIGNED_SHORT if index_type is np.uint16 else GL.GL_UNSIGNED_INT
+        lists = [np.arange(0, self.chunk_size, stride, dtype=index_type) for stride in STRIDES]
+        self.stride_offsets = np.cumsum([0] + [indices.nbytes for indices in lists[:-1]])
+        self.ebo = GL.glGenBuffers(1)
+        GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, self.ebo)
+        GL.glBufferData(GL.GL_ELEMENT_ARRAY_BUFFER, np.concatenate(lists), GL.GL_STATIC_DRAW)
+        GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, 0)
+
+        # Slots are created on first use
+        self.slots = []
+        self.free_slots = []
+        self.pool = ThreadPoolExecutor(max_workers=self.loaders)
+
+    def _new_slot(self):
+        """ A chunk-sized VBO with its own VAO: position at location 0, color at location 1, the shared EBO """
+        vao = GL.glGenVertexArrays(1)
+        vbo = GL.glGenBuffers(1)
+        GL.glBindVertexArray(vao)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, vbo)
+        GL.glBufferData(GL.GL_ARRAY_BUFFER, self.chunk_size * POINT_DTYPE.itemsize, None, GL.GL_DYNAMIC_DRAW)
+        GL.glVertexAttribPointer(0, 3, GL.GL_FLOAT, False, POINT_DTYPE.itemsize, None)
+        GL.glEnableVertexAttribArray(0)
+        GL.glVertexAttribPointer(1, 3, GL.GL_UNSIGNED_BYTE, True, POINT_DTYPE.itemsize, ctypes.c_void_p(12))
+        GL.glEnableVertexAttribArray(1)
+        GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, self.ebo)
+        GL.glBindVertexArray(0)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+        self.slots.append((vao, vbo))
+        return len(self.slots) - 1
+
+    def _read(self, chunk):
+        start = chunk * self.chunk_size
+        # Copying out of the memory map is where the disk is read, off the render thread
+        return np.ascontiguousarray(self.points[start:start + self.chunk_size]).view(np.uint8)
+
+    def _acquire_slot(self, protected):
+        """ A free slot, or the least recently drawn chunk's among those not protected, else None """
+        if self.free_slots:
+            return self.free_slots.pop()
+        if len(self.slots) < self.slot_count:
+            return self._new_slot()
+        for chunk in self.resident:
+            if chunk not in protected:
+                return self.resident.pop(chunk)
+        return None
+
+    def select(self, projection, modelview, camera_pos, viewport_height):
+        """
+        Visible chunks nearest first, with their LOD stride index into STRIDES.
+        :return: (chunk indices, stride indices)
+        """
+        planes = frustum_planes(np.asarray(projection, dtype=np.float64) @ np.asarray(modelview, dtype=np.float64))
+        visible = np.flatnonzero(boxes_in_frustum(planes, self.lows, self.highs))
+
+        distances = np.linalg.norm(self.centers[visible] - np.asarray(camera_pos, dtype=np.float32), axis=1)
+        order = np.argsort(distances)
+        visible, distances = visible[order], distances[order]
+
+        # Screen-space radius in pixels, projection[1][1] is the focal length along y
+        depth = np.maximum(distances - self.radii[visible], 1e-6)
+        pixels = self.radii[visible] * abs(projection[1][1]) / depth * viewport_height / 2
+        wanted = np.maximum(self.points_per_pixel * np.pi * pixels ** 2, 1.0)
+        strides = np.floor(np.log2(np.maximum(self.counts[visible] / wanted, 1.0))).astype(np.int64)
+        return visible, np.clip(strides, 0, len(STRIDES) - 1)
+
+    def stream(self, visible, frame=None):
+        """
+        Start reads of missing visible chunks and upload finished ones, nearest first.
+        :param frame: The viewer's frame number, passes sharing it are drawn into the same frame
+        """
+        if frame is None or frame != self.frame:
+            self.frame = frame
+            self.previous_visible, self.frame_visible = self.frame_visible, set()
+            self.frame_uploads = 0
+            self.streaming = False
+        visible_set = set(visible.tolist())
+        self.frame_visible |= visible_set
+        # What another pass of this frame shows stays, the last frame's union standing in for passes still to come
+        protected = self.frame_visible | self.previous_visible
+
+        # Reads of chunks that left every view are dropped
+        for chunk in list(self.loading):
+            if chunk not in protected and (self.loading[chunk].cancel() or self.loading[chunk].done()):
+                del self.loading[chunk]
+
+        # Visible resident chunks become the most recently drawn, the nearest last
+        for chunk in visible[::-1].tolist():
+            if chunk in self.resident:
+                self.resident.move_to_end(chunk)
+
+        uploads, budget_full = 0, False
+        for chunk in visible.tolist():
+            if chunk in self.resident:
+                continue
+            future = self.loading.get(chunk)
+            if future is None:
+                if len(self.loading) < 4 * self.loaders:
+                    self.loading[chunk] = self.pool.submit(self._read, chunk)
+                continue
+            if not future.done() or self.frame_uploads == self.uploads_per_frame:
+                continue
+            slot = self._acquire_slot(protected)
+            if slot is None:
+                # The budget is taken by nearer visible chunks
+                budget_full = True
+                break
+            data = future.result()
+            del self.loading[chunk]
+            GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.slots[slot][1])
+            GL.glBufferSubData(GL.GL_ARRAY_BUFFER, 0, data.nbytes, data)
+            self.resident[chunk] = slot
+            uploads += 1
+            self.frame_uploads += 1
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+
+        # Any pass of the frame still missing chunks keeps the viewer drawing
+        self.streaming |= not budget_full and any(chunk not in self.resident for chunk in visible_set)
+        if uploads:
+            self.mark_dirty()
+
+    def is_animating(self):
+        return self.streaming
+
+    def release(self):
+        """ Stop the loader threads, pending reads are dropped """
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    def draw(self, **kwargs):
+        projection = self.get_projection_matrix(**kwargs)
+        modelview = self.get_view_matrix(**kwargs)
+        viewport_height = GL.glGetIntegerv(GL.GL_VIEWPORT)[3]
+        visible, strides = self.select(projection, modelview, kwargs["camera_pos"], viewport_height)
+        self.stream(visible, kwargs.get("frame"))
+
+        GL.glUseProgram(self.shader.render_idx)
+        self.uma.upload_uniform_matrix4fv(projection, "projection", True)
+        self.uma.upload_uniform_matrix4fv(modelview, "modelview", True)
+
+        for chunk, stride_index in zip(visible.tolist(), strides.tolist()):
+            slot = self.resident.get(chunk)
+            if slot is None:
+                continue
+            stride = STRIDES[stride_index]
+            # Sparser chunks draw larger points to keep their coverage
+            GL.glPointSize(self.point_size * stride ** 0.5)
+            GL.glBindVertexArray(self.slots[slot][0])
+            count = -(-int(self.counts[chunk]) // stride)
+            GL.glDrawElements(GL.GL_POINTS, count, self.index_type, ctypes.c_void_p(int(self.stride_offsets[stride_index])))
+        GL.glBindVertexArray(0)
@@ -0,0 +1,52 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from point_cloud.chunked_points import POINT_DTYPE, PointFile, spatial_sort, chunk_bounds, prepare
+
+
+def write_cloud(path, count, colors=True, seed=0):
+    rng = np.random.default_rng(seed)
+    points = rng.normal(size=(count, 6 if colors else 3)).astype(np.float32)
+    if colors:
+        points[:, 3:] = rng.random((count, 3), dtype=np.float32)
+    np.save(path, points)
+    return points
+
+
+def as_rows(positions):
+    """ Positions in a canonical order, so two permutations of the same points compare equal """
+    positions = np.ascontiguousarray(positions, dtype=np.float32)
+    return positions[np.lexsort(positions.T[::-1])]
+
+
+@pytest.mark.parametrize("block_size", [1000, 10_000])
+def test_spatial_sort_is_a_permutation(tmp_path, block_size):
+    points = write_cloud(tmp_path / "cloud.npy", 5000)
+    sorted_points = spatial_sort(PointFile(str(tmp_path / "cloud.npy")), str(tmp_path / "sorted.npy"),
+                                 chunk_size=256, block_size=block_size)
+
+    assert sorted_points.dtype == POINT_DTYPE
+    assert len(sorted_points) == len(points)
+    np.testing.assert_array_equal(as_rows(sorted_points["position"]), as_rows(points[:, :3]))
+    # Colors travel with their point
+    records = np.concatenate([sorted_points["position"], sorted_points["color"][:, :3].astype(np.float32)], axis=1)
+    expected = np.concatenate([points[:, :3], np.clip(points[:, 3:] * 255.0, 0, 255).astype(np.uint8)], axis=1)
+    np.testing.assert_array_equal(as_rows(records), as_rows(expected))
+    assert np.all(sorted_points["color"][:, 3] == 255)
+
+
+def test_chunks_are_tighter_than_the_cloud(tmp_path):
+    write_cloud(tmp_path / "cloud.npy", 8192, colors=False)
+    points = prepare(str(tmp_path / "cloud.npy"), chunk_size=512)
+    lows, highs, counts = chunk_bounds(points, 512)
+
+    assert counts.sum() == len(points)
+    positions = points["position"]
+    for chunk, (low, high) in enumerate(zip(lows, highs)):
+        block = positions[chunk * 512:(chunk + 1) * 512]
+        np.testing.assert_array_equal(block.min(axis=0), low)
+        np.testing.assert_array_equal(block.max(axis=0), high)
+    # Spatially sorted chunks span a small part of the cloud's bounding volume
+    cloud_volume = np.prod(positions.max(axis=0) - positions.min(axis=0))
+    assert np.median(np.prod(highs - lows, axis=1)) < cloud_volume / 4
@@ -1,4 +1,3 @@
-from libs import transform as T
 from libs.buffer import *
 import OpenGL.GL as GL
 from model_interface import ModelAbstract
@@ -37,7 +36,7 @@ class Rectangle(ModelAbstract):
         self.vao.activate()
         GL.glUseProgram(self.shader.render_idx)
 
-        projection = T.perspective(fovy=kwargs["fovy"], aspect=kwargs["aspect"], near=kwargs["near"], far=kwargs["far"])
+        projection = self.get_projection_matrix(**kwargs)
         self.uma.upload_uniform_matrix4fv(projection, "projection", True)
 
         modelview = self.get_view_matrix(**kwargs)
@@ -0,0 +1,171 @@
+"""
+Models and viewers main.py can launch, by name. A module is only imported when its entry is used,
+so a Cube viewer never pays for torch, cv2, PIL or tinyobjloader.
+"""
+import importlib
+
+
+def _surface(x, y):
+    # Module level rather than a lambda so models built in scene_manifest's pool processes pickle
+    import torch
+    return torch.sin(3*x) + torch.cos(3*y) + 1
+
+
+def _ripples(x, y, t=0.0):
+    # Plain torch calls and a time argument, glsl_transpile can move it to the vertex shader
+    import torch
+    return torch.sin(3*x + t) + torch.cos(3*y) + 1
+
+
+def _gyroid(x, y, z):
+    import torch
+    return torch.sin(x) * torch.cos(y) + torch.sin(y) * torch.cos(z) + torch.sin(z) * torch.cos(x)
+
+
+def _swirl(x, y, z, t=0.0):
+    import torch
+    return -y, x, torch.sin(2*x + t) * 0.5
+
+
+def _surface_descent(x, y):
+    # Downhill direction of _surface, the field mesh3d's gradient descent follows
+    from vector_3d.vector_field import surface_gradient
+    dzdx, dzdy = surface_gradient(_surface)(x, y)
+    return -dzdx, -dzdy
+
+
+def _mesh3d(vert_shader, frag_shader, **extra):
+    def defaults():
+        kwargs = dict(
+            vert_shader=vert_shader,
+            frag_shader=frag_shader,
+            func=_surface,
+            x_range=(-5, 5),
+            y_range=(-5, 5),
+            resolution=50,
+            lr=0.0001,
+        )
+        kwargs.update(extra)
+        return kwargs
+    return defaults
+
+
+# name: (module, class, keyword arguments or a function returning them)
+MODELS = {
+    "triangle": ("triangle.triangle", "Triangle", dict(
+        vert_shader="triangle/triangle.vert", frag_shader="triangle/triangle.frag")),
+    "rectangle": ("rectangle.rectangle", "Rectangle", dict(
+        vert_shader="rectangle/rectangle.vert", frag_shader="rectangle/rectangle.frag")),
+    "point_3d": ("point_3d.point_3d", "Point3D", dict(
+        vert_shader="point_3d/point.vert", frag_shader="point_3d/point.frag")),
+    "vector_3d": ("vector_3d.vector_3d", "Vector3D", dict(
+        vert_shader="vector_3d/vector.vert", frag_shader="vector_3d/vector.frag")),
+    "line_segment": ("line_segment.line_segment", "LineSegments", dict(
+        vert_shader="line_segment/line_segment.vert", frag_shader="line_segment/line_segment.frag")),
+    "tetrahedron": ("tetrahedron.tetrahedron", "Tetrahedron", dict(
+        vert_shader="tetrahedron/tetrahedron.vert", frag_shader="tetrahedron/tetrahedron.frag")),
+    "cube": ("cube.cube", "Cube", dict(
+        vert_shader="cube/cube.vert", frag_shader="cube/cube.frag")),
+    "sphere": ("sphere.sphere", "Sphere", dict(
+        vert_shader="sphere/sphere.vert", frag_shader="sphere/sphere.frag", N=100, r=0.5)),
+    "cylinder": ("cylinder.cylinder", "Cylinder", dict(
+        vert_shader="cylinder/cylinder.vert", frag_shader="cylinder/cylinder.frag", N=100, R=1, height=2)),
+    "mesh3d": ("mesh_3d.mesh_3d", "Mesh3D", _mesh3d("mesh_3d/mesh.vert", "mesh_3d/mesh.frag")),
+    "mesh3d_depth": ("mesh_3d.mesh_3d", "Mesh3D", _mesh3d("multiple_cams_depth.vert", "multiple_cams_depth.frag")),
+    "mesh3d_lit": ("mesh_3d.mesh_3d", "Mesh3D", _mesh3d("mesh_3d/mesh_lit.vert", "mesh_3d/mesh_lit.frag", resolution=200)),
+    # 1024 starting points descended by each optimizer, compared side by side
+    "mesh3d_particles": ("mesh_3d.mesh_3d", "Mesh3D", _mesh3d(
+        "mesh_3d/mesh.vert", "mesh_3d/mesh.frag", particles=1024, optimizers=("sgd", "momentum", "adam"))),
+    # Heights, colors and normals computed in the vertex shader, the surface ripples over time
+    "mesh3d_gpu": ("mesh_3d.gpu_surface", "GPUSurface", dict(
+        func=_ripples, x_range=(-5, 5), y_range=(-5, 5), resolution=50)),
+    # Unbounded surface, 6 nested 64 x 64 grids following the camera, the finest at mesh3d's spacing
+    "mesh3d_clipmap": ("mesh_3d.clipmap", "Clipmap", dict(func=_surface, levels=6, cells=64, spacing=10 / 49)),
+    # Isosurface f(x, y, z) = 0 by marching cubes, resolution=512 for the 512^3 grid
+    "implicit_surface": ("implicit_surface.implicit_surface", "ImplicitSurface", dict(
+        vert_shader="mesh_3d/mesh_lit.vert", frag_shader="mesh_3d/mesh_lit.frag", func=_gyroid,
+        bounds=((-6, 6), (-6, 6), (-6, 6)), resolution=128)),
+    # Streamed point cloud, e.g. a libs.fusion export: --scene with {"type": "point_cloud", "path": ...}
+    "point_cloud": ("point_cloud.point_cloud", "PointCloud", dict(
+        vert_shader="point_3d/point.vert", frag_shader="point_3d/point.frag", path="fused.npy")),
+    # Instanced arrows, re-sampled over time
+    "vector_field": ("vector_3d.vector_field", "VectorField", dict(
+        vert_shader="vector_3d/arrow.vert", frag_shader="vector_3d/arrow.frag", func=_swirl,
+        bounds=((-2, 2), (-2, 2), (-2, 2)), resolution=12)),
+    # Arrows lying on mesh3d's surface, pointing downhill
+    "vector_field_descent": ("vector_3d.vector_field", "VectorField", dict(
+        vert_shader="vector_3d/arrow.vert", frag_shader="vector_3d/arrow.frag", func=_surface_descent,
+        bounds=((-5, 5), (-5, 5)), resolution=40, heights=_surface)),
+    "obj": ("model.model", "ObjModel", dict(
+        model_path="model/cottage_obj.obj", vert_shader="model/model.vert", frag_shader="model/model.frag")),
+    "obj_textured": ("model.model1", "ObjModel1", dict(
+        model_path="model/cottage_obj.obj", vert_shader="model/model1.vert", frag_shader="model/model1.frag",
+        texture_path="model/Liberty-Pavimentazione-1.bmp")),
+}
+
+
+def _multiples_defaults(width, height):
+    from view_folder.multiple_viewers import Camera
+    return dict(
+        vert_shader="multiple_cams_normal.vert",
+        frag_shader="multiple_cams_normal.frag",
+        move_speed=5,
+        mouse_sentitive=0.1,
+        cameras=[
+            Camera(position=[0, 0, 5], aspect_ratio=width / height, far=30),
+            Camera(position=[0, 0, 10], aspect_ratio=width / height, far=30),
+        ],
+    )
+
+
+# name: (module, class, window width per view width, function(width, height) returning keyword arguments)
+VIEWERS = {
+    "viewer": ("view_folder.viewer", "Viewer", 1, lambda width, height: {}),
+    "rotating": ("view_folder.rotating_viewer", "RotatingViewer", 1, lambda width, height: {}),
+    "moving": ("view_folder.moving_viewer", "MovingViewer", 1,
+               lambda width, height: dict(move_speed=5, mouse_sentitive=0.1)),
+    # Camera view on the left, the active camera's picture on the right
+    "multiples": ("view_folder.multiple_viewers", "MultiplesView", 2, _multiples_defaults),
+}
+
+
+def load(module, class_name):
+    return getattr(importlib.import_module(module), class_name)
+
+
+def _entry(entries, kind, name):
+    if name not in entries:
+        raise Exception(f"Unknown {kind} '{name}', choose from: {', '.join(sorted(entries))}")
+    return entries[name]
+
+
+def model_class(name):
+    module, class_name, _ = _entry(MODELS, "model", name)
+    return load(module, class_name)
+
+
+def model_kwargs(name, **overrides):
+    """ The preset's constructor arguments with overrides applied """
+    _, _, defaults = _entry(MODELS, "model", name)
+    kwargs = defaults() if callable(defaults) else dict(defaults)
+    kwargs.update(overrides)
+    return kwargs
+
+
+def create_model(name, **overrides):
+    return model_class(name)(**model_kwargs(name, **overrides))
+
+
+def window_size(name, width, height):
+    """ Window size of viewer `name` when every view is width x height """
+    _, _, width_scale, _ = _entry(VIEWERS, "viewer", name)
+    return width * width_scale, height
+
+
+def create_viewer(name, width, height, **overrides):
+    """ :param width, height: Size of one view, the window may hold several (see window_size) """
+    module, class_name, _, defaults = _entry(VIEWERS, "viewer", name)
+    kwargs = defaults(width, height)
+    kwargs.update(overrides)
+    window_width, window_height = window_size(name, width, height)
+    return load(module, class_name)(width=window_width, height=window_height, **kwargs)
@@ -0,0 +1,210 @@
+"""
+Scenes described in a JSON or TOML manifest, loaded with the CPU work of every model (OBJ parsing,
+texture decoding, mesh/sphere/cylinder generation) running concurrently in a worker pool:
+
+    {
+        "viewer": "multiples",
+        "width": 640, "height": 480,
+        "viewer_options": {"move_speed": 5},
+        "cameras": [{"position": [0, 0, 5], "far": 30}],
+        "models": [
+            {"type": "mesh3d_depth", "func": "torch.sin(3*x) + torch.cos(3*y) + 1", "resolution": 400},
+            {"type": "obj_textured"}
+        ]
+    }
+
+Every model entry is a registry.MODELS preset plus overrides of its constructor arguments. Model
+constructors do no GL work, so they run in the pool; the GL uploads (each model's setup) then run
+back to back on the main thread. Time to first frame goes from the sum of the load times to about
+the longest one.
+"""
+import os
+import ast
+import json
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import registry
+
+EXECUTORS = {"process": ProcessPoolExecutor, "thread": ThreadPoolExecutor}
+
+# What an expression may be made of: arithmetic, calls, numbers and these names
+EXPRESSION_NODES = (ast.Expression, ast.Name, ast.Load, ast.Attribute, ast.Call, ast.Constant,
+                    ast.BinOp, ast.UnaryOp, ast.operator, ast.unaryop)
+EXPRESSION_NAMES = {"torch", "math", "x", "y"}
+
+
+def validate_expression(source):
+    """
+    Parse a manifest expression, rejecting anything but arithmetic on x, y and numbers, and calls of
+    public torch/math attributes, e.g. "torch.sin(3*x) + math.pi".
+    :return: The ast.Expression
+    """
+    try:
+        tree = ast.parse(source, mode="eval")
+    except SyntaxError as error:
+        raise Exception(f"Invalid expression {source!r}: {error.msg}")
+
+    for node in ast.walk(tree):
+        if not isinstance(node, EXPRESSION_NODES):
+            raise Exception(f"Invalid expression {source!r}: {type(node).__name__} is not allowed")
+        if isinstance(node, ast.Name) and node.id not in EXPRESSION_NAMES:
+            raise Exception(f"Invalid expression {source!r}: unknown name '{node.id}'")
+        if isinstance(node, ast.Attribute):
+            # Only torch.* / math.* chains, never x.attribute or private/dunder attributes
+            root = node
+            while isinstance(root, ast.Attribute):
+                if root.attr.startswith("_"):
+                    raise Exception(f"Invalid expression {source!r}: attribute '{root.attr}' is not allowed")
+                root = root.value
+            if not (isinstance(root, ast.Name) and root.id in ("torch", "math")):
+                raise Exception(f"Invalid expression {source!r}: only torch and math attributes can be used")
+        if isinstance(node, ast.Call) and (not isinstance(node.func, ast.Attribute) or node.keywords):
+            raise Exception(f"Invalid expression {source!r}: only torch/math functions can be called, without keywords")
+        if isinstance(node, ast.Constant) and (isinstance(node.value, bool) or not isinstance(node.value, (int, float))):
+            raise Exception(f"Invalid expression {source!r}: only numbers are allowed as constants")
+    return tree
+
+
+class Expression:
+    """
+    f(x, y) written as a torch expression of x and y, e.g. "torch.sin(3*x) + torch.cos(3*y)".
+    The source is checked by validate_expression and evaluated without builtins.
+    Only the source is pickled, so Mesh3D models built with one can come back from pool processes.
+    """
+    def __init__(self, source):
+        validate_expression(source)
+        self.source = source
+        self.function = None
+
+    def __call__(self, x, y):
+        if self.function is None:
+            import torch
+            self.function = eval(f"lambda x, y: {self.source}", {"__builtins__": {}, "torch": torch, "math": math})
+        return self.function(x, y)
+
+    def __getstate__(self):
+        return {"source": self.source, "function": None}
+
+    def __repr__(self):
+        return f"Expression({self.source!r})"
+
+
+def read_manifest(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".json":
+        with open(path) as file:
+            return json.load(file)
+    if extension == ".toml":
+        try:
+            import tomllib
+        except ImportError:
+            raise Exception("TOML manifests need Python 3.11+ (tomllib), use JSON instead")
+        with open(path, "rb") as file:
+            return tomllib.load(file)
+    raise Exception(f"Unknown manifest format '{extension}', expected .json or .toml")
+
+
+def build_model(entry):
+    """ Construct one manifest model, returns (model, seconds). Runs in the pool workers """
+    start = time.perf_counter()
+    overrides = dict(entry)
+    name = overrides.pop("type")
+    if isinstance(overrides.get("func"), str):
+        overrides["func"] = Expression(overrides["func"])
+    for key in ("x_range", "y_range"):
+        if key in overrides:
+            overrides[key] = tuple(overrides[key])
+    model = registry.create_model(name, **overrides)
+    return model, time.perf_counter() - start
+
+
+class SceneLoader:
+    """
+    Starts building the models as soon as it is started, so the window, context and viewer can be
+    created while the pool works:
+
+        loader = SceneLoader.from_file("scenes/heavy.json")
+        loader.start()
+        view = loader.create_viewer(context=context)
+        loader.finish(view)
+        view.run()
+
+    :param workers: Pool size, None for one per CPU, 0 to build every model inline on the main thread
+    :param executor: "process" (parallel CPU work) or "thread" (cheaper start, shares the GIL)
+    """
+    def __init__(self, manifest, workers=None, executor="process"):
+        if executor not in EXECUTORS:
+            raise Exception(f"Unknown executor '{executor}', choose from: {', '.join(EXECUTORS)}")
+        for entry in manifest.get("models", []):
+            # Checked here rather than failing later inside a worker
+            if entry.get("type") not in registry.MODELS:
+                raise Exception(f"Manifest model {entry} needs a 'type' from: {', '.join(sorted(registry.MODELS))}")
+
+        self.manifest = manifest
+        self.workers = workers
+        self.executor = executor
+        self.pool = None
+        self.futures = []
+        self.start_time = None
+
+    @classmethod
+    def from_file(cls, path, workers=None, executor="process"):
+        return cls(read_manifest(path), workers=workers, executor=executor)
+
+    @property
+    def viewer(self):
+        return self.manifest.get("viewer", "multiples")
+
+    @property
+    def width(self):
+        return self.manifest.get("width", 640)
+
+    @property
+    def height(self):
+        return self.manifest.get("height", 480)
+
+    def window_size(self):
+        return registry.window_size(self.viewer, self.width, self.height)
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        entries = self.manifest.get("models", [])
+        if self.workers == 0 or not entries:
+            return
+        # Started before any GL context exists, forked workers inherit no GL state
+        self.pool = EXECUTORS[self.executor](max_workers=self.workers)
+        self.futures = [self.pool.submit(build_model, entry) for entry in entries]
+
+    def create_viewer(self, **overrides):
+        kwargs = dict(self.manifest.get("viewer_options", {}))
+        if "cameras" in self.manifest:
+            from view_folder.multiple_viewers import Camera
+            kwargs["cameras"] = [
+                Camera(**dict(dict(aspect_ratio=self.width / self.height), **camera))
+                for camera in self.manifest["cameras"]
+            ]
+        kwargs.update(overrides)
+        return registry.create_viewer(self.viewer, self.width, self.height, **kwargs)
+
+    def finish(self, view):
+        """ Wait for the models, then add them to `view` in manifest order (GL uploads on this thread) """
+        if self.start_time is None:
+            self.start()
+        if self.pool is None:
+            built = [build_model(entry) for entry in self.manifest.get("models", [])]
+        else:
+            built = [future.result() for future in self.futures]
+            self.pool.shutdown()
+            self.pool = None
+        loaded = time.perf_counter()
+
+        models = [model for model, _ in built]
+        view.add(*models)
+
+        build_times = [seconds for _, seconds in built]
+        print(f"Scene: {len(models)} models built in {loaded - self.start_time:.3f} s "
+              f"(sum {sum(build_times):.3f} s, longest {max(build_times, default=0.0):.3f} s), "
+              f"uploaded in {time.perf_counter() - loaded:.3f} s")
+        return models
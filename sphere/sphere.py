@@ -1,7 +1,6 @@
 import numpy as np
 from model_interface import ModelAbstract
 
-from libs import transform as T
 from libs.buffer import *
 
 class Sphere(ModelAbstract):
@@ -69,7 +68,7 @@ class Sphere(ModelAbstract):
         self.vao.activate()
         GL.glUseProgram(self.shader.render_idx)
 
-        projection = T.perspective(fovy=kwargs["fovy"], aspect=kwargs["aspect"], near=kwargs["near"], far=kwargs["far"])
+        projection = self.get_projection_matrix(**kwargs)
         self.uma.upload_uniform_matrix4fv(projection, "projection", True)
 
         modelview = self.get_view_matrix(**kwargs)
@@ -0,0 +1,44 @@
+import pickle
+
+import pytest
+
+from scene_manifest import Expression, validate_expression
+
+
+@pytest.mark.parametrize("source", [
+    "torch.sin(3*x) + torch.cos(3*y) + 1",
+    "-x ** 2 + math.pi * y",
+    "torch.exp(-(x*x + y*y) / 0.5)",
+    "torch.nn.functional.relu(x) - 2.5",
+])
+def test_valid_expressions(source):
+    validate_expression(source)
+
+
+@pytest.mark.parametrize("source", [
+    "__import__('os').system('echo unsafe')",
+    "open('/etc/passwd')",
+    "x.__class__",
+    "torch.__builtins__",
+    "().__class__.__bases__[0].__subclasses__()",
+    "[c for c in x]",
+    "lambda: 1",
+    "x if y else 1",
+    "'text'",
+    "torch.sin(x, out=y)",
+    "x(y)",
+    "z + 1",
+    "x +",
+])
+def test_rejected_expressions(source):
+    with pytest.raises(Exception, match="Invalid expression"):
+        Expression(source)
+
+
+def test_expression_pickles_its_source_only():
+    expression = pickle.loads(pickle.dumps(Expression("math.sqrt(2) * x + y")))
+    assert expression.source == "math.sqrt(2) * x + y"
+    assert expression.function is None
+    # Evaluated lazily, so this only needs torch when called
+    torch = pytest.importorskip("torch")
+    assert float(expression(torch.tensor(1.0), torch.tensor(1.0))) == pytest.approx(2 ** 0.5 + 1)
@@ -1,7 +1,6 @@
 from model_interface import ModelAbstract
 import OpenGL.GL as GL
 import numpy as np
-import libs.transform as T
 
 class Tetrahedron(ModelAbstract):
     def __init__(self, vert_shader, frag_shader):
@@ -42,7 +41,7 @@ class Tetrahedron(ModelAbstract):
         self.vao.activate()
         GL.glUseProgram(self.shader.render_idx)
 
-        projection = T.perspective(fovy=kwargs["fovy"], aspect=kwargs["aspect"], near=kwargs["near"], far=kwargs["far"])
+        projection = self.get_projection_matrix(**kwargs)
         self.uma.upload_uniform_matrix4fv(projection, "projection", True)
 
         modelview = self.get_view_matrix(**kwargs)
@@ -0,0 +1,33 @@
+# version 330 core
+
+// The arrow mesh, along +z from 0 to 1
+layout(location = 0) in vec3 position;
+layout(location = 1) in vec3 vertex_normal;
+// Per instance: where the sample is, the field's vector there and its magnitude over the largest one
+layout(location = 2) in vec3 origin;
+layout(location = 3) in vec3 vector;
+layout(location = 4) in float magnitude;
+
+uniform mat4 projection, modelview;
+uniform float glyph_length;     // Length of the largest arrow
+uniform int normalize_length;   // Every arrow glyph_length long, the color alone showing the magnitude
+uniform vec3 lightDir;          // Towards the light, world space
+
+out vec3 fragment_color;
+
+void main()
+{
+    float norm = length(vector);
+    vec3 direction = norm > 0.0 ? vector / norm : vec3(0.0, 0.0, 1.0);
+    vec3 helper = abs(direction.z) < 0.999 ? vec3(0.0, 0.0, 1.0) : vec3(1.0, 0.0, 0.0);
+    vec3 side = normalize(cross(helper, direction));
+    mat3 frame = mat3(side, cross(direction, side), direction);
+
+    // Zero vectors collapse to a point
+    float scale = norm > 0.0 ? glyph_length * (normalize_length != 0 ? 1.0 : magnitude) : 0.0;
+    vec3 world = origin + frame * (position * scale);
+
+    float diffuse = max(dot(frame * vertex_normal, normalize(lightDir)), 0.0);
+    fragment_color = vec3(magnitude, 0.0, 1.0 - magnitude) * (0.35 + 0.65 * diffuse);
+    gl_Position = projection * modelview * vec4(world, 1.0);
+}
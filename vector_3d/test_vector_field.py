@@ -0,0 +1,45 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+pytest.importorskip("OpenGL")
+
+from vector_3d.vector_field import grid_points, sample_field, surface_gradient
+
+
+def surface(x, y):
+    return torch.sin(2 * x) * torch.cos(3 * y) + 0.5 * x * y * y
+
+
+def test_surface_gradient_matches_finite_differences():
+    rng = np.random.default_rng(0)
+    x = torch.from_numpy(rng.uniform(-1, 1, 200))
+    y = torch.from_numpy(rng.uniform(-1, 1, 200))
+    dzdx, dzdy = surface_gradient(surface)(x, y)
+
+    step = 1e-5
+    with torch.no_grad():
+        expected_dx = (surface(x + step, y) - surface(x - step, y)) / (2 * step)
+        expected_dy = (surface(x, y + step) - surface(x, y - step)) / (2 * step)
+    np.testing.assert_allclose(dzdx.numpy(), expected_dx.numpy(), atol=1e-6)
+    np.testing.assert_allclose(dzdy.numpy(), expected_dy.numpy(), atol=1e-6)
+    # The caller's tensors are left alone
+    assert not x.requires_grad and not y.requires_grad
+
+
+def test_surface_gradient_of_a_constant_is_zero():
+    x = torch.linspace(-1, 1, 5)
+    dzdx, dzdy = surface_gradient(lambda x, y: torch.ones_like(x))(x, x)
+    assert torch.all(dzdx == 0) and torch.all(dzdy == 0)
+
+
+def test_sampled_gradient_field_is_3d():
+    coordinates, origins, spacing = grid_points(((-1, 1), (-1, 1)), 6, heights=surface)
+    assert coordinates.shape == (36, 2) and origins.shape == (36, 3)
+    assert spacing == pytest.approx(0.4)
+    np.testing.assert_allclose(origins[:, 2], surface(torch.from_numpy(coordinates[:, 0]),
+                                                      torch.from_numpy(coordinates[:, 1])).numpy(), atol=1e-6)
+
+    vectors = sample_field(surface_gradient(surface), coordinates)
+    assert vectors.shape == (36, 3) and vectors.dtype == np.float32
+    assert np.all(vectors[:, 2] == 0)
@@ -1,7 +1,6 @@
 from model_interface import ModelAbstract
 import numpy as np
 import OpenGL.GL as GL
-import libs.transform as T
 
 class Vector3D(ModelAbstract):
     def __init__(self, vert_shader, frag_shader):
@@ -29,7 +28,7 @@ class Vector3D(ModelAbstract):
         self.vao.activate()
         GL.glUseProgram(self.shader.render_idx)
 
-        projection = T.perspective(fovy=kwargs["fovy"], aspect=kwargs["aspect"], near=kwargs["near"], far=kwargs["far"])
+        projection = self.get_projection_matrix(**kwargs)
         self.uma.upload_uniform_matrix4fv(projection, "projection", True)
         
         modelview = self.get_view_matrix(**kwargs)
@@ -0,0 +1,231 @@
+import ctypes
+import inspect
+
+import numpy as np
+import OpenGL.GL as GL
+import torch
+
+from model_interface import ModelAbstract
+
+# Per-instance record: origin xyz, vector xyz, normalized magnitude
+INSTANCE_FLOATS = 7
+
+
+def arrow_mesh(segments=12, shaft_radius=0.03, head_radius=0.08, head_length=0.3):
+    """
+    Unit arrow along +z from the origin: a capped shaft and a cone head.
+    :return: vertices (float32), normals (float32), triangle indices (uint32)
+    """
+    angle = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+    ring = np.column_stack((np.cos(angle), np.sin(angle), np.zeros(segments)))
+    down = np.tile([0.0, 0.0, -1.0], (segments, 1))
+    base = 1.0 - head_length
+    cone = ring + [0.0, 0.0, head_radius / head_length]
+    cone /= np.linalg.norm(cone, axis=1, keepdims=True)
+
+    i = np.arange(segments)
+    j = (i + 1) % segments
+    vertices, normals, triangles, first = [], [], [], 0
+
+    def add(part_vertices, part_normals, part_triangles):
+        nonlocal first
+        vertices.append(part_vertices)
+        normals.append(part_normals)
+        triangles.append(part_triangles + first)
+        first += len(part_vertices)
+
+    # Shaft side: bottom ring then top ring
+    add(np.concatenate([ring * shaft_radius, ring * shaft_radius + [0.0, 0.0, base]]),
+        np.concatenate([ring, ring]),
+        np.concatenate([np.stack((i, j, segments + i), 1), np.stack((j, segments + j, segments + i), 1)]))
+    # Cone: base ring then one tip per segment, each with the normal of its side
+    add(np.concatenate([ring * head_radius + [0.0, 0.0, base], np.tile([0.0, 0.0, 1.0], (segments, 1))]),
+        np.concatenate([cone, cone]),
+        np.stack((i, j, segments + i), 1))
+    # Back of the head and bottom of the shaft, facing -z: ring then center
+    for radius, z in ((head_radius, base), (shaft_radius, 0.0)):
+        add(np.concatenate([ring * radius + [0.0, 0.0, z], [[0.0, 0.0, z]]]),
+            np.concatenate([down, [[0.0, 0.0, -1.0]]]),
+            np.stack((np.full(segments, segments), j, i), 1))
+
+    return (np.concatenate(vertices).astype(np.float32), np.concatenate(normals).astype(np.float32),
+            np.concatenate(triangles).astype(np.uint32).ravel())
+
+
+def grid_points(bounds, resolution, heights=None):
+    """
+    :param bounds: ((x_min, x_max), (y_min, y_max)) or with (z_min, z_max) for a 3D grid
+    :param resolution: Samples along every axis, or one count per axis
+    :param heights: For 2D grids, z = heights(x, y) of the origins (e.g. Mesh3D.func), z = 0 when None
+    :return: (N, 2 or 3) float32 sample coordinates, (N, 3) float32 glyph origins, smallest grid spacing
+    """
+    if isinstance(resolution, int):
+        resolution = (resolution,) * len(bounds)
+    axes = [np.linspace(low, high, count, dtype=np.float32) for (low, high), count in zip(bounds, resolution)]
+    coordinates = np.column_stack([axis.ravel() for axis in np.meshgrid(*axes, indexing="ij")])
+    spacing = min((high - low) / max(count - 1, 1) for (low, high), count in zip(bounds, resolution))
+
+    if coordinates.shape[1] == 3:
+        return coordinates, coordinates, spacing
+    origins = np.zeros((len(coordinates), 3), dtype=np.float32)
+    origins[:, :2] = coordinates
+    if heights is not None:
+        with torch.no_grad():
+            z = heights(torch.from_numpy(coordinates[:, 0]), torch.from_numpy(coordinates[:, 1]))
+        origins[:, 2] = to_numpy(z, len(coordinates))
+    return coordinates, origins, spacing
+
+
+def to_numpy(values, count):
+    """ A torch tensor, array or scalar as a (count,) float32 array """
+    if isinstance(values, torch.Tensor):
+        values = values.detach().numpy()
+    return np.broadcast_to(np.asarray(values, dtype=np.float32), (count,))
+
+
+def sample_field(func, coordinates, t=None):
+    """
+    func over every sample in one call, with torch tensors (NumPy functions get them as arrays).
+    :param func: func(x, y) or func(x, y, z), optionally with a `t` time argument, returning the
+        vectors' components as a tuple or an (N, 2 or 3) tensor/array
+    :param t: Time passed as `t`, when func takes one
+    :return: (N, 3) float32 vectors, 2D vectors with a zero z
+    """
+    count = len(coordinates)
+    arguments = [torch.from_numpy(np.ascontiguousarray(coordinates[:, axis])) for axis in range(coordinates.shape[1])]
+    kwargs = {} if t is None else {"t": t}
+    with torch.no_grad():
+        result = func(*arguments, **kwargs)
+
+    if isinstance(result, (tuple, list)):
+        vectors = np.column_stack([to_numpy(component, count) for component in result])
+    else:
+        vectors = (result.detach().numpy() if isinstance(result, torch.Tensor) else np.asarray(result))
+        vectors = vectors.reshape(count, -1).astype(np.float32)
+    if vectors.shape[1] == 2:
+        vectors = np.column_stack((vectors, np.zeros(count, dtype=np.float32)))
+    if vectors.shape[1] != 3:
+        raise Exception(f"A vector field returns 2 or 3 components, got {vectors.shape[1]}")
+    return vectors
+
+
+def surface_gradient(func):
+    """
+    The gradient field (df/dx, df/dy) of a surface function z = func(x, y) such as Mesh3D.func, every
+    sample's derivatives from one backward pass (func works element-wise).
+    """
+    def gradient(x, y):
+        x = x.detach().clone().requires_grad_(True)
+        y = y.detach().clone().requires_grad_(True)
+        with torch.enable_grad():
+            z = func(x, y)
+            dzdx, dzdy = torch.autograd.grad(z.sum(), (x, y), allow_unused=True) if z.requires_grad else (None, None)
+        dzdx = torch.zeros_like(x) if dzdx is None else dzdx
+        dzdy = torch.zeros_like(y) if dzdy is None else dzdy
+        return dzdx.detach(), dzdy.detach()
+    return gradient
+
+
+class VectorField(ModelAbstract):
+    """
+    Arrow glyphs of a vector field sampled on a 2D or 3D grid: one arrow mesh drawn instanced, every
+    sample an instance of (origin, vector, normalized magnitude) in a single interleaved buffer. Fields
+    with a `t` argument are re-sampled as time goes by, and only that instance buffer is re-uploaded.
+    """
+    def __init__(self, vert_shader, frag_shader, func, bounds=((-1, 1), (-1, 1), (-1, 1)), resolution=10,
+                 heights=None, glyph_length=None, normalize_length=False, animate=True, segments=12):
+        """
+        :param func: The field, see sample_field
+        :param bounds: The ranges of x, y (and z for a 3D grid)
+        :param resolution: The number of samples along every axis, or one count per axis
+        :param heights: Surface z = heights(x, y) 2D fields are drawn on, z = 0 when None
+        :param glyph_length: Length of the largest arrow, 0.9 grid spacing when None
+        :param normalize_length: Draw every arrow at glyph_length, the color alone showing the magnitude
+        :param animate: Re-sample fields that take a `t` argument on every update
+        """
+        super().__init__(vert_shader, frag_shader)
+        self.func = func
+        self.normalize_length = normalize_length
+        self.vertices, self.normals, self.indices = arrow_mesh(segments)
+
+        self.coordinates, self.origins, spacing = grid_points(bounds, resolution, heights)
+        self.glyph_length = 0.9 * spacing if glyph_length is None else glyph_length
+        try:
+            self.timed = "t" in inspect.signature(func).parameters
+        except (TypeError, ValueError):
+            self.timed = False
+        self.animate = animate and self.timed
+
+        # Towards the light, as Mesh3D's lit shaders
+        self.light_direction = np.array([0.3, 0.5, 1.0], dtype=np.float32)
+        self.time = 0.0
+        self.instances = np.zeros((len(self.origins), INSTANCE_FLOATS), dtype=np.float32)
+        self.instances[:, :3] = self.origins
+        self.uploaded_version = None
+        self.resample()
+
+    def resample(self, t=None):
+        """ Sample the field again, at time t for timed fields (the current time when None) """
+        if t is not None:
+            self.time = t
+        vectors = sample_field(self.func, self.coordinates, self.time if self.timed else None)
+        magnitudes = np.linalg.norm(vectors, axis=1)
+        largest = magnitudes.max() if len(magnitudes) else 0.0
+        self.instances[:, 3:6] = vectors
+        self.instances[:, 6] = magnitudes / largest if largest > 0 else 0.0
+        self.mark_dirty()
+
+    def is_animating(self):
+        return self.animate
+
+    def update(self, dt):
+        if self.animate:
+            self.resample(self.time + dt)
+
+    def setup(self):
+        super().setup()
+
+        self.vao.add_vbo(0, self.vertices, ncomponents=3, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None)
+        self.vao.add_vbo(1, self.normals, ncomponents=3, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None)
+        self.vao.add_ebo(self.indices)
+
+        # Instances interleaved in one buffer, so a new sample is a single upload
+        self.vao.activate()
+        instance_buffer = GL.glGenBuffers(1)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, instance_buffer)
+        GL.glBufferData(GL.GL_ARRAY_BUFFER, self.instances, GL.GL_DYNAMIC_DRAW)
+        stride = self.instances.itemsize * INSTANCE_FLOATS
+        for location, ncomponents, first in ((2, 3, 0), (3, 3, 3), (4, 1, 6)):
+            GL.glVertexAttribPointer(location, ncomponents, GL.GL_FLOAT, False, stride,
+                                     ctypes.c_void_p(first * self.instances.itemsize))
+            GL.glEnableVertexAttribArray(location)
+            GL.glVertexAttribDivisor(location, 1)
+        # Freed with the VAO's other buffers
+        self.vao.vbo[2] = instance_buffer
+        self.vao.deactivate()
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+        self.uploaded_version = self.version
+
+    def draw(self, **kwargs):
+        if self.uploaded_version != self.version:
+            GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.vao.vbo[2])
+            GL.glBufferSubData(GL.GL_ARRAY_BUFFER, 0, self.instances.nbytes, self.instances)
+            GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+            self.uploaded_version = self.version
+
+        self.vao.activate()
+        GL.glUseProgram(self.shader.render_idx)
+
+        projection = self.get_projection_matrix(**kwargs)
+        self.uma.upload_uniform_matrix4fv(projection, "projection", True)
+
+        modelview = self.get_view_matrix(**kwargs)
+        self.uma.upload_uniform_matrix4fv(modelview, "modelview", True)
+
+        self.uma.upload_uniform_scalar1f(self.glyph_length, "glyph_length")
+        self.uma.upload_uniform_scalar1i(int(self.normalize_length), "normalize_length")
+        self.uma.upload_uniform_vector3fv(self.light_direction, "lightDir")
+
+        GL.glDrawElementsInstanced(GL.GL_TRIANGLES, len(self.indices), GL.GL_UNSIGNED_INT, None, len(self.instances))
+
+        self.vao.deactivate()
@@ -0,0 +1,116 @@
+import time
+import numpy as np
+import OpenGL.GL as GL
+from typing import Iterable
+
+from libs.context import create_context
+from libs.render_target import RenderTarget
+from libs.frame_writer import AsyncFrameWriter
+from libs.readback import PBOReadback
+from libs.depth import depth_to_distance
+from view_folder.multiple_viewers import Camera
+
+REPORT_EVERY = 100
+
+
+def orbit_cameras(count, radius, height=0.0, target=(0, 0, 0), aspect_ratio=4 / 3, **camera_kwargs):
+    """ Generator of cameras evenly spaced on a horizontal circle, all looking at target """
+    target = np.asarray(target, dtype=np.float32)
+    for index in range(count):
+        angle = 2 * np.pi * index / count
+        position = target + np.array([radius * np.cos(angle), height, radius * np.sin(angle)], dtype=np.float32)
+        yield Camera(aspect_ratio=aspect_ratio, position=position, target=target, **camera_kwargs)
+
+
+class BatchRenderer:
+    """
+    Renders a scene from many camera poses and writes per view a color PNG and a float32 NPY
+    holding the Euclidean camera distance of every pixel (inf for background).
+
+        renderer = BatchRenderer(width=640, height=480, output_dir="dataset")
+        renderer.add(model)
+        stats = renderer.render(orbit_cameras(1000, radius=8, height=3, aspect_ratio=640 / 480))
+    """
+    def __init__(self, width=640, height=480, output_dir="output", context=None, workers=4, max_pending=32):
+        # Hidden work is the point here, a headless context is the usual choice
+        self.context = context or create_context(width, height, "Batch")
+        self.width, self.height = width, height
+
+        GL.glEnable(GL.GL_DEPTH_TEST)
+        self.target = RenderTarget(width, height)
+
+        self.output_dir = output_dir
+        self.workers = workers
+        self.max_pending = max_pending
+
+        self.drawables = []
+
+    def add(self, *drawables):
+        self.context.make_current()
+        for drawable in drawables:
+            drawable.setup()
+        self.drawables.extend(drawables)
+
+    def release(self):
+        """ Release every drawable and the render target, once the viewer is done with them """
+        for drawable in self.drawables:
+            drawable.release()
+        self.target.release()
+
+    def render_view(self, camera: Camera):
+        self.target.bind()
+        GL.glClearColor(1.0, 1.0, 1.0, 1.0)
+        GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
+
+        for drawable in self.drawables:
+            drawable.draw(**camera.draw_kwargs())
+
+    def render(self, cameras: Iterable[Camera], start_index=0):
+        """
+        Render every camera of a list or generator.
+        :return: dict with the number of views, elapsed seconds and sustained views per second
+        """
+        writer = AsyncFrameWriter(self.output_dir, workers=self.workers, max_pending=self.max_pending)
+
+        # Reads land a view or two later, the mapped views are copied before they go to the writer threads
+        color_readback = PBOReadback(
+            self.width, self.height,
+            on_ready=lambda index, image: writer.submit(index, color=image.copy())
+        )
+        # Projection parameters of the views whose depth is still in flight
+        projections = {}
+
+        def on_depth(index, depth):
+            distance = depth_to_distance(depth, **projections.pop(index))
+            writer.submit(index, depth=distance)
+
+        depth_readback = PBOReadback(
+            self.width, self.height, on_ready=on_depth,
+            format=GL.GL_DEPTH_COMPONENT, type=GL.GL_FLOAT, channels=1, dtype=np.float32
+        )
+
+        start = time.perf_counter()
+        count = 0
+        for index, camera in enumerate(cameras, start=start_index):
+            self.render_view(camera)
+            projections[index] = dict(fovy=camera.fov, aspect=camera.aspect_ratio, near=camera.near, far=camera.far)
+            color_readback.issue(self.target.framebuffer, tag=index)
+            depth_readback.issue(self.target.framebuffer, tag=index)
+            color_readback.poll()
+            depth_readback.poll()
+            count += 1
+
+            if count % REPORT_EVERY == 0:
+                elapsed = time.perf_counter() - start
+                print(f"{count} views, {count / elapsed:.1f} views/s, {writer.pending()} waiting for disk")
+
+        # Views only count once they are on disk
+        color_readback.flush()
+        depth_readback.flush()
+        color_readback.release()
+        depth_readback.release()
+        writer.close()
+        elapsed = time.perf_counter() - start
+        stats = {"views": count, "seconds": elapsed, "views_per_second": count / elapsed if elapsed > 0 else 0.0}
+        print(f"Rendered {count} views in {elapsed:.2f}s ({stats['views_per_second']:.1f} views/s)")
+        return stats
@@ -0,0 +1,72 @@
+import time
+
+
+class FrameClock:
+    """
+    Real frame timing for the viewers' run loops.
+
+    tick() measures the time since the previous frame with the context clock (glfw.get_time for a window)
+    and turns it into a whole number of fixed simulation steps; the remainder becomes `alpha`, the
+    fraction of a step rendering should interpolate by. Headless contexts advance exactly one step per
+    frame so offline renders are reproducible.
+    """
+    def __init__(self, context, timestep=1 / 60.0, max_steps=5, vsync=True, frame_cap=None):
+        """
+        :param timestep: Simulation step in seconds, the same on every machine and at every frame rate
+        :param max_steps: Most steps simulated per frame, under heavier load the simulation slows down instead
+        :param vsync: Wait for the vertical blank in swap_buffers (glfw.swap_interval(1)), False to run uncapped
+        :param frame_cap: Highest frame rate (frames per second) when vsync is off, None for no cap
+        """
+        self.context = context
+        self.timestep = timestep
+        self.max_steps = max_steps
+        self.frame_cap = frame_cap
+        self.set_vsync(vsync)
+
+        self.last_time = None
+        self.accumulator = 0.0
+        self.alpha = 1.0
+        self.frame_time = 0.0
+
+        # Frames per second, refreshed once a second
+        self.fps = 0.0
+        self.frames = 0
+        self.report_time = None
+
+    def set_vsync(self, vsync):
+        self.vsync = vsync
+        self.context.swap_interval(1 if vsync else 0)
+
+    def tick(self):
+        """ Start a frame, returns the number of fixed steps to simulate before rendering it """
+        now = self.context.get_time()
+        if self.last_time is None:
+            self.last_time = self.report_time = now
+            return 0
+
+        self.frame_time = now - self.last_time
+        self.last_time = now
+
+        self.frames += 1
+        if now - self.report_time >= 1.0:
+            self.fps = self.frames / (now - self.report_time)
+            self.frames, self.report_time = 0, now
+
+        if not self.context.interactive:
+            self.alpha = 1.0
+            return 1
+
+        self.accumulator += self.frame_time
+        steps = min(int(self.accumulator / self.timestep), self.max_steps)
+        # Time beyond max_steps is dropped rather than carried into the next frames
+        self.accumulator = min(self.accumulator - steps * self.timestep, self.timestep)
+        self.alpha = self.accumulator / self.timestep
+        return steps
+
+    def limit(self):
+        """ Call after swap_buffers: sleeps off the rest of the frame when a frame cap is set """
+        if self.frame_cap is None or self.vsync or self.last_time is None:
+            return
+        remaining = self.last_time + 1.0 / self.frame_cap - self.context.get_time()
+        if remaining > 0:
+            time.sleep(remaining)
@@ -1,30 +1,34 @@
 import glfw
 import numpy as np
 import OpenGL.GL as GL
+from libs.context import create_context
+from view_folder.redraw import RedrawScheduler
+from view_folder.frame_clock import FrameClock
+from libs.transform import lerp
 
+# Default fixed simulation timestep (seconds)
 FRAME_PER_SECOND = 1 / 60.0
 
-class MovingViewer:
-    def __init__(self, move_speed, mouse_sentitive, width=640, height=480):
-
-        glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 3)
-        glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 3)
-        glfw.window_hint(glfw.OPENGL_FORWARD_COMPAT, GL.GL_TRUE)
-        glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
-        glfw.window_hint(glfw.RESIZABLE, False)
-        
-        self.win = glfw.create_window(width, height, "Viewer", None, None)
+MOTION_KEYS = (glfw.KEY_W, glfw.KEY_S, glfw.KEY_A, glfw.KEY_D)
 
-        if not self.win:
-            raise Exception("Failed to create GLFW Window")
-        
-        # make win's OpenGL context current; no OpenGL calls can happen before
-        glfw.make_context_current(self.win)
+class MovingViewer:
+    def __init__(self, move_speed, mouse_sentitive, width=640, height=480, on_demand=False, context=None,
+                 vsync=True, frame_cap=None, timestep=FRAME_PER_SECOND):
+        """
+        :param move_speed: Units per second while a movement key is held
+        :param vsync: Sync swaps to the display, turn off (optionally with frame_cap) to measure uncapped throughput
+        :param frame_cap: Highest frame rate without vsync, None for uncapped
+        :param timestep: Fixed simulation step (seconds) of camera motion and drawables' update()
+        """
+
+        # GLFW window by default, a headless EGL/OSMesa context when PYOPENGL_PLATFORM asks for one
+        self.context = context or create_context(width, height, "Viewer")
+        self.win = self.context.win
 
         # register event handlers
-        glfw.set_key_callback(self.win, self.on_key)
-        glfw.set_cursor_pos_callback(self.win, self.on_mouse_move)
-        glfw.set_input_mode(self.win, glfw.CURSOR, glfw.CURSOR_DISABLED)
+        self.context.set_key_callback(self.on_key)
+        self.context.set_cursor_pos_callback(self.on_mouse_move)
+        self.context.disable_cursor()
 
         # useful message to check OpenGL renderer characteristics
         print('OpenGL', GL.glGetString(GL.GL_VERSION).decode() + ', GLSL',
@@ -35,6 +39,7 @@ class MovingViewer:
         GL.glEnable(GL.GL_DEPTH_TEST)
 
         self.camera_pos = np.array([0.0, 0.0, 3.0], dtype=np.float32)
+        self.previous_camera_pos = self.camera_pos.copy()
         self.camera_front = np.array([0.0, 0.0, -1.0], dtype=np.float32)
         self.camera_up = np.array([0.0, 1.0, 0.0], dtype=np.float32)
         self.yaw = -90.0  # Initialize facing forward (negative z-axis)
@@ -47,49 +52,97 @@ class MovingViewer:
         self.last_y = height // 2
         self.first_mouse = True
 
-        self.move_speed = move_speed * FRAME_PER_SECOND
+        self.move_speed = move_speed
         self.mouse_sensitive = mouse_sentitive
 
         self.drawables = []
+        self.recorders = []
 
-    def run(self):
-        while not glfw.window_should_close(self.win):
-            GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
-
-            for drawable in self.drawables:
-                drawable.draw(
-                    camera_pos=self.camera_pos, 
-                    camera_front=self.camera_front, 
-                    camera_up=self.camera_up,
-                    fovy=45,
-                    aspect=self.aspect_ratio,
-                    near=0.1,
-                    far=100
-                )
+        self.redraw = RedrawScheduler(self.context, on_demand=on_demand)
+        self.clock = FrameClock(self.context, timestep=timestep, vsync=vsync, frame_cap=frame_cap)
 
-            glfw.swap_buffers(self.win)
+        # Movement keys currently held down, applied once per simulation step
+        self.held_keys = set()
 
-            glfw.poll_events()
+    def run(self):
+        while not self.context.should_close():
+            for _ in range(self.clock.tick()):
+                self.update(self.clock.timestep)
+            if self.held_keys:
+                self.redraw.request_redraw()
+
+            if self.redraw.needs_redraw(self.drawables):
+                GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
+
+                alpha = self.clock.alpha
+                for drawable in self.drawables:
+                    drawable.draw(
+                        alpha=alpha,
+                        camera_pos=lerp(self.previous_camera_pos, self.camera_pos, alpha), 
+                        camera_front=self.camera_front, 
+                        camera_up=self.camera_up,
+                        fovy=45,
+                        aspect=self.aspect_ratio,
+                        near=0.1,
+                        far=100
+                    )
+
+                for recorder in self.recorders:
+                    recorder.capture(self.context.framebuffer)
+
+                self.context.swap_buffers()
+                self.redraw.frame_drawn(self.drawables)
+                self.clock.limit()
+
+            self.redraw.wait_events(self.drawables)
+
+    def update(self, dt):
+        """ One fixed simulation step: motion of the held keys and every drawable's update() """
+        self.previous_camera_pos = self.camera_pos.copy()
+        for key in self.held_keys:
+            self.move(key, dt)
+
+        for drawable in self.drawables:
+            drawable.update(dt)
 
     def add(self, *drawables):
-        glfw.make_context_current(self.win)
+        self.context.make_current()
         for drawable in drawables:
             drawable.setup()
 
         self.drawables.extend(drawables)
+        self.redraw.request_redraw()
+
+    def release(self):
+        """ Release every drawable, once the viewer is done with them """
+        for drawable in self.drawables:
+            drawable.release()
+
+    def request_redraw(self):
+        self.redraw.request_redraw()
+
+    def record(self, recorder):
+        """ Feed every rendered frame of the window to a libs.recorder.VideoRecorder """
+        self.recorders.append(recorder)
 
-    def move(self, key):
+    def stop_recording(self):
+        for recorder in self.recorders:
+            recorder.close()
+        self.recorders = []
+
+    def move(self, key, dt=FRAME_PER_SECOND):
         if key == glfw.KEY_W:  # Move forward
-            self.camera_pos += self.move_speed * self.camera_front
+            self.camera_pos += self.move_speed * self.camera_front * dt
         elif key == glfw.KEY_S:  # Move backward
-            self.camera_pos -= self.move_speed * self.camera_front
+            self.camera_pos -= self.move_speed * self.camera_front * dt
         elif key == glfw.KEY_A:  # Move left
-            self.camera_pos -= np.cross(self.camera_front, self.camera_up) * self.move_speed
+            self.camera_pos -= np.cross(self.camera_front, self.camera_up) * self.move_speed * dt
         elif key == glfw.KEY_D:  # Move right
-            self.camera_pos += np.cross(self.camera_front, self.camera_up) * self.move_speed
+            self.camera_pos += np.cross(self.camera_front, self.camera_up) * self.move_speed * dt
 
     def on_mouse_move(self, _win, xpos, ypos):
         """ Handle mouse movement for changing camera direction """
+        self.redraw.request_redraw()
         if self.first_mouse:
             self.last_x = xpos
             self.last_y = ypos
@@ -127,11 +180,17 @@ class MovingViewer:
 
     def on_key(self, _win, key, _scancode, action, _mods):
         """ 'Q' or 'Escape' quits """
+        self.redraw.request_redraw()
+        # Motion follows how long a key is held, not the key repeat rate
+        if key in MOTION_KEYS:
+            if action == glfw.PRESS:
+                self.held_keys.add(key)
+            elif action == glfw.RELEASE:
+                self.held_keys.discard(key)
+
         if action == glfw.PRESS or action == glfw.REPEAT:
             if key == glfw.KEY_ESCAPE or key == glfw.KEY_Q:
-                glfw.set_window_should_close(self.win, True)
-
-            self.move(key=key)
+                self.context.set_should_close(True)
 
             for drawable in self.drawables:
                 if hasattr(drawable, 'key_handler'):
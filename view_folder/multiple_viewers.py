@@ -1,16 +1,23 @@
 import glfw
-import cv2
-import copy
 import glfw.GLFW
 import numpy as np
 import OpenGL.GL as GL
-import glfw.GLFW as GLFW_CONSTANTS
 from typing import List
 from model_interface import ModelAbstract
-from libs.transform import perspective, lookat, normalized, vec, ortho
-
+from libs.context import create_context
+from libs.readback import PBOReadback
+from libs.render_target import RenderTarget
+from libs.depth import depth_to_distance
+from libs.profiler import NullProfiler
+from view_folder.redraw import RedrawScheduler
+from view_folder.frame_clock import FrameClock
+from libs.transform import perspective, normalized, vec, lerp
+
+# Default fixed simulation timestep (seconds)
 FRAME_PER_SECOND = 1 / 60.0
 
+MOTION_KEYS = (glfw.KEY_W, glfw.KEY_S, glfw.KEY_A, glfw.KEY_D, glfw.KEY_Y, glfw.KEY_H)
+
 class Camera:
     def __init__(
             self, 
@@ -39,53 +46,99 @@ class Camera:
         self.move_speed = move_speed
         self.mouse_sentitive = mouse_sentitive
 
+        # Bumped on every pose/projection change, cached camera passes compare against it
+        self.version = 0
+
         self.initialize_camera_status(target=target)
+        self.save_state()
+
+    def save_state(self):
+        """ Remember the pose before a simulation step, draw_kwargs(alpha) interpolates from it """
+        self.previous_position = self.position.copy()
+        self.previous_fov = self.fov
+
+    def is_moving(self):
+        """ The last simulation step changed the position or the field of view """
+        return self.previous_fov != self.fov or not np.array_equal(self.previous_position, self.position)
+
+    def mark_dirty(self):
+        """ Call after changing position, orientation or projection parameters directly """
+        self.version += 1
+
+    def draw_kwargs(self, alpha=1.0):
+        """
+        Keyword arguments drawables expect in draw() to render from this camera.
+        :param alpha: Interpolate the pose between the previous and the current simulation step
+        """
+        interpolate = alpha < 1.0 and self.is_moving()
+        return dict(
+            camera_pos=lerp(self.previous_position, self.position, alpha) if interpolate else self.position,
+            camera_front=self.front,
+            camera_up=self.up,
+            fovy=lerp(self.previous_fov, self.fov, alpha) if interpolate else self.fov,
+            aspect=self.aspect_ratio,
+            near=self.near,
+            far=self.far
+        )
 
     def initialize_camera_status(self, target):
         self.front = normalized(vec(target)[:3] - vec(self.position)[:3])
+        self.mark_dirty()
 
     def update_camera_status(self):
-        self.front = np.array([
+        front = np.array([
             np.cos(np.radians(self.yaw)) * np.cos(np.radians(self.pitch)),
             np.sin(np.radians(self.pitch)),
             np.sin(np.radians(self.yaw)) * np.cos(np.radians(self.pitch))
         ], dtype=np.float32)
-        self.front = normalized(self.front)
-
-    def zoom_in(self):
-        self.fov += 10 * FRAME_PER_SECOND
-
-    def zoom_out(self):
-        self.fov -= 10 * FRAME_PER_SECOND
+        front = normalized(front)
+        if not np.array_equal(front, self.front):
+            self.front = front
+            self.mark_dirty()
+
+    def zoom_in(self, dt=FRAME_PER_SECOND):
+        self.fov += 10 * dt
+        self.mark_dirty()
+
+    def zoom_out(self, dt=FRAME_PER_SECOND):
+        self.fov -= 10 * dt
+        self.mark_dirty()
     
-    def forward(self):
-        self.position += self.move_speed * self.front * FRAME_PER_SECOND
+    def forward(self, dt=FRAME_PER_SECOND):
+        self.position += self.move_speed * self.front * dt
+        self.mark_dirty()
     
-    def backward(self):
-        self.position -= self.move_speed * self.front * FRAME_PER_SECOND
+    def backward(self, dt=FRAME_PER_SECOND):
+        self.position -= self.move_speed * self.front * dt
+        self.mark_dirty()
 
-    def go_left(self):
-        self.position -= np.cross(self.front, self.up) * self.move_speed * FRAME_PER_SECOND
+    def go_left(self, dt=FRAME_PER_SECOND):
+        self.position -= np.cross(self.front, self.up) * self.move_speed * dt
+        self.mark_dirty()
 
-    def go_right(self):
-        self.position += np.cross(self.front, self.up) * self.move_speed * FRAME_PER_SECOND
+    def go_right(self, dt=FRAME_PER_SECOND):
+        self.position += np.cross(self.front, self.up) * self.move_speed * dt
+        self.mark_dirty()
 
     def rotate_x(self, xoffset):
         self.yaw += xoffset * self.mouse_sentitive
+        self.mark_dirty()
 
     def rotate_y(self, yoffset):
         self.pitch += yoffset * self.mouse_sentitive
+        self.mark_dirty()
         # if self.pitch > 85:
         #     self.pitch = 85
         # elif self.pitch < -85:
         #     self.pitch = -85
 
 class VirtualScreen(ModelAbstract):
-    def __init__(self, vert_shader, frag_shader, camera, frame, width, height):
+    def __init__(self, vert_shader, frag_shader, camera, target: RenderTarget):
         super().__init__(vert_shader, frag_shader)
         self.camera = camera
-        self.width = width
-        self.height = height
+        self.target = target
+        self.width = target.width
+        self.height = target.height
         self.texcoords = np.array([
             [0, 1],
             [1, 1],
@@ -94,23 +147,18 @@ class VirtualScreen(ModelAbstract):
         ], dtype=np.float32)
 
         self.indices = np.array([0, 1, 2, 2, 1, 3], dtype=np.int32)
-        self.frame = frame
+        self.frame = target.framebuffer
+        self.texture = target.color_texture
+        self.uploaded_version = None
 
-        self.texture = GL.glGenTextures(1)
-        GL.glBindTexture(GL.GL_TEXTURE_2D, self.texture)
-        GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGB, width, height, 0, GL.GL_RGB, GL.GL_UNSIGNED_BYTE, None)
-        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, GL.GL_LINEAR)
-        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_LINEAR)
-        
     def capture_color(self):
-        GL.glBindTexture(GL.GL_TEXTURE_2D, self.texture)
-        image = GL.glGetTexImage(GL.GL_TEXTURE_2D, 0, GL.GL_RGB, GL.GL_UNSIGNED_BYTE, None)
-        image = np.frombuffer(image, dtype=np.uint8)
-        image = image.reshape((self.height, self.width, 3))
-        image = cv2.flip(image, 0)
-        cv2.imwrite("color.png", cv2.cvtColor(image, cv2.COLOR_RGB2BGR))
+        image = self.target.read_color()
+        import cv2
+        cv2.imwrite("color.png", cv2.cvtColor(np.ascontiguousarray(image), cv2.COLOR_RGB2BGR))
         print("Color image saved")
-        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        if self.target.distance:
+            np.save("distance.npy", self.target.read_distance())
+            print("Distance map saved")
 
     def setup(self):
         super().setup()
@@ -119,6 +167,7 @@ class VirtualScreen(ModelAbstract):
         self.vao.add_vbo(0, vertices, ncomponents=3, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None, draw_type=GL.GL_DYNAMIC_DRAW)
         self.vao.add_vbo(1, self.texcoords, ncomponents=2, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None)
         self.vao.add_ebo(indices=self.indices)
+        self.uploaded_version = self.camera.version
 
     def get_rect_vertices(self):
         distance = 0.5
@@ -150,9 +199,12 @@ class VirtualScreen(ModelAbstract):
         ], dtype=np.float32)
 
     def update_view_object(self):
+        if self.uploaded_version == self.camera.version:
+            return
         vertices = self.get_rect_vertices()
         GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.vao.vbo[0])
         GL.glBufferSubData(GL.GL_ARRAY_BUFFER, 0, vertices.nbytes, vertices)
+        self.uploaded_version = self.camera.version
 
     def draw(self, **kwargs):
         self.vao.activate()
@@ -169,16 +221,11 @@ class VirtualScreen(ModelAbstract):
         self.uma.upload_uniform_vector3fv(kwargs["camera_pos"], "cameraPos")
         self.uma.upload_uniform_scalar1f(kwargs["far"], "maxDistance")
 
-        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.frame)
-        GL.glFramebufferTexture2D(GL.GL_FRAMEBUFFER, GL.GL_COLOR_ATTACHMENT0, GL.GL_TEXTURE_2D, self.texture, 0)
-
         # Bind the texture before drawing
         GL.glActiveTexture(GL.GL_TEXTURE0)
         GL.glBindTexture(GL.GL_TEXTURE_2D, self.texture)
         GL.glUniform1i(GL.glGetUniformLocation(self.shader.render_idx, "textureSampler"), 0)
 
-        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, 0)
-
         GL.glDrawElements(GL.GL_TRIANGLES, len(self.indices), GL.GL_UNSIGNED_INT, None)
         self.vao.deactivate()
 
@@ -266,29 +313,35 @@ class MultiplesView:
             mouse_sentitive=0.1, 
             cameras = [], 
             width=640, 
-            height=480
+            height=480,
+            on_demand=False,
+            context=None,
+            float_depth=False,
+            vsync=True,
+            frame_cap=None,
+            timestep=FRAME_PER_SECOND,
+            profiler=None
         ):
-
-        glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 3)
-        glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 3)
-        glfw.window_hint(glfw.OPENGL_FORWARD_COMPAT, GL.GL_TRUE)
-        glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
-        glfw.window_hint(glfw.RESIZABLE, False)
-        
-        self.win = glfw.create_window(width, height, "View", None, None)
-
-        if not self.win:
-            raise Exception("Failed to create GLFW Window")
-
-        glfw.make_context_current(self.win)
+        """
+        :param profiler: A libs.profiler.FrameProfiler timing every pass and drawable, None to not profile
+        :param vsync: Sync swaps to the display, turn off (optionally with frame_cap) to measure uncapped throughput
+        :param frame_cap: Highest frame rate without vsync, None for uncapped
+        :param timestep: Fixed simulation step (seconds) of camera motion and drawables' update()
+        :param float_depth: Give every camera FBO a GL_R32F distance attachment (written by
+                            multiple_cams_distance.frag) next to its GL_DEPTH_COMPONENT32F depth
+        """
+
+        # GLFW window by default, a headless EGL/OSMesa context when PYOPENGL_PLATFORM asks for one
+        self.context = context or create_context(width, height, "View")
+        self.win = self.context.win
         print('Main View OpenGL', GL.glGetString(GL.GL_VERSION).decode() + ', GLSL', GL.glGetString(GL.GL_SHADING_LANGUAGE_VERSION).decode() + ', Renderer', GL.glGetString(GL.GL_RENDERER).decode())
         GL.glEnable(GL.GL_DEPTH_TEST)
         GL.glEnable(GL.GL_SCISSOR_TEST)
         
         # register event handlers
-        glfw.set_key_callback(self.win, self.on_key)
-        glfw.set_cursor_pos_callback(self.win, self.on_mouse_move)
-        glfw.set_input_mode(self.win, glfw.CURSOR, glfw.CURSOR_DISABLED)
+        self.context.set_key_callback(self.on_key)
+        self.context.set_cursor_pos_callback(self.on_mouse_move)
+        self.context.disable_cursor()
 
         self.aspect_ratio = (width // 2) / height
         self.width, self.height = width, height
@@ -307,20 +360,39 @@ class MultiplesView:
             camera_view_obj.setup()
             self.view_objs.append(camera_view_obj)
 
-        self.frame_buffers, self.render_buffers = self.init_fbo()
+        self.targets = self.init_fbo(float_depth)
+        self.frame_buffers = [target.framebuffer for target in self.targets]
 
         self.virtual_scenes = []
-        for camera, frame in zip(self.cameras, self.frame_buffers):
+        for camera, target in zip(self.cameras, self.targets):
             virtual_scene = VirtualScreen(
                 vert_shader="view_folder/virtual_scene.vert", 
                 frag_shader="view_folder/virtual_scene.frag",
-                camera=camera, width=width // 2, height=height, frame=frame)
+                camera=camera, target=target)
             virtual_scene.setup()
             self.virtual_scenes.append(virtual_scene)
 
         
         self.drawables =[]
 
+        # (camera.version, scene version) each camera pass was last rendered with
+        self.rendered_versions = [None] * len(self.cameras)
+        self.scene_version = 0
+
+        self.redraw = RedrawScheduler(self.context, on_demand=on_demand)
+        self.clock = FrameClock(self.context, timestep=timestep, vsync=vsync, frame_cap=frame_cap)
+        self.profiler = profiler or NullProfiler()
+
+        # Movement/zoom keys currently held down, applied once per simulation step
+        self.held_keys = set()
+
+        # Per camera PBO rings while start_capture() is active
+        self.readbacks = None
+        self.frame_number = 0
+
+        # (VideoRecorder, framebuffer) pairs fed after every rendered frame
+        self.recorders = []
+
         # Mouse state
         self.last_x = width // 4
         self.last_y = height // 2
@@ -329,57 +401,105 @@ class MultiplesView:
         self.move_speed = move_speed * FRAME_PER_SECOND
         self.mouse_sensitive = mouse_sentitive
 
-        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, 0)
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.context.framebuffer)
 
-    def init_fbo(self):
-        frame_buffers = GL.glGenFramebuffers(len(self.cameras))
-        render_buffers = GL.glGenRenderbuffers(len(self.cameras))
-        for frame, render in zip(frame_buffers, render_buffers):
-            GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, frame)
+    def init_fbo(self, float_depth=False):
+        # Color (+ R32F distance) and a float depth texture per camera, all readable after the pass
+        targets = [RenderTarget(self.width // 2, self.height, distance=float_depth) for _ in self.cameras]
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.context.framebuffer)
+        return targets
 
-            # Create and attach a renderbuffer for depth buffering
-            GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, render)
-            GL.glRenderbufferStorage(GL.GL_RENDERBUFFER, GL.GL_DEPTH24_STENCIL8, self.width // 2, self.height)
-            GL.glFramebufferRenderbuffer(GL.GL_FRAMEBUFFER, GL.GL_DEPTH_STENCIL_ATTACHMENT, GL.GL_RENDERBUFFER, render)
-        
-        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, 0)
-        GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, 0)
+    def read_depth(self, camera_idx):
+        """ Euclidean camera distance per pixel (float32, inf for background) from the depth attachment """
+        camera = self.cameras[camera_idx]
+        depth = self.targets[camera_idx].read_depth()
+        return depth_to_distance(depth, fovy=camera.fov, aspect=camera.aspect_ratio, near=camera.near, far=camera.far)
+
+    def read_distance(self, camera_idx):
+        """ Distance attachment (float32) of a float_depth view, as written by the fragment shader """
+        return self.targets[camera_idx].read_distance()
 
-        return frame_buffers, render_buffers
+    def get_scene_version(self):
+        """ Versions only grow, so the sum changes whenever any drawable changed """
+        return self.scene_version + sum(drawable.version for drawable in self.drawables)
 
     def run(self):
-        while not glfw.window_should_close(self.win):
-            for camera in self.cameras:
-                camera.update_camera_status()
-            # --------------------------------------------------------------- CAMERA VIEWPORT RENDERING
-
-            for camera, frame in zip(self.cameras, self.frame_buffers):
-                GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, frame)
-                GL.glViewport(0, 0, self.width // 2, self.height)
-                GL.glScissor(0, 0, self.width, self.height)
-                GL.glClearColor(0.8, 0.8, 0.8, 0.5)
-                GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
-
-                # Draw the same objects in the second viewport
-                GL.glPolygonMode(GL.GL_FRONT_AND_BACK, GL.GL_FILL)
-                for drawable in self.drawables:
-                    drawable.draw(
-                        camera_pos=camera.position,
-                        camera_front=camera.front, 
-                        camera_up=camera.up,
-                        fovy=camera.fov,
-                        aspect=camera.aspect_ratio,
-                        near=camera.near,
-                        far=camera.far
-                    )
-
-            # --------------------------------------------------------------- BLIT FBO
-            GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, 0)
+        while not self.context.should_close():
+            # --------------------------------------------------------------- FIXED STEP SIMULATION
+            for _ in range(self.clock.tick()):
+                self.update(self.clock.timestep)
+            if self.held_keys:
+                self.redraw.request_redraw()
+
+            if self.redraw.needs_redraw(self.drawables):
+                self.profiler.begin_frame()
+                self.render_frame()
+
+                with self.profiler.scope("recorders"):
+                    for recorder, framebuffer in self.recorders:
+                        recorder.capture(framebuffer)
+
+                with self.profiler.scope("swap"):
+                    self.context.swap_buffers()
+                self.profiler.end_frame()
+                self.redraw.frame_drawn(self.drawables)
+                self.clock.limit()
+
+            # --------------------------------------------------------------- WAIT / POLL EVENTS
+            self.redraw.wait_events(self.drawables)
+
+    def update(self, dt):
+        """ One fixed simulation step: motion of the held keys and every drawable's update() """
+        for camera in self.cameras:
+            camera.save_state()
+
+        for key in self.held_keys:
+            self.move(key, dt)
+            self.zoom(key, dt)
+
+        for drawable in self.drawables:
+            drawable.update(dt)
+
+    def render_frame(self):
+        for camera in self.cameras:
+            camera.update_camera_status()
+        # --------------------------------------------------------------- CAMERA VIEWPORT RENDERING
+
+        alpha = self.clock.alpha
+        scene_version = self.get_scene_version()
+        animating = self.redraw.is_animating(self.drawables)
+        for index, (camera, frame) in enumerate(zip(self.cameras, self.frame_buffers)):
+            # Nothing new for this camera: its texture still holds the last rendered pass
+            # (while something moves, every interpolation factor is a new frame)
+            pass_version = (camera.version, scene_version, alpha if animating or camera.is_moving() else None)
+            if self.rendered_versions[index] != pass_version:
+                self.rendered_versions[index] = pass_version
+
+                with self.profiler.scope(f"camera[{index}]"):
+                    GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, frame)
+                    GL.glViewport(0, 0, self.width // 2, self.height)
+                    GL.glScissor(0, 0, self.width, self.height)
+                    GL.glClearColor(0.8, 0.8, 0.8, 0.5)
+                    GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
+                    self.targets[index].clear_distance()
+
+                    # Draw the same objects in the second viewport
+                    GL.glPolygonMode(GL.GL_FRONT_AND_BACK, GL.GL_FILL)
+                    self.draw_drawables(f"camera[{index}]", camera, alpha)
+
+            # Skipped passes are captured too, their framebuffer still holds the last rendered image.
+            # Never wait here: with every PBO still in flight this capture is skipped
+            if self.readbacks is not None:
+                self.readbacks[index].issue(frame, tag=(index, self.frame_number), block=False)
+
+        # --------------------------------------------------------------- BLIT FBO
+        with self.profiler.scope("blit"):
+            GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.context.framebuffer)
             GL.glClearColor(0.0, 0.0, 0.0, 0.5)
             GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
 
             GL.glBindFramebuffer(GL.GL_READ_FRAMEBUFFER, self.frame_buffers[self.active_camera_idx])
-            GL.glBindFramebuffer(GL.GL_DRAW_FRAMEBUFFER, 0)
+            GL.glBindFramebuffer(GL.GL_DRAW_FRAMEBUFFER, self.context.framebuffer)
 
             # Copying the left side of the framebuffer to right side of the screen buffer
             GL.glBlitFramebuffer(
@@ -388,66 +508,114 @@ class MultiplesView:
                 GL.GL_COLOR_BUFFER_BIT, GL.GL_NEAREST
             )
 
-            # --------------------------------------------------------------- MAIN VIEWPORT
-            GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, 0)
+        # --------------------------------------------------------------- MAIN VIEWPORT
+        active_camera = self.cameras[0]
+        with self.profiler.scope("main_view"):
+            GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.context.framebuffer)
             GL.glViewport(0, 0, self.width // 2, self.height)
             GL.glScissor(0, 0, self.width // 2, self.height)
             GL.glClearColor(1.0, 1.0, 1.0, 0.5)
             GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
             
-            active_camera = self.cameras[0]
             active_camera.update_camera_status()
 
             GL.glPolygonMode(GL.GL_FRONT_AND_BACK, GL.GL_FILL)
-            for drawable in self.drawables:
-                drawable.draw(
-                    camera_pos=active_camera.position,
-                    camera_front=active_camera.front, 
-                    camera_up=active_camera.up,
-                    fovy=active_camera.fov,
-                    aspect=active_camera.aspect_ratio,
-                    near=active_camera.near,
-                    far=active_camera.far
-                )
+            self.draw_drawables("main_view", active_camera, alpha)
 
+        with self.profiler.scope("frustums"):
             GL.glPolygonMode(GL.GL_FRONT_AND_BACK, GL.GL_LINE)
             for view_obj in self.view_objs[1:]:
-                view_obj.draw(
-                    camera_pos=active_camera.position,
-                    camera_front=active_camera.front, 
-                    camera_up=active_camera.up,
-                    fovy=active_camera.fov,
-                    aspect=active_camera.aspect_ratio,
-                    near=active_camera.near,
-                    far=active_camera.far
-                )
-
-            # --------------------------------------------------------------- VIRTUAL SCENE
+                view_obj.draw(**active_camera.draw_kwargs(alpha))
+
+        # --------------------------------------------------------------- VIRTUAL SCENE
+        with self.profiler.scope("virtual_screens"):
             GL.glPolygonMode(GL.GL_FRONT_AND_BACK, GL.GL_FILL)
             for index, virtual_scene in enumerate(self.virtual_scenes):
                 if index == 0:
                     continue
                 else:
-                    virtual_scene.draw(
-                        camera_pos=active_camera.position,
-                        camera_front=active_camera.front, 
-                        camera_up=active_camera.up,
-                        fovy=active_camera.fov,
-                        aspect=active_camera.aspect_ratio,
-                        near=active_camera.near,
-                        far=active_camera.far
-                    )
-
-            # --------------------------------------------------------------- POLL EVENTS AND SWAP BUFFERS
-            glfw.swap_buffers(self.win)
-            glfw.poll_events()
-
+                    virtual_scene.draw(**active_camera.draw_kwargs(alpha))
+
+        # --------------------------------------------------------------- FINISHED READBACKS
+        with self.profiler.scope("readbacks"):
+            if self.readbacks is not None:
+                for readback in self.readbacks:
+                    readback.poll()
+        self.frame_number += 1
+
+    def draw_drawables(self, pass_name, camera, alpha):
+        """
+        Draw every drawable from camera, each in its own profiler scope named pass/Class#index.
+        Camera-centered drawables (e.g. a Clipmap) follow the active camera's `focus` in every pass,
+        and every pass of a frame shares its `frame` number (PointCloud streams once for all of them).
+        """
+        focus = self.cameras[self.active_camera_idx].position
+        for index, drawable in enumerate(self.drawables):
+            with self.profiler.scope(f"{pass_name}/{type(drawable).__name__}#{index}"):
+                drawable.draw(alpha=alpha, focus=focus, frame=self.frame_number, **camera.draw_kwargs(alpha))
+
+    def request_redraw(self):
+        self.redraw.request_redraw()
+
+    def start_capture(self, on_frame, buffers=3):
+        """
+        Capture every camera's pass of every frame without stalling the render loop, unchanged passes
+        (skipped by render_frame) included.
+        :param on_frame: Called as on_frame(camera_index, frame_number, image) a frame or two after the pass,
+                         image is a zero-copy RGB view of the mapped PBO, copy it to keep it
+        :param buffers: PBOs per camera
+        """
+        self.stop_capture()
+        self.readbacks = [
+            PBOReadback(
+                self.width // 2, self.height, buffers=buffers,
+                on_ready=lambda tag, image: on_frame(tag[0], tag[1], image)
+            )
+            for _ in self.cameras
+        ]
+
+    def stop_capture(self):
+        """ Deliver the captures still in flight and stop capturing """
+        if self.readbacks is not None:
+            for readback in self.readbacks:
+                readback.flush()
+                readback.release()
+        self.readbacks = None
+
+    def record(self, recorder, camera_idx=None):
+        """
+        Feed every rendered frame to a libs.recorder.VideoRecorder.
+        :param camera_idx: Record this camera's view, None records the whole window
+        """
+        if camera_idx is None:
+            framebuffer, size = self.context.framebuffer, (self.width, self.height)
+        else:
+            framebuffer, size = self.frame_buffers[camera_idx], (self.width // 2, self.height)
+
+        if (recorder.width, recorder.height) != size:
+            raise Exception(f"Recorder is {recorder.width}x{recorder.height}, the recorded view is {size[0]}x{size[1]}")
+        self.recorders.append((recorder, framebuffer))
+
+    def stop_recording(self):
+        for recorder, _ in self.recorders:
+            recorder.close()
+        self.recorders = []
 
     def add(self, *drawables):
         for obj in drawables:
             obj.setup()
             self.drawables.append(obj)
+        self.scene_version += 1
+        self.redraw.request_redraw()
             
+    def release(self):
+        """ Release every drawable, the captures and the cameras' render targets, once the viewer is done with them """
+        for drawable in self.drawables:
+            drawable.release()
+        self.stop_capture()
+        for target in self.targets:
+            target.release()
+
     def capture(self, key):
         if key == glfw.KEY_C:
             self.virtual_scenes[self.active_camera_idx].capture_color()
@@ -456,26 +624,29 @@ class MultiplesView:
         for view_obj in self.view_objs:
             view_obj.update_view_object()
 
-    def move(self, key):
+    def move(self, key, dt=FRAME_PER_SECOND):
         current_camera = self.cameras[self.active_camera_idx]
         if key == glfw.KEY_W:  # Move forward
-            current_camera.forward()
+            current_camera.forward(dt)
         elif key == glfw.KEY_S:  # Move backward
-            current_camera.backward()
+            current_camera.backward(dt)
         elif key == glfw.KEY_A:  # Move left
-            current_camera.go_left()
+            current_camera.go_left(dt)
         elif key == glfw.KEY_D:  # Move right
-            current_camera.go_right()
+            current_camera.go_right(dt)
+        else:
+            return
         self.update_camview_obj()
 
-    def zoom(self, key):
+    def zoom(self, key, dt=FRAME_PER_SECOND):
         current_camera = self.cameras[self.active_camera_idx]
         if key == glfw.KEY_Y:
-            current_camera.zoom_in()
+            current_camera.zoom_in(dt)
         elif key == glfw.KEY_H:
-            current_camera.zoom_out()
+            current_camera.zoom_out(dt)
 
     def on_mouse_move(self, _win, xpos, ypos):
+        self.redraw.request_redraw()
         if self.first_mouse:
             self.last_x = xpos
             self.last_y = ypos
@@ -497,18 +668,25 @@ class MultiplesView:
 
     def on_key(self, _win, key, _scancode, action, _mods):
         """ 'Q' or 'Escape' quits """
+        self.redraw.request_redraw()
+        # Motion follows how long a key is held, not the key repeat rate
+        if key in MOTION_KEYS:
+            if action == glfw.PRESS:
+                self.held_keys.add(key)
+            elif action == glfw.RELEASE:
+                self.held_keys.discard(key)
+
         if action == glfw.PRESS or action == glfw.REPEAT:
             if key == glfw.KEY_ESCAPE:
-                glfw.set_window_should_close(self.win, True)
+                self.context.set_should_close(True)
 
-            self.move(key=key)
-            self.zoom(key=key)
             self.capture(key=key)
             self.swap_camera(key=key)
 
             for drawable in self.drawables:
                 if hasattr(drawable, 'key_handler'):
                     drawable.key_handler(key)
+                    drawable.mark_dirty()
 
 
 # Experience: 
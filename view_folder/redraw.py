@@ -0,0 +1,47 @@
+class RedrawScheduler:
+    """ Decides when a viewer renders a new frame and how long it may sleep waiting for events """
+    def __init__(self, context, on_demand=False, timeout=0.5):
+        """
+        :param context: The viewer's libs.context context, used to wait for / poll events
+        :param on_demand: Only redraw after input, window events or request_redraw(), otherwise redraw nonstop
+        :param timeout: Longest time (seconds) to block in glfw.wait_events_timeout before checking again
+        """
+        self.context = context
+        self.on_demand = on_demand
+        self.timeout = timeout
+
+        self.pending = True
+        self.drawn_version = None
+
+        # Window exposure/resize/focus changes need a fresh frame too
+        context.set_refresh_callback(lambda _win: self.request_redraw())
+
+    def request_redraw(self):
+        self.pending = True
+
+    @staticmethod
+    def scene_version(drawables):
+        return sum(getattr(drawable, "version", 0) for drawable in drawables)
+
+    @staticmethod
+    def is_animating(drawables):
+        return any(drawable.is_animating() for drawable in drawables if hasattr(drawable, "is_animating"))
+
+    def needs_redraw(self, drawables):
+        # Headless contexts get no events, waiting for one would never end
+        if not self.on_demand or not self.context.interactive or self.pending or self.is_animating(drawables):
+            return True
+
+        # A drawable called request_redraw() (or otherwise changed) since the last frame
+        return self.scene_version(drawables) != self.drawn_version
+
+    def frame_drawn(self, drawables):
+        self.pending = False
+        self.drawn_version = self.scene_version(drawables)
+
+    def wait_events(self, drawables):
+        """ Poll while continuous (animations running), block on events while idle """
+        if self.needs_redraw(drawables):
+            self.context.poll_events()
+        else:
+            self.context.wait_events_timeout(self.timeout)
@@ -1,28 +1,27 @@
 import glfw
 import numpy as np
 import OpenGL.GL as GL
+from libs.context import create_context
+from view_folder.redraw import RedrawScheduler
+from view_folder.frame_clock import FrameClock
+from libs.transform import lerp
 
+# Degrees per simulation step while Q/E is held
 ANGLE_PER_FRAME = 360 // 360
 
 class RotatingViewer:
-    def __init__(self, width=640, height=480):
+    def __init__(self, width=640, height=480, on_demand=False, context=None, vsync=True, frame_cap=None):
+        """
+        :param vsync: Sync swaps to the display, turn off (optionally with frame_cap) to measure uncapped throughput
+        :param frame_cap: Highest frame rate without vsync, None for uncapped
+        """
 
-        glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 3)
-        glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 3)
-        glfw.window_hint(glfw.OPENGL_FORWARD_COMPAT, GL.GL_TRUE)
-        glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
-        glfw.window_hint(glfw.RESIZABLE, False)
-        
-        self.win = glfw.create_window(width, height, "Viewer", None, None)
-
-        if not self.win:
-            raise Exception("Failed to create GLFW Window")
-        
-        # make win's OpenGL context current; no OpenGL calls can happen before
-        glfw.make_context_current(self.win)
+        # GLFW window by default, a headless EGL/OSMesa context when PYOPENGL_PLATFORM asks for one
+        self.context = context or create_context(width, height, "Viewer")
+        self.win = self.context.win
 
         # register event handlers
-        glfw.set_key_callback(self.win, self.on_key)
+        self.context.set_key_callback(self.on_key)
 
         # useful message to check OpenGL renderer characteristics
         print('OpenGL', GL.glGetString(GL.GL_VERSION).decode() + ', GLSL',
@@ -39,48 +38,100 @@ class RotatingViewer:
         self.aspect_ratio = width / height
 
         self.x_angle, self.y_angle, self.z_angle = 0, 0, 0
+        self.previous_y_angle = 0
 
         self.drawables = []
+        self.recorders = []
 
-    def run(self):
-        while not glfw.window_should_close(self.win):
-            GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
+        self.redraw = RedrawScheduler(self.context, on_demand=on_demand)
+        self.clock = FrameClock(self.context, vsync=vsync, frame_cap=frame_cap)
 
-            for drawable in self.drawables:
-                drawable.draw(
-                    x_angle=self.x_angle,
-                    y_angle=self.y_angle,
-                    z_angle=self.z_angle,
-                    camera_pos=self.camera_pos, 
-                    camera_front=self.camera_front, 
-                    camera_up=self.camera_up,
-                    fovy=45,
-                    aspect=self.aspect_ratio,
-                    near=0.1,
-                    far=100
-                )
-
-            glfw.swap_buffers(self.win)
-
-            glfw.poll_events()
+        # Rotation keys currently held down, applied once per simulation step
+        self.held_keys = set()
+
+    def run(self):
+        while not self.context.should_close():
+            for _ in range(self.clock.tick()):
+                self.update(self.clock.timestep)
+            if self.held_keys:
+                self.redraw.request_redraw()
+
+            if self.redraw.needs_redraw(self.drawables):
+                GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
+
+                for drawable in self.drawables:
+                    drawable.draw(
+                        alpha=self.clock.alpha,
+                        x_angle=self.x_angle,
+                        y_angle=lerp(self.previous_y_angle, self.y_angle, self.clock.alpha) % 360,
+                        z_angle=self.z_angle,
+                        camera_pos=self.camera_pos, 
+                        camera_front=self.camera_front, 
+                        camera_up=self.camera_up,
+                        fovy=45,
+                        aspect=self.aspect_ratio,
+                        near=0.1,
+                        far=100
+                    )
+
+                for recorder in self.recorders:
+                    recorder.capture(self.context.framebuffer)
+
+                self.context.swap_buffers()
+                self.redraw.frame_drawn(self.drawables)
+                self.clock.limit()
+
+            self.redraw.wait_events(self.drawables)
+
+    def update(self, dt):
+        """ One fixed simulation step: rotation of the held keys and every drawable's update() """
+        # Unwrapped so interpolating across 360 stays continuous, draw wraps it
+        self.previous_y_angle = self.y_angle
+        if glfw.KEY_Q in self.held_keys:
+            self.y_angle -= ANGLE_PER_FRAME
+        if glfw.KEY_E in self.held_keys:
+            self.y_angle += ANGLE_PER_FRAME
+
+        for drawable in self.drawables:
+            drawable.update(dt)
 
     def add(self, *drawables):
-        glfw.make_context_current(self.win)
+        self.context.make_current()
         for drawable in drawables:
             drawable.setup()
         self.drawables.extend(drawables)
+        self.redraw.request_redraw()
+
+    def release(self):
+        """ Release every drawable, once the viewer is done with them """
+        for drawable in self.drawables:
+            drawable.release()
+
+    def request_redraw(self):
+        self.redraw.request_redraw()
+
+    def record(self, recorder):
+        """ Feed every rendered frame of the window to a libs.recorder.VideoRecorder """
+        self.recorders.append(recorder)
+
+    def stop_recording(self):
+        for recorder in self.recorders:
+            recorder.close()
+        self.recorders = []
 
     def on_key(self, _win, key, _scancode, action, _mods):
         """ 'Q' or 'Escape' quits """
+        self.redraw.request_redraw()
+        # Rotation follows how long a key is held, not the key repeat rate
+        if key in (glfw.KEY_Q, glfw.KEY_E):
+            if action == glfw.PRESS:
+                self.held_keys.add(key)
+            elif action == glfw.RELEASE:
+                self.held_keys.discard(key)
+
         if action == glfw.PRESS or action == glfw.REPEAT:
             if key == glfw.KEY_ESCAPE:
-                glfw.set_window_should_close(self.win, True)
-
-            if key == glfw.KEY_Q:
-                self.y_angle = (self.y_angle - ANGLE_PER_FRAME) % 360
-
-            if key == glfw.KEY_E:
-                self.y_angle = (self.y_angle + ANGLE_PER_FRAME) % 360
+                self.context.set_should_close(True)
 
             for drawable in self.drawables:
                 if hasattr(drawable, 'key_handler'):
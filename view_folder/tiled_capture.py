@@ -0,0 +1,112 @@
+import os
+import numpy as np
+import OpenGL.GL as GL
+
+from libs import transform as T
+from libs.context import create_context
+from libs.render_target import RenderTarget
+from view_folder.multiple_viewers import Camera
+
+
+def tile_frustum(fovy, aspect, near, far, width, height, x0, y0, x1, y1):
+    """
+    Off-axis projection of the pixel rectangle [x0, x1) x [y0, y1) (top row first) of a
+    width x height image seen through T.perspective(fovy, aspect, near, far).
+    """
+    top = near * np.tan(np.radians(fovy) / 2.0)
+    right = top * aspect
+    return T.frustum(
+        -right + 2.0 * right * x0 / width, -right + 2.0 * right * x1 / width,
+        top - 2.0 * top * y1 / height, top - 2.0 * top * y0 / height,
+        near, far
+    )
+
+
+def open_image(path, width, height):
+    """
+    Memory-mapped (height, width, 3) uint8 output, only the tiles being written are paged in.
+    .ppm gives a binary PPM any image viewer opens, anything else a .npy array.
+    """
+    if os.path.splitext(path)[1].lower() == ".ppm":
+        header = f"P6\n{width} {height}\n255\n".encode("ascii")
+        with open(path, "wb") as file:
+            file.write(header)
+            file.truncate(len(header) + width * height * 3)
+        return np.memmap(path, dtype=np.uint8, mode="r+", offset=len(header), shape=(height, width, 3))
+    return np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=(height, width, 3))
+
+
+class TiledCapture:
+    """
+    Renders a camera's view at a resolution beyond the largest FBO/viewport by splitting it into
+    a grid of tiles, each drawn with its own off-axis frustum into one reusable render target.
+
+        capture = TiledCapture(tile_width=4096, tile_height=4096)
+        capture.add(model)
+        capture.capture(camera, 32768, 32768, "print.ppm")
+
+    Only draw() is called, so animated drawables hold still across the tiles.
+    """
+    def __init__(self, tile_width=2048, tile_height=2048, context=None):
+        self.context = context or create_context(tile_width, tile_height, "Tiled capture")
+
+        # The driver limits are the whole reason for tiling, never ask for more than they allow
+        max_texture = int(GL.glGetIntegerv(GL.GL_MAX_TEXTURE_SIZE))
+        max_viewport = np.asarray(GL.glGetIntegerv(GL.GL_MAX_VIEWPORT_DIMS)).reshape(-1)
+        self.tile_width = min(tile_width, max_texture, int(max_viewport[0]))
+        self.tile_height = min(tile_height, max_texture, int(max_viewport[1]))
+
+        GL.glEnable(GL.GL_DEPTH_TEST)
+        self.target = RenderTarget(self.tile_width, self.tile_height)
+
+        self.drawables = []
+
+    def add(self, *drawables):
+        self.context.make_current()
+        for drawable in drawables:
+            drawable.setup()
+        self.drawables.extend(drawables)
+
+    def release(self):
+        """ Release every drawable and the tile render target, once the viewer is done with them """
+        for drawable in self.drawables:
+            drawable.release()
+        self.target.release()
+
+    def tiles(self, width, height):
+        """ (x0, y0, x1, y1) pixel rectangles covering the image, top row first """
+        for y0 in range(0, height, self.tile_height):
+            for x0 in range(0, width, self.tile_width):
+                yield x0, y0, min(x0 + self.tile_width, width), min(y0 + self.tile_height, height)
+
+    def capture(self, camera: Camera, width, height, path):
+        """
+        Render camera's view as a width x height image into path (.ppm or .npy).
+        The aspect ratio comes from width / height, the vertical field of view from the camera.
+        :return: Number of tiles rendered
+        """
+        image = open_image(path, width, height)
+        aspect = width / height
+        draw_kwargs = camera.draw_kwargs()
+        draw_kwargs["aspect"] = aspect
+
+        count = 0
+        for x0, y0, x1, y1 in self.tiles(width, height):
+            tile_width, tile_height = x1 - x0, y1 - y0
+
+            self.target.bind()
+            GL.glViewport(0, 0, tile_width, tile_height)
+            GL.glClearColor(1.0, 1.0, 1.0, 1.0)
+            GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
+
+            projection = tile_frustum(camera.fov, aspect, camera.near, camera.far, width, height, x0, y0, x1, y1)
+            for drawable in self.drawables:
+                drawable.draw(projection=projection, **draw_kwargs)
+
+            image[y0:y1, x0:x1] = self.target.read_color(tile_width, tile_height)
+            count += 1
+
+        image.flush()
+        del image
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.context.framebuffer)
+        return count
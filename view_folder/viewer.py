@@ -1,27 +1,29 @@
 import glfw
+import numpy as np
 import OpenGL.GL as GL
+from libs.context import create_context
+from view_folder.redraw import RedrawScheduler
+from view_folder.frame_clock import FrameClock
+from libs.transform import lerp
 
+# Degrees of auto rotation per simulation step
 ANGLE_PER_FRAME = 360 // 360
 
 class Viewer:
-    def __init__(self, width=640, height=480):
+    def __init__(self, width=640, height=480, on_demand=False, context=None, vsync=True, frame_cap=None,
+                 auto_rotate=True):
+        """
+        :param auto_rotate: Spin the scene ANGLE_PER_FRAME a step ('R' toggles it), on-demand viewers only idle without it
+        :param vsync: Sync swaps to the display, turn off (optionally with frame_cap) to measure uncapped throughput
+        :param frame_cap: Highest frame rate without vsync, None for uncapped
+        """
 
-        glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 3)
-        glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 3)
-        glfw.window_hint(glfw.OPENGL_FORWARD_COMPAT, GL.GL_TRUE)
-        glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
-        glfw.window_hint(glfw.RESIZABLE, False)
-        
-        self.win = glfw.create_window(width, height, "Viewer", None, None)
-
-        if not self.win:
-            raise Exception("Failed to create GLFW Window")
-        
-        # make win's OpenGL context current; no OpenGL calls can happen before
-        glfw.make_context_current(self.win)
+        # GLFW window by default, a headless EGL/OSMesa context when PYOPENGL_PLATFORM asks for one
+        self.context = context or create_context(width, height, "Viewer")
+        self.win = self.context.win
 
         # register event handlers
-        glfw.set_key_callback(self.win, self.on_key)
+        self.context.set_key_callback(self.on_key)
 
         # useful message to check OpenGL renderer characteristics
         print('OpenGL', GL.glGetString(GL.GL_VERSION).decode() + ', GLSL',
@@ -31,31 +33,101 @@ class Viewer:
         GL.glClearColor(1.0, 1.0, 1.0, 1.0)
         GL.glEnable(GL.GL_DEPTH_TEST)
 
+        self.camera_pos = np.array([0.0, 0.0, -5.0], dtype=np.float32)
+        self.camera_front = np.array([0.0, 0.0, -1.0], dtype=np.float32)
+        self.camera_up = np.array([0.0, 1.0, 0.0], dtype=np.float32)
+
+        self.aspect_ratio = width / height
+
         self.drawables = []
+        self.recorders = []
+
+        self.redraw = RedrawScheduler(self.context, on_demand=on_demand)
+        self.clock = FrameClock(self.context, vsync=vsync, frame_cap=frame_cap)
+
+        # Unwrapped so interpolating across 360 stays continuous
+        self.angle, self.previous_angle = 0, 0
+        self.auto_rotate = auto_rotate
 
     def run(self):
         
-        x_angle, y_angle, z_angle = 0, 0, 0
-        while not glfw.window_should_close(self.win):
-            GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
+        while not self.context.should_close():
+            for _ in range(self.clock.tick()):
+                self.update(self.clock.timestep)
 
-            for drawable in self.drawables:
-                drawable.draw(x_angle, y_angle, z_angle)
+            if self.redraw.needs_redraw(self.drawables):
+                GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
+
+                angle = lerp(self.previous_angle, self.angle, self.clock.alpha) % 360
+                for drawable in self.drawables:
+                    drawable.draw(
+                        alpha=self.clock.alpha,
+                        x_angle=angle,
+                        y_angle=angle,
+                        z_angle=0,
+                        camera_pos=self.camera_pos,
+                        camera_front=self.camera_front,
+                        camera_up=self.camera_up,
+                        fovy=45,
+                        aspect=self.aspect_ratio,
+                        near=0.1,
+                        far=100
+                    )
 
-            glfw.swap_buffers(self.win)
+                for recorder in self.recorders:
+                    recorder.capture(self.context.framebuffer)
 
-            glfw.poll_events()
-            y_angle = (y_angle + ANGLE_PER_FRAME) % 360
-            x_angle = (x_angle + ANGLE_PER_FRAME) % 360
+                self.context.swap_buffers()
+                self.redraw.frame_drawn(self.drawables)
+                self.clock.limit()
+
+            # The auto rotation is an animation, the viewer only goes idle once it is off
+            if self.auto_rotate:
+                self.redraw.request_redraw()
+            self.redraw.wait_events(self.drawables)
+
+    def update(self, dt):
+        """ One fixed simulation step: auto rotation and every drawable's update() """
+        self.previous_angle = self.angle
+        if self.auto_rotate:
+            self.angle += ANGLE_PER_FRAME
+
+        for drawable in self.drawables:
+            drawable.update(dt)
 
     def add(self, *drawables):
+        self.context.make_current()
+        for drawable in drawables:
+            drawable.setup()
         self.drawables.extend(drawables)
+        self.redraw.request_redraw()
+
+    def release(self):
+        """ Release every drawable, once the viewer is done with them """
+        for drawable in self.drawables:
+            drawable.release()
+
+    def request_redraw(self):
+        self.redraw.request_redraw()
+
+    def record(self, recorder):
+        """ Feed every rendered frame of the window to a libs.recorder.VideoRecorder """
+        self.recorders.append(recorder)
+
+    def stop_recording(self):
+        for recorder in self.recorders:
+            recorder.close()
+        self.recorders = []
 
     def on_key(self, _win, key, _scancode, action, _mods):
-        """ 'Q' or 'Escape' quits """
+        """ 'Q' or 'Escape' quits, 'R' starts or stops the auto rotation """
+        self.redraw.request_redraw()
+        if action == glfw.PRESS and key == glfw.KEY_R:
+            self.auto_rotate = not self.auto_rotate
+
         if action == glfw.PRESS or action == glfw.REPEAT:
             if key == glfw.KEY_ESCAPE or key == glfw.KEY_Q:
-                glfw.set_window_should_close(self.win, True)
+                self.context.set_should_close(True)
 
             for drawable in self.drawables:
                 if hasattr(drawable, 'key_handler'):